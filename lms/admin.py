@@ -12,7 +12,8 @@ from .models import (
     QuizAttempt,
     Resource,
     Discussion,
-    Reply
+    Reply,
+    GradingScheme
 )
 
 # Register all models for easy data management in admin panel
@@ -29,6 +30,7 @@ admin.site.register(QuizAttempt)
 admin.site.register(Resource)
 admin.site.register(Discussion)
 admin.site.register(Reply)
+admin.site.register(GradingScheme)
 
 
 
@@ -0,0 +1,115 @@
+# lms/analytics.py
+"""
+Classroom attendance analytics for teachers.
+
+Every attendance record of a classroom is loaded in one query (through the
+configured attendance store) into a students x dates matrix, from which the
+heatmap, daily presence rate, linear trend and absence streaks are computed
+with plain Python loops over that matrix -- the project has no numeric
+dependency such as NumPy. The result is cached per classroom and dropped
+whenever attendance for that classroom is written.
+"""
+from django.core.cache import cache
+
+from .attendance import get_store
+from .models import Enrollment
+
+ANALYTICS_CACHE_TTL = 60 * 60  # seconds; writes invalidate explicitly
+
+PRESENT, ABSENT, NO_RECORD = 1, 0, -1
+
+
+def _cache_key(classroom_id):
+    return f"lms:attendance_analytics:{classroom_id}"
+
+
+def invalidate(classroom_id):
+    """Forget cached analytics for a classroom (call after any attendance write)."""
+    cache.delete(_cache_key(classroom_id))
+
+
+def attendance_analytics(classroom):
+    key = _cache_key(classroom.id)
+    data = cache.get(key)
+    if data is None:
+        data = _build(classroom)
+        cache.set(key, data, ANALYTICS_CACHE_TTL)
+    return data
+
+
+def _trend(values):
+    """Least-squares line through (i, values[i]); returns (slope, fitted values)."""
+    n = len(values)
+    if n < 2:
+        return 0.0, list(values)
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    sxx = sum((i - mean_x) ** 2 for i in range(n))
+    sxy = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    slope = sxy / sxx
+    intercept = mean_y - slope * mean_x
+    return slope, [round(intercept + slope * i, 2) for i in range(n)]
+
+
+def _streaks(row):
+    """(current, longest) run of consecutive absences, ignoring days with no record."""
+    current = longest = 0
+    for cell in row:
+        if cell == ABSENT:
+            current += 1
+            longest = max(longest, current)
+        elif cell == PRESENT:
+            current = 0
+    return current, longest
+
+
+def _build(classroom):
+    enrollments = list(
+        Enrollment.objects.filter(classroom=classroom)
+        .select_related('student__profile')
+        .order_by('student__username')
+    )
+    row_index = {e.id: i for i, e in enumerate(enrollments)}
+
+    records = list(get_store().matrix_rows(Enrollment.objects.filter(classroom=classroom)))
+    dates = sorted({day for _, day, _ in records})
+    col_index = {d: j for j, d in enumerate(dates)}
+
+    # students x dates matrix
+    matrix = [[NO_RECORD] * len(dates) for _ in enrollments]
+    for enrollment_id, day, present in records:
+        matrix[row_index[enrollment_id]][col_index[day]] = PRESENT if present else ABSENT
+
+    # Presence rate per date
+    held = [0] * len(dates)
+    attended = [0] * len(dates)
+    for row in matrix:
+        for j, cell in enumerate(row):
+            if cell != NO_RECORD:
+                held[j] += 1
+                attended[j] += cell
+    daily_rate = [round(a / h * 100, 2) if h else 0.0 for a, h in zip(attended, held)]
+    slope, trend = _trend(daily_rate)
+
+    students = []
+    for e, row in zip(enrollments, matrix):
+        current, longest = _streaks(row)
+        days_held = sum(1 for c in row if c != NO_RECORD)
+        students.append({
+            'id': e.student_id,
+            'username': e.student.username,
+            'reg_no': getattr(getattr(e.student, 'profile', None), 'reg_no', None),
+            'percent': round(row.count(PRESENT) / days_held * 100, 2) if days_held else 0.0,
+            'current_streak': current,
+            'longest_streak': longest,
+        })
+
+    return {
+        'dates': [d.isoformat() for d in dates],
+        'students': students,
+        'matrix': matrix,
+        'daily_rate': daily_rate,
+        'trend': trend,
+        'trend_slope': round(slope, 3),
+        'average_rate': round(sum(daily_rate) / len(daily_rate), 2) if daily_rate else 0.0,
+    }
@@ -0,0 +1,351 @@
+# lms/archive.py
+"""
+Term archival.
+
+Archiving a finished classroom moves its high-volume rows -- attendance,
+submissions and their history, quiz attempts and discussion replies -- out of
+the live tables into one gzip'd JSON Lines file per model under
+``settings.LMS_ARCHIVE_DIR/<classroom id>/``, next to a ``manifest.json`` with
+row counts. The classroom itself, its enrollments, assignments, quizzes,
+discussions and resources stay behind as a small stub that can still be
+browsed read-only: pages read the archived rows they need lazily, one model
+file at a time, through the classroom cache (lms/caching.py).
+
+``restore_classroom`` bulk-inserts the rows back with their original primary
+keys and removes the archive.
+"""
+import base64
+import gzip
+import json
+import os
+import shutil
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib import messages
+from django.core import serializers
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import analytics, caching, counters
+from .attendance import _to_int
+from .models import (
+    Assignment, Attendance, AttendanceBitmap, Classroom, ClassSession, Discussion, Quiz, QuizAttempt,
+    Reply, Submission, SubmissionHistory,
+)
+from .purge import CHUNK_SIZE
+
+# (model, lookup to the classroom id), children before parents; restored in reverse
+ARCHIVED_MODELS = [
+    (SubmissionHistory, 'submission__assignment__classroom_id'),
+    (Submission, 'assignment__classroom_id'),
+    (QuizAttempt, 'quiz__classroom_id'),
+    (Reply, 'discussion__classroom_id'),
+    (Attendance, 'enrollment__classroom_id'),
+    (AttendanceBitmap, 'enrollment__classroom_id'),
+    (ClassSession, 'classroom_id'),
+]
+
+MANIFEST = 'manifest.json'
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def archive_root():
+    return getattr(settings, 'LMS_ARCHIVE_DIR', os.path.join(settings.BASE_DIR, 'archive'))
+
+
+def _directory(classroom):
+    return os.path.join(archive_root(), classroom.archive_path)
+
+
+def _filename(model):
+    return f"{model._meta.label_lower}.jsonl.gz"
+
+
+# -----------------------------
+# ARCHIVE / RESTORE
+# -----------------------------
+def archive_classroom(classroom, chunk_size=CHUNK_SIZE):
+    """Move ``classroom``'s archived models out of the live tables. Returns {label: rows archived}."""
+    if classroom.archived_at:
+        raise ArchiveError(f"{classroom.code} is already archived.")
+
+    relative = str(classroom.pk)
+    directory = os.path.join(archive_root(), relative)
+    os.makedirs(directory, exist_ok=True)
+
+    # 1. Mark the stub first: from here on redirect_if_archived turns away every view that writes these rows
+    Classroom.objects.filter(pk=classroom.pk).update(archived_at=timezone.now(), archive_path=relative)
+
+    # 2. Write every model file (and the manifest), remembering exactly which rows went into it
+    written = {}
+    try:
+        for model, lookup in ARCHIVED_MODELS:
+            queryset = model.objects.filter(**{lookup: classroom.pk}).order_by('pk')
+            pks = written[model] = []
+            path = os.path.join(directory, _filename(model))
+            with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as stream:
+                serializers.serialize('jsonl', _recording(queryset.iterator(chunk_size=chunk_size), pks), stream=stream)
+            os.replace(path + '.tmp', path)
+
+        counts = {model._meta.label: len(pks) for model, pks in written.items()}
+        with open(os.path.join(directory, MANIFEST), 'w') as f:
+            json.dump({'classroom': classroom.pk, 'code': classroom.code, 'created': timezone.now().isoformat(),
+                       'counts': counts}, f, indent=2)
+    except Exception:
+        Classroom.objects.filter(pk=classroom.pk).update(archived_at=None, archive_path='')
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    # 3. Delete only the rows that were written; a row saved by a request already in flight stays live
+    for model, _ in ARCHIVED_MODELS:
+        _delete_written(model, written[model], chunk_size)
+
+    _refresh(classroom)
+    return counts
+
+
+def _recording(objects, pks):
+    for obj in objects:
+        pks.append(obj.pk)
+        yield obj
+
+
+def _delete_written(model, pks, chunk_size):
+    """
+    Delete the rows ``pks`` in chunks, newest first. A row still referenced by a
+    live row that was not archived (or is not in this chunk) is kept.
+    """
+    relations = [(rel.related_model, rel.field.name) for rel in model._meta.related_objects]
+    pks = sorted(pks, reverse=True)
+    for start in range(0, len(pks), chunk_size):
+        chunk = pks[start:start + chunk_size]
+        with transaction.atomic():
+            queryset = model.objects.filter(pk__in=chunk)
+            for related, field in relations:
+                children = related.objects.filter(**{field: OuterRef('pk')})
+                if related is model:
+                    children = children.exclude(pk__in=chunk)
+                queryset = queryset.exclude(Exists(children))
+            queryset._raw_delete(using=queryset.db)
+
+
+@transaction.atomic
+def restore_classroom(classroom, batch_size=CHUNK_SIZE):
+    """Bring an archived classroom's rows back into the live tables. Returns {label: rows restored}."""
+    if not classroom.archived_at:
+        raise ArchiveError(f"{classroom.code} is not archived.")
+
+    restored = {}
+    for model, _ in reversed(ARCHIVED_MODELS):
+        objects = [d.object for d in _deserialize(classroom, model)]
+        objects.sort(key=lambda obj: obj.pk)  # parent replies before their children
+        # bulk_create fills auto_now / auto_now_add fields; put the archived values back afterwards
+        stamped = [
+            f.attname for f in model._meta.concrete_fields
+            if getattr(f, 'auto_now', False) or getattr(f, 'auto_now_add', False)
+        ]
+        originals = [[getattr(obj, name) for name in stamped] for obj in objects]
+        # Rows still present (an interrupted archive run) are left as they are
+        model.objects.bulk_create(objects, batch_size=batch_size, ignore_conflicts=True)
+        if stamped and objects:
+            for obj, values in zip(objects, originals):
+                for name, value in zip(stamped, values):
+                    setattr(obj, name, value)
+            model.objects.bulk_update(objects, stamped, batch_size=batch_size)
+        restored[model._meta.label] = len(objects)
+
+    directory = _directory(classroom)
+    Classroom.objects.filter(pk=classroom.pk).update(archived_at=None, archive_path='')
+    transaction.on_commit(lambda: shutil.rmtree(directory, ignore_errors=True))
+    _refresh(classroom)
+    return restored
+
+
+def _refresh(classroom):
+    counters.recount(classroom)
+    caching.bump(classroom.pk)
+    analytics.invalidate(classroom.pk)
+
+
+def remove(classroom):
+    """Delete a classroom's archive directory (used when the classroom itself is purged)."""
+    if classroom.archive_path:
+        shutil.rmtree(_directory(classroom), ignore_errors=True)
+
+
+# -----------------------------
+# READING
+# -----------------------------
+def _open(classroom, model):
+    path = os.path.join(_directory(classroom), _filename(model))
+    if not os.path.exists(path):
+        raise ArchiveError(f"Archive file {path} is missing.")
+    return gzip.open(path, 'rt', encoding='utf-8')
+
+
+def _deserialize(classroom, model):
+    with _open(classroom, model) as stream:
+        yield from serializers.deserialize('jsonl', stream)
+
+
+def _read_rows(classroom, model):
+    rows = []
+    with _open(classroom, model) as stream:
+        for line in stream:
+            if line.strip():
+                record = json.loads(line)
+                rows.append({'id': record['pk'], **record['fields']})
+    return rows
+
+
+def rows(classroom, model):
+    """Archived ``model`` rows of ``classroom`` as plain dicts (``id`` plus field values), cached."""
+    return caching.cached(
+        classroom.pk, f"archive:{model._meta.label_lower}", lambda: _read_rows(classroom, model)
+    )
+
+
+def file_names(classroom):
+    """Media files referenced by the classroom's archived submissions."""
+    if not classroom.archive_path:
+        return set()
+    return {row['file'] for row in _read_rows(classroom, Submission) if row.get('file')}
+
+
+# -----------------------------
+# READ-ONLY PAGES
+# -----------------------------
+SECTIONS = ('assignments', 'quizzes', 'attendance', 'discussions')
+
+
+def _average(values):
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def section(classroom, name, student_id=None):
+    """
+    Data for one tab of the archived classroom page. Only the archive files that
+    tab needs are read; ``student_id`` limits it to one student's own rows.
+    """
+    if name == 'assignments':
+        submissions = [s for s in rows(classroom, Submission) if student_id in (None, s['student'])]
+        items = []
+        for a in classroom.assignments.order_by('deadline'):
+            subs = [s for s in submissions if s['assignment'] == a.id]
+            items.append({
+                'assignment': a,
+                'submitted': sum(1 for s in subs if s['file']),
+                'average': _average([s['marks'] for s in subs if s['marks'] is not None]),
+                'mine': subs[0] if student_id and subs else None,
+                'submitted_at': parse_datetime(subs[0]['submitted_at']) if student_id and subs else None,
+            })
+        return items
+
+    if name == 'quizzes':
+        attempts = [t for t in rows(classroom, QuizAttempt) if student_id in (None, t['student'])]
+        items = []
+        for q in classroom.quizzes.order_by('start_time'):
+            scores = [t['score'] for t in attempts if t['quiz'] == q.id]
+            items.append({
+                'quiz': q,
+                'attempts': len(scores),
+                'average': _average(scores),
+                'best': max(scores) if scores else None,
+            })
+        return items
+
+    if name == 'attendance':
+        enrollments = classroom.enrollments.select_related('student__profile').order_by('student__username')
+        if student_id:
+            enrollments = enrollments.filter(student_id=student_id)
+        totals = {}
+        for r in rows(classroom, Attendance):
+            held, present = totals.get(r['enrollment'], (0, 0))
+            totals[r['enrollment']] = (held + 1, present + bool(r['present']))
+        for r in rows(classroom, AttendanceBitmap):
+            held, present = totals.get(r['enrollment'], (0, 0))
+            totals[r['enrollment']] = (
+                held + _to_int(base64.b64decode(r['held'])).bit_count(),
+                present + _to_int(base64.b64decode(r['present'])).bit_count(),
+            )
+        items = []
+        for e in enrollments:
+            held, present = totals.get(e.id, (0, 0))
+            items.append({'enrollment': e, 'held': held, 'present': present,
+                          'percent': round(present / held * 100, 2) if held else 0.0})
+        return items
+
+    if name == 'discussions':
+        replies = rows(classroom, Reply)
+        authors = dict(User.objects.filter(id__in={r['author'] for r in replies}).values_list('id', 'username'))
+        items = []
+        for d in classroom.discussions.select_related('author').order_by('-created_at'):
+            items.append({
+                'discussion': d,
+                'replies': [
+                    {'author': authors.get(r['author'], 'deleted user'), 'content': r['content'],
+                     'created_at': parse_datetime(r['created_at'])}
+                    for r in replies if r['discussion'] == d.id
+                ],
+            })
+        return items
+
+    raise ValueError(f"Unknown archive section: {name}")
+
+
+# -----------------------------
+# READ-ONLY GUARD
+# -----------------------------
+# URL kwarg -> (model, lookup of the classroom id, lookup of the classroom's archived_at)
+_ARCHIVED_LOOKUPS = {
+    'class_id': (Classroom, 'pk', 'archived_at'),
+    'assignment_id': (Assignment, 'classroom_id', 'classroom__archived_at'),
+    'quiz_id': (Quiz, 'classroom_id', 'classroom__archived_at'),
+    'discussion_id': (Discussion, 'classroom_id', 'classroom__archived_at'),
+    'submission_id': (Submission, 'assignment__classroom_id', 'assignment__classroom__archived_at'),
+}
+
+
+def _archived_classroom(kwargs):
+    """Query for the archived classroom id a view's URL kwargs point at; None when they point at none."""
+    for kwarg, (model, classroom_lookup, archived_lookup) in _ARCHIVED_LOOKUPS.items():
+        if kwarg in kwargs:
+            return model.objects.filter(
+                pk=kwargs[kwarg], **{f'{archived_lookup}__isnull': False}
+            ).values_list(classroom_lookup, flat=True)
+    return None
+
+
+def redirect_if_archived(view):
+    """Send requests for an archived classroom's live pages to its read-only archive page."""
+    def archived(request, classroom_id):
+        messages.info(request, "This course has been archived and is read-only.")
+        return redirect('archived_class', class_id=classroom_id)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            query = _archived_classroom(kwargs)
+            classroom_id = None if query is None else await query.afirst()
+            if classroom_id is not None:
+                return archived(request, classroom_id)
+            return await view(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        query = _archived_classroom(kwargs)
+        classroom_id = None if query is None else query.first()
+        if classroom_id is not None:
+            return archived(request, classroom_id)
+        return view(request, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,12 @@
+# lms/async_urls.py
+"""The app's routes with the async read views (lms/async_views.py) in front; used under ASGI."""
+from django.urls import path
+
+from . import async_views
+from .urls import urlpatterns as sync_urlpatterns
+
+urlpatterns = [
+    path('class/<int:class_id>/resources/', async_views.class_resources, name='class_resources'),
+    path('class/<int:class_id>/discussions/', async_views.class_discussions, name='class_discussions'),
+    path('class/<int:class_id>/quizzes/student/', async_views.quizzes_student, name='class_quizzes_student'),
+] + sync_urlpatterns
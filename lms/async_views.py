@@ -0,0 +1,123 @@
+# lms/async_views.py
+"""
+Async versions of the busiest read-only pages: a course's resources,
+discussions and quiz list.
+
+The ASGI application serves these instead of their counterparts in
+lms/views.py (``LMS_ASYNC_VIEWS``, set by lms_project/asgi.py; routes in
+lms/async_urls.py). They read through the async ORM and cache, so many
+requests can be in flight on one event loop. Everything they return is
+identical to the sync views, including the ETag / 304 handling
+(``conditional.acondition``). Posting a new discussion is handed to the
+sync view unchanged.
+
+Templates are rendered on the event loop. Everything they touch is loaded
+beforehand -- the session principal by ``principal_required``, related rows
+by ``select_related`` -- so no query can start from a template (Django would
+refuse one there anyway).
+
+``manage.py benchmark_servers`` compares their throughput under ASGI with the
+sync views under WSGI.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
+
+from . import archive, caching, conditional, content_index, derivatives, views
+from .forms import DiscussionForm
+from .models import Classroom, Discussion, Quiz, QuizAttempt, Resource
+from .principal import aresolve
+
+
+def principal_required(view):
+    """``login_required`` for async views; also resolves the lazy principal for what follows."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        principal = await aresolve(request)
+        if not principal.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view(request, *args, **kwargs)
+    return wrapper
+
+
+async def _rows(queryset):
+    return [row async for row in queryset]
+
+
+# -----------------------------
+# RESOURCES
+# -----------------------------
+@principal_required
+@conditional.acondition('resources')
+async def class_resources(request, class_id):
+    classroom = await aget_object_or_404(Classroom, id=class_id)
+    is_teacher = classroom.teacher_id == request.user.id
+
+    resources = await caching.acached(classroom.id, 'resources', lambda: _rows(
+        Resource.objects.filter(classroom=classroom).select_related('uploaded_by')
+    ))
+    file_info = await caching.acached(classroom.id, 'resource_derivatives', lambda: derivatives.afor_names(
+        r.file.name for r in resources
+    ))
+    # The full-text index is a separate SQLite file: searched in a worker thread
+    query = request.GET.get('q', '').strip()
+    results = await sync_to_async(content_index.search)(classroom, query) if query else None
+
+    return render(request, 'lms/class_resources.html', {
+        'classroom': classroom,
+        'resources': resources,
+        'derivatives': file_info,
+        'is_teacher': is_teacher,
+        'query': query,
+        'results': results,
+    })
+
+
+# -----------------------------
+# DISCUSSIONS
+# -----------------------------
+@principal_required
+@archive.redirect_if_archived
+async def class_discussions(request, class_id):
+    if request.method == 'POST':
+        return await sync_to_async(views.class_discussions)(request, class_id=class_id)
+
+    classroom = await aget_object_or_404(Classroom, id=class_id)
+    discussions = await caching.acached(classroom.id, 'discussions', lambda: _rows(
+        Discussion.objects.filter(classroom=classroom).select_related('author')
+    ))
+    is_teacher = classroom.teacher_id == request.user.id
+
+    return render(request, 'lms/discussions.html', {
+        'classroom': classroom,
+        'discussions': discussions,
+        'form': DiscussionForm() if is_teacher else None,
+        'is_teacher': is_teacher
+    })
+
+
+# -----------------------------
+# QUIZZES
+# -----------------------------
+@principal_required
+@archive.redirect_if_archived
+@conditional.acondition('quizzes')
+async def quizzes_student(request, class_id):
+    classroom = await aget_object_or_404(Classroom, id=class_id)
+    quizzes = await caching.acached(classroom.id, 'quizzes', lambda: _rows(
+        Quiz.objects.filter(classroom=classroom, visible=True).order_by('start_time')
+    ))
+    attempt_map = {
+        a.quiz_id: a
+        async for a in QuizAttempt.objects.filter(student=request.user, quiz__in=[q.id for q in quizzes])
+    }
+
+    return render(request, 'lms/quizzes_student.html', {
+        'classroom': classroom,
+        'quizzes': quizzes,
+        'attempt_map': attempt_map,
+        'now': timezone.localtime(timezone.now()),
+    })
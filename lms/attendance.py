@@ -0,0 +1,223 @@
+# lms/attendance.py
+"""
+Attendance storage.
+
+Two interchangeable stores sit behind the same small API, selected by
+``settings.LMS_ATTENDANCE_STORAGE``:
+
+* ``RowStore``    -- the original layout, one ``Attendance`` row per enrollment per day.
+* ``BitmapStore`` -- one ``AttendanceBitmap`` row per enrollment per term holding
+                     packed "held" and "present" day bitmaps, plus a ``ClassSession``
+                     calendar per classroom. Percentages are popcounts.
+
+Views never touch ``Attendance`` / ``AttendanceBitmap`` directly; they go through
+``get_store()``.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Attendance, AttendanceBitmap, ClassSession
+
+AttendanceRecord = namedtuple('AttendanceRecord', ['date', 'present'])
+
+
+def _percent(held, present):
+    if held == 0:
+        return 0.0
+    return round((present / held) * 100, 2)
+
+
+# -----------------------------
+# ROW STORE (one row per day)
+# -----------------------------
+class RowStore:
+    name = 'rows'
+
+    def save_day(self, classroom, enrollments, day, present_ids):
+        for enrollment in enrollments:
+            Attendance.objects.update_or_create(
+                enrollment=enrollment,
+                date=day,
+                defaults={'present': enrollment.id in present_ids}
+            )
+
+    def clear_day(self, classroom, enrollments, day):
+        Attendance.objects.filter(enrollment__in=enrollments, date=day).delete()
+
+    def clear_enrollment(self, enrollment):
+        deleted_count, _ = Attendance.objects.filter(enrollment=enrollment).delete()
+        return deleted_count
+
+    def day_map(self, enrollments, day):
+        return dict(
+            Attendance.objects.filter(enrollment__in=enrollments, date=day)
+            .values_list('enrollment_id', 'present')
+        )
+
+    def records(self, enrollment):
+        return [
+            AttendanceRecord(d, p)
+            for d, p in Attendance.objects.filter(enrollment=enrollment)
+            .order_by('-date').values_list('date', 'present')
+        ]
+
+    def totals(self, enrollments):
+        """{enrollment_id: (held, present)} for a queryset of enrollments, in one query."""
+        rows = (
+            Attendance.objects.filter(enrollment__in=enrollments)
+            .values('enrollment_id')
+            .annotate(held=Count('id'), present=Count('id', filter=Q(present=True)))
+            .order_by()
+        )
+        return {r['enrollment_id']: (r['held'], r['present']) for r in rows}
+
+    def matrix_rows(self, enrollments):
+        """Yield (enrollment_id, date, present) for every record, in one query."""
+        return Attendance.objects.filter(enrollment__in=enrollments).values_list(
+            'enrollment_id', 'date', 'present'
+        ).order_by()
+
+    def percent(self, enrollment):
+        held, present = self.totals(enrollment.__class__.objects.filter(pk=enrollment.pk)).get(enrollment.pk, (0, 0))
+        return _percent(held, present)
+
+
+# -----------------------------
+# BITMAP STORE (one row per term)
+# -----------------------------
+def _to_int(data):
+    return int.from_bytes(bytes(data or b''), 'little')
+
+
+def _to_bytes(value):
+    return value.to_bytes((value.bit_length() + 7) // 8, 'little')
+
+
+def _days(term_start, value):
+    """Dates whose bit is set in ``value``."""
+    index = 0
+    while value:
+        if value & 1:
+            yield term_start + timedelta(days=index)
+        value >>= 1
+        index += 1
+
+
+class BitmapStore:
+    name = 'bitmap'
+
+    @transaction.atomic
+    def save_day(self, classroom, enrollments, day, present_ids):
+        term_start = classroom.start_date
+        bit = 1 << (day - term_start).days
+
+        bitmaps = {}
+        stale = []
+        for bm in AttendanceBitmap.objects.filter(enrollment__in=enrollments).select_for_update():
+            if bm.term_start == term_start:
+                bitmaps[bm.enrollment_id] = bm
+            elif bm.term_start <= day:
+                # An older term (the course start date moved) also covers this day -- drop it there
+                offset = 1 << (day - bm.term_start).days
+                if _to_int(bm.held) & offset:
+                    bm.held = _to_bytes(_to_int(bm.held) & ~offset)
+                    bm.present = _to_bytes(_to_int(bm.present) & ~offset)
+                    stale.append(bm)
+
+        to_create, to_update = [], []
+        for enrollment in enrollments:
+            bm = bitmaps.get(enrollment.id)
+            if bm is None:
+                bm = AttendanceBitmap(enrollment=enrollment, term_start=term_start)
+                to_create.append(bm)
+            else:
+                to_update.append(bm)
+            present = _to_int(bm.present)
+            bm.held = _to_bytes(_to_int(bm.held) | bit)
+            bm.present = _to_bytes(present | bit if enrollment.id in present_ids else present & ~bit)
+
+        AttendanceBitmap.objects.bulk_create(to_create)
+        AttendanceBitmap.objects.bulk_update(to_update + stale, ['held', 'present'])
+        ClassSession.objects.get_or_create(classroom=classroom, date=day)
+
+    @transaction.atomic
+    def clear_day(self, classroom, enrollments, day):
+        to_update = []
+        for bm in AttendanceBitmap.objects.filter(enrollment__in=enrollments, term_start__lte=day).select_for_update():
+            bit = 1 << (day - bm.term_start).days
+            if _to_int(bm.held) & bit:
+                bm.held = _to_bytes(_to_int(bm.held) & ~bit)
+                bm.present = _to_bytes(_to_int(bm.present) & ~bit)
+                to_update.append(bm)
+        AttendanceBitmap.objects.bulk_update(to_update, ['held', 'present'])
+        ClassSession.objects.filter(classroom=classroom, date=day).delete()
+
+    def clear_enrollment(self, enrollment):
+        bitmaps = AttendanceBitmap.objects.filter(enrollment=enrollment)
+        cleared = sum(_to_int(held).bit_count() for held in bitmaps.values_list('held', flat=True))
+        bitmaps.delete()
+        return cleared
+
+    def day_map(self, enrollments, day):
+        result = {}
+        for enrollment_id, term_start, held, present in AttendanceBitmap.objects.filter(
+            enrollment__in=enrollments, term_start__lte=day
+        ).values_list('enrollment_id', 'term_start', 'held', 'present'):
+            bit = 1 << (day - term_start).days
+            if _to_int(held) & bit:
+                result[enrollment_id] = bool(_to_int(present) & bit)
+        return result
+
+    def records(self, enrollment):
+        records = []
+        for term_start, held, present in AttendanceBitmap.objects.filter(
+            enrollment=enrollment
+        ).values_list('term_start', 'held', 'present'):
+            present = _to_int(present)
+            for d in _days(term_start, _to_int(held)):
+                records.append(AttendanceRecord(d, bool(present & (1 << (d - term_start).days))))
+        records.sort(key=lambda r: r.date, reverse=True)
+        return records
+
+    def totals(self, enrollments):
+        result = {}
+        for enrollment_id, held, present in AttendanceBitmap.objects.filter(
+            enrollment__in=enrollments
+        ).values_list('enrollment_id', 'held', 'present'):
+            h, p = result.get(enrollment_id, (0, 0))
+            result[enrollment_id] = (h + _to_int(held).bit_count(), p + _to_int(present).bit_count())
+        return result
+
+    def matrix_rows(self, enrollments):
+        for enrollment_id, term_start, held, present in AttendanceBitmap.objects.filter(
+            enrollment__in=enrollments
+        ).values_list('enrollment_id', 'term_start', 'held', 'present'):
+            present = _to_int(present)
+            for d in _days(term_start, _to_int(held)):
+                yield enrollment_id, d, bool(present & (1 << (d - term_start).days))
+
+    def percent(self, enrollment):
+        held, present = self.totals(enrollment.__class__.objects.filter(pk=enrollment.pk)).get(enrollment.pk, (0, 0))
+        return _percent(held, present)
+
+
+STORES = {
+    RowStore.name: RowStore,
+    BitmapStore.name: BitmapStore,
+}
+
+
+def get_store(name=None):
+    """Return the configured attendance store (``settings.LMS_ATTENDANCE_STORAGE``)."""
+    name = name or getattr(settings, 'LMS_ATTENDANCE_STORAGE', RowStore.name)
+    return STORES[name]()
+
+
+def percent_map(enrollments, store=None):
+    """{enrollment_id: attendance %} for a queryset of enrollments."""
+    store = store or get_store()
+    return {eid: _percent(held, present) for eid, (held, present) in store.totals(enrollments).items()}
@@ -0,0 +1,132 @@
+# lms/caching.py
+"""
+Classroom-scoped caching keyed by a per-classroom "generation".
+
+Every write to a classroom's Assignment / Quiz / Resource / Discussion / Reply
+rows replaces that classroom's generation token (see lms/signals.py), so
+anything cached under the previous generation simply stops being looked up
+and ages out of the backend. No key ever needs to be deleted explicitly.
+
+Generations are random-ish tokens (``time.time_ns()``) rather than small
+integers, so a generation key that gets evicted can never come back as a
+value that matches stale entries.
+
+Works with any Django cache backend (local-memory, file-based, ...).
+Hit / miss counts per cached name are kept in the cache itself and exposed
+through ``stats()``.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+DEFAULT_TIMEOUT = 60 * 10  # seconds
+_MISSING = object()
+
+
+def _generation_key(classroom_id):
+    return f"lms:gen:{classroom_id}"
+
+
+def generation(classroom_id):
+    """Current generation token of a classroom."""
+    return cache.get_or_set(_generation_key(classroom_id), time.time_ns, None)
+
+
+async def ageneration(classroom_id):
+    """``generation()`` for async code."""
+    return await cache.aget_or_set(_generation_key(classroom_id), time.time_ns, None)
+
+
+def generations(classroom_ids):
+    """{classroom_id: generation} for several classrooms in one cache round trip."""
+    keys = {_generation_key(cid): cid for cid in classroom_ids}
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return {keys[key]: value for key, value in found.items()}
+
+
+def bump(classroom_id):
+    """Start a new generation for a classroom once the current transaction commits."""
+    if classroom_id:
+        transaction.on_commit(lambda: cache.set(_generation_key(classroom_id), time.time_ns(), None))
+
+
+def cached(classroom_id, name, builder, timeout=DEFAULT_TIMEOUT):
+    """
+    Return ``builder()`` cached under the classroom's current generation.
+    ``name`` identifies what is cached (e.g. ``'resources'``) and groups its metrics.
+    """
+    key = f"lms:c{classroom_id}:g{generation(classroom_id)}:{name}"
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        _record(name, 'misses')
+        value = builder()
+        cache.set(key, value, timeout)
+    else:
+        _record(name, 'hits')
+    return value
+
+
+async def acached(classroom_id, name, builder, timeout=DEFAULT_TIMEOUT):
+    """``cached()`` for async code: ``builder`` is a coroutine function."""
+    key = f"lms:c{classroom_id}:g{await ageneration(classroom_id)}:{name}"
+    value = await cache.aget(key, _MISSING)
+    if value is _MISSING:
+        await _arecord(name, 'misses')
+        value = await builder()
+        await cache.aset(key, value, timeout)
+    else:
+        await _arecord(name, 'hits')
+    return value
+
+
+# -----------------------------
+# METRICS
+# -----------------------------
+_NAMES_KEY = 'lms:metrics:names'
+
+
+def _record(name, kind):
+    key = f"lms:metrics:{kind}:{name}"
+    if cache.add(key, 1, None):
+        names = cache.get(_NAMES_KEY, set())
+        if name not in names:
+            cache.set(_NAMES_KEY, names | {name}, None)
+    else:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, None)
+
+
+async def _arecord(name, kind):
+    """``_record()`` on the async cache API, which a file or database backend runs off the event loop."""
+    key = f"lms:metrics:{kind}:{name}"
+    if await cache.aadd(key, 1, None):
+        names = await cache.aget(_NAMES_KEY, set())
+        if name not in names:
+            await cache.aset(_NAMES_KEY, names | {name}, None)
+    else:
+        try:
+            await cache.aincr(key)
+        except ValueError:
+            await cache.aset(key, 1, None)
+
+
+def stats():
+    """{name: {'hits': n, 'misses': n, 'hit_rate': pct}} for everything cached so far."""
+    result = {}
+    for name in sorted(cache.get(_NAMES_KEY, set())):
+        hits = cache.get(f"lms:metrics:hits:{name}", 0)
+        misses = cache.get(f"lms:metrics:misses:{name}", 0)
+        total = hits + misses
+        result[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total * 100, 2) if total else 0.0,
+        }
+    return result
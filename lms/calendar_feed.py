@@ -0,0 +1,177 @@
+# lms/calendar_feed.py
+"""
+Per-student iCalendar (.ics) feed of assignment deadlines and quiz windows.
+
+Calendar apps cannot log in, so the feed URL carries a random token stored on
+the student's Profile (``token_for()``); resetting it revokes every
+subscription made with the old link.
+
+Calendar apps poll the feed every few minutes, mostly for nothing. A request
+reads the student's classrooms in one query and their cache generations
+(lms/caching.py) in one cache round trip. Any change to an assignment or quiz
+starts a new generation, so those stamps -- together with the classroom list
+itself -- fingerprint the feed. That fingerprint is the ETag, so an unchanged
+feed is a 304 with no further work. It is also the cache key of the rendered
+body, so a changed ETag is usually one cache miss: one query for the
+assignments and one for the quizzes of all the student's classrooms.
+"""
+import hashlib
+import secrets
+from datetime import timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+
+from . import caching
+from .models import Assignment, Classroom, Profile, Quiz
+
+TIMEOUT = 60 * 60 * 24
+REFRESH = 'PT1H'  # how often clients are asked to poll
+
+
+# -----------------------------
+# TOKENS
+# -----------------------------
+def token_for(user):
+    """The user's feed token, created on first use."""
+    token = Profile.objects.filter(user=user).values_list('calendar_token', flat=True).first()
+    if not token:
+        token = reset_token(user)
+    return token
+
+
+def reset_token(user):
+    token = secrets.token_urlsafe(32)
+    Profile.objects.filter(user=user).update(calendar_token=token)  # not a principal field: no invalidation
+    return token
+
+
+# -----------------------------
+# RENDERING (RFC 5545)
+# -----------------------------
+def _escape(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\r\n', '\\n') \
+        .replace('\n', '\\n')
+
+
+def _fold(line):
+    """Split a content line into 75-octet pieces, continuation lines starting with a space."""
+    data = line.encode()
+    if len(data) <= 75:
+        return line
+    pieces, start, limit = [], 0, 75
+    while start < len(data):
+        end = min(start + limit, len(data))
+        while end < len(data) and (data[end] & 0xC0) == 0x80:
+            end -= 1  # never cut inside a UTF-8 sequence
+        pieces.append(data[start:end].decode())
+        start, limit = end, 74  # the leading space counts
+    return '\r\n '.join(pieces)
+
+
+def _stamp(moment):
+    return moment.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def render(name, events, site_url=''):
+    """
+    An iCalendar document; ``events`` are dicts with ``uid``, ``summary``, ``start``,
+    ``end`` (may equal start), ``stamp`` (last change) and ``url`` (a path).
+    """
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//LMS//Course calendar//EN',
+        'CALSCALE:GREGORIAN',
+        'METHOD:PUBLISH',
+        f'X-WR-CALNAME:{_escape(name)}',
+        f'REFRESH-INTERVAL;VALUE=DURATION:{REFRESH}',
+        f'X-PUBLISHED-TTL:{REFRESH}',
+    ]
+    for event in events:
+        lines += [
+            'BEGIN:VEVENT',
+            f"UID:{event['uid']}",
+            f"DTSTAMP:{_stamp(event['stamp'])}",
+            f"DTSTART:{_stamp(event['start'])}",
+            f"DTEND:{_stamp(event['end'])}",
+            f"SUMMARY:{_escape(event['summary'])}",
+        ]
+        if event.get('url'):
+            lines.append(f"URL:{site_url}{event['url']}")
+        lines.append('END:VEVENT')
+    lines.append('END:VCALENDAR')
+    return ''.join(_fold(line) + '\r\n' for line in lines)
+
+
+# -----------------------------
+# FEED
+# -----------------------------
+def _state(request, token):
+    """``{'user_id', 'classrooms', 'etag'}`` for the feed's owner, once per request; None for an unknown token."""
+    memo = request.__dict__.setdefault('_lms_calendar', {})
+    if token not in memo:
+        user_id = Profile.objects.filter(calendar_token=token).values_list('user_id', flat=True).first()
+        state = None
+        if user_id is not None:
+            classrooms = list(
+                Classroom.objects.filter(enrollments__student_id=user_id, archived_at__isnull=True)
+                .order_by('pk').values_list('pk', 'code', 'name')
+            )
+            generations = caching.generations([pk for pk, _, _ in classrooms])
+            fingerprint = repr((user_id, classrooms, sorted(generations.items())))
+            state = {
+                'user_id': user_id,
+                'classrooms': classrooms,
+                'etag': hashlib.md5(fingerprint.encode()).hexdigest(),
+            }
+        memo[token] = state
+    return memo[token]
+
+
+def etag(request, token):
+    state = _state(request, token)
+    return state and state['etag']
+
+
+def _events(classrooms):
+    codes = {pk: code for pk, code, _ in classrooms}
+    events = []
+    for assignment in Assignment.objects.filter(classroom_id__in=codes, visible=True) \
+            .values('pk', 'classroom_id', 'title', 'deadline', 'updated_at').order_by('deadline', 'pk'):
+        events.append({
+            'uid': f"assignment-{assignment['pk']}@lms",
+            'summary': f"Due: {assignment['title']} ({codes[assignment['classroom_id']]})",
+            'start': assignment['deadline'],
+            'end': assignment['deadline'],
+            'stamp': assignment['updated_at'],
+            'url': reverse('class_assignments_student', args=[assignment['classroom_id']]),
+        })
+    for quiz in Quiz.objects.filter(classroom_id__in=codes, visible=True) \
+            .values('pk', 'classroom_id', 'title', 'start_time', 'end_time', 'updated_at').order_by('start_time', 'pk'):
+        events.append({
+            'uid': f"quiz-{quiz['pk']}@lms",
+            'summary': f"Quiz: {quiz['title']} ({codes[quiz['classroom_id']]})",
+            'start': quiz['start_time'],
+            'end': quiz['end_time'],
+            'stamp': quiz['updated_at'],
+            'url': reverse('attempt_quiz', args=[quiz['pk']]),
+        })
+    return events
+
+
+def body(request, token):
+    """The rendered feed, cached under its ETag; None for an unknown token."""
+    state = _state(request, token)
+    if state is None:
+        return None
+    key = f"lms:ics:{state['etag']}"
+    document = cache.get(key)
+    if document is None:
+        document = render(
+            'Course calendar', _events(state['classrooms']),
+            site_url=getattr(settings, 'LMS_SITE_URL', 'http://localhost:8000').rstrip('/'),
+        )
+        cache.set(key, document, TIMEOUT)
+    return document
@@ -0,0 +1,19 @@
+# lms/checks.py
+"""
+System checks. The deployment ones run with ``manage.py check --deploy``.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+
+@register(deploy=True)
+def job_worker_check(app_configs, **kwargs):
+    """A production site needs ``manage.py runworker``; say so when it is not declared."""
+    if getattr(settings, 'LMS_JOB_WORKER', False):
+        return []
+    return [Warning(
+        "LMS_JOB_WORKER is not set, so no job worker is expected: submissions are committed inside "
+        "requests, and derivatives, search indexing, digests and purges wait in the queue.",
+        hint="Run `manage.py runworker` next to the site and set LMS_JOB_WORKER=1.",
+        id='lms.W001',
+    )]
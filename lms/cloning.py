@@ -0,0 +1,113 @@
+# lms/cloning.py
+"""
+Cloning a classroom's content into a new classroom for the next term.
+
+Assignments, quizzes with their questions and options, resources and the
+grading scheme are copied with one ``bulk_create`` per model; new primary keys
+are mapped from the old ones so children point at the copied parents.
+Deadlines and quiz windows move by the difference between the two start
+dates. Uploaded files are shared by storage name, not copied (lms/purge.py
+only deletes a file once no row references it). Students, submissions,
+attempts, attendance and discussions are not copied.
+
+``bulk_create`` sends no signals, so what the save handlers would have done
+is done once at the end: recount the counters, queue the full-text index of
+the new classroom and start its cache generation.
+"""
+import time
+
+from django.db import transaction
+
+from . import caching, content_index, counters
+from .models import Assignment, Classroom, GradingScheme, Option, Question, Quiz, Resource
+
+
+@transaction.atomic
+def clone_classroom(source, code, name=None, start_date=None, teacher=None):
+    """
+    Create a new classroom ``code`` with a copy of ``source``'s content.
+    Returns ``(classroom, {label: rows copied}, seconds)``.
+    """
+    started = time.monotonic()
+    start_date = start_date or source.start_date
+    shift = start_date - source.start_date
+
+    classroom = Classroom.objects.create(
+        name=name or source.name,
+        code=code,
+        description=source.description,
+        teacher=teacher or source.teacher,
+        start_date=start_date,
+    )
+
+    assignments = Assignment.objects.bulk_create([
+        Assignment(
+            classroom=classroom,
+            title=a.title,
+            description=a.description,
+            deadline=a.deadline + shift,
+            visible=a.visible,
+            attachment=a.attachment.name or None,
+        )
+        for a in source.assignments.order_by('id')
+    ])
+
+    old_quizzes = list(source.quizzes.order_by('id'))
+    new_quizzes = Quiz.objects.bulk_create([
+        Quiz(
+            classroom=classroom,
+            title=q.title,
+            description=q.description,
+            start_time=q.start_time + shift,
+            end_time=q.end_time + shift,
+            allow_multiple_correct=q.allow_multiple_correct,
+            visible=q.visible,
+        )
+        for q in old_quizzes
+    ])
+    quiz_ids = {old.id: new.id for old, new in zip(old_quizzes, new_quizzes)}
+
+    old_questions = list(
+        Question.objects.filter(quiz__classroom=source).order_by('id').values_list('id', 'quiz_id', 'text')
+    )
+    new_questions = Question.objects.bulk_create([
+        Question(quiz_id=quiz_ids[quiz_id], text=text) for _, quiz_id, text in old_questions
+    ])
+    question_ids = {old[0]: new.id for old, new in zip(old_questions, new_questions)}
+
+    options = Option.objects.bulk_create([
+        Option(question_id=question_ids[question_id], text=text, is_correct=is_correct)
+        for question_id, text, is_correct in Option.objects.filter(
+            question__quiz__classroom=source
+        ).order_by('id').values_list('question_id', 'text', 'is_correct')
+    ])
+
+    resources = Resource.objects.bulk_create([
+        Resource(
+            classroom=classroom,
+            title=r.title,
+            description=r.description,
+            file=r.file.name or None,
+            uploaded_by=classroom.teacher,
+        )
+        for r in source.resources.order_by('id')
+    ])
+
+    scheme = GradingScheme.objects.filter(classroom=source).first()
+    if scheme is not None:
+        scheme.pk = None
+        scheme.classroom = classroom
+        scheme.save()
+
+    counters.recount(classroom)
+    content_index.schedule(classroom.id)
+    caching.bump(classroom.id)
+
+    copied = {
+        'assignments': len(assignments),
+        'quizzes': len(new_quizzes),
+        'questions': len(new_questions),
+        'options': len(options),
+        'resources': len(resources),
+    }
+    return classroom, copied, time.monotonic() - started
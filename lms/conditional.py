@@ -0,0 +1,160 @@
+# lms/conditional.py
+"""
+ETag / Last-Modified support for the student course listing pages.
+
+For each page the freshness state -- newest row timestamps and row counts of
+the listed content, the last deadline / quiz window that has ticked past, and
+the requesting student's own submission or attempt state -- is read in a
+single SELECT made of scalar MAX/COUNT subqueries. Combined with the
+classroom's cache generation (lms/caching.py, which also catches deletes) it
+gives an ETag and a Last-Modified date, so ``django.views.decorators.http.condition``
+can answer 304 before the view renders anything.
+
+The pages carry CSRF tokens, and Django rotates the CSRF secret (and the
+session key) at login, so both are part of the ETag: a page cached before
+logging out and in again is never answered with a 304.
+
+Pages with flash messages waiting to be shown are never treated as unchanged.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from django.contrib import messages
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery, Sum
+from django.middleware.csrf import get_token
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import caching
+from .models import Assignment, Classroom, Quiz, QuizAttempt, Resource, Submission
+
+
+def _agg(queryset, classroom_path, expression):
+    """Scalar subquery: ``expression`` aggregated over ``queryset`` rows of the outer classroom."""
+    return Subquery(
+        queryset.filter(**{classroom_path: OuterRef('pk')})
+        .values(classroom_path)
+        .annotate(value=expression)
+        .values('value')[:1]
+    )
+
+
+def _page_state(kind, user_id, now):
+    if kind == 'assignments':
+        submissions = Submission.objects.filter(student_id=user_id)
+        return {
+            'latest': _agg(Assignment.objects.all(), 'classroom', Max('updated_at')),
+            'count': _agg(Assignment.objects.all(), 'classroom', Count('pk')),
+            'passed': _agg(Assignment.objects.filter(deadline__lte=now), 'classroom', Max('deadline')),
+            'mine_latest': _agg(submissions, 'assignment__classroom', Max('submitted_at')),
+            'mine_resubmitted': _agg(submissions, 'assignment__classroom', Max('last_resubmitted_at')),
+            'mine_count': _agg(submissions, 'assignment__classroom', Count('pk')),
+            'mine_marks': _agg(submissions, 'assignment__classroom', Sum('marks')),
+            'mine_graded': _agg(
+                submissions, 'assignment__classroom',
+                Count('pk', filter=Q(graded=True), output_field=IntegerField()),
+            ),
+            'mine_released': _agg(
+                submissions, 'assignment__classroom',
+                Count('pk', filter=Q(released=True), output_field=IntegerField()),
+            ),
+        }
+    if kind == 'resources':
+        return {
+            'latest': _agg(Resource.objects.all(), 'classroom', Max('uploaded_at')),
+            'count': _agg(Resource.objects.all(), 'classroom', Count('pk')),
+        }
+    if kind == 'quizzes':
+        quizzes = Quiz.objects.filter(visible=True)
+        attempts = QuizAttempt.objects.filter(student_id=user_id)
+        return {
+            'latest': _agg(Quiz.objects.all(), 'classroom', Max('updated_at')),
+            'count': _agg(quizzes, 'classroom', Count('pk')),
+            'opened': _agg(quizzes.filter(start_time__lte=now), 'classroom', Max('start_time')),
+            'closed': _agg(quizzes.filter(end_time__lte=now), 'classroom', Max('end_time')),
+            'mine_latest': _agg(attempts, 'quiz__classroom', Max('submitted_at')),
+            'mine_count': _agg(attempts, 'quiz__classroom', Count('pk')),
+            'mine_score': _agg(attempts, 'quiz__classroom', Sum('score')),
+        }
+    raise ValueError(f"Unknown page kind: {kind}")
+
+
+def _state_query(request, kind, class_id):
+    return Classroom.objects.filter(pk=class_id).values(
+        'teacher_id', **_page_state(kind, request.user.id, timezone.now())
+    )
+
+
+def _client(request):
+    """What ties a rendered page to the browser session: the CSRF secret its forms use, and the session key."""
+    get_token(request)  # the page's {% csrf_token %} would create the secret anyway; it must be in the ETag
+    session = getattr(request, 'session', None)
+    return request.META['CSRF_COOKIE'], session and session.session_key
+
+
+def _result(request, kind, state, generation):
+    """(etag, last_modified) from the page state row and the classroom's cache generation."""
+    fingerprint = repr((kind, request.user.id, _client(request), generation, sorted(state.items())))
+    etag = hashlib.md5(fingerprint.encode()).hexdigest()
+
+    stamps = [v for v in state.values() if isinstance(v, datetime)]
+    stamps.append(datetime.fromtimestamp(generation / 1e9, tz=dt_timezone.utc))
+    return etag, max(stamps)
+
+
+def _freshness(request, kind, class_id):
+    """(etag, last_modified) for a page, computed once per request; (None, None) = always render."""
+    memo = request.__dict__.setdefault('_lms_freshness', {})
+    if kind in memo:
+        return memo[kind]
+
+    result = (None, None)
+    if not len(messages.get_messages(request)):
+        state = _state_query(request, kind, class_id).first()
+        if state is not None:
+            result = _result(request, kind, state, caching.generation(class_id))
+    memo[kind] = result
+    return result
+
+
+async def _afreshness(request, kind, class_id):
+    """``_freshness()`` on the async ORM; the request's principal must be resolved already."""
+    memo = request.__dict__.setdefault('_lms_freshness', {})
+    if kind not in memo:
+        result = (None, None)
+        if not len(messages.get_messages(request)):
+            state = await _state_query(request, kind, class_id).afirst()
+            if state is not None:
+                result = _result(request, kind, state, await caching.ageneration(class_id))
+        memo[kind] = result
+    return memo[kind]
+
+
+def etag(kind):
+    def etag_func(request, class_id, *args, **kwargs):
+        return _freshness(request, kind, class_id)[0]
+    return etag_func
+
+
+def last_modified(kind):
+    def last_modified_func(request, class_id, *args, **kwargs):
+        return _freshness(request, kind, class_id)[1]
+    return last_modified_func
+
+
+def acondition(kind):
+    """
+    ``condition(etag(kind), last_modified(kind))`` for async views. Django calls
+    the ETag functions synchronously, so the state is read on the async ORM first
+    and they only look it up.
+    """
+    def decorator(view):
+        conditioned = condition(etag_func=etag(kind), last_modified_func=last_modified(kind))(view)
+
+        @wraps(view)
+        async def wrapper(request, class_id, *args, **kwargs):
+            await _afreshness(request, kind, class_id)
+            return await conditioned(request, class_id, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,94 @@
+# lms/content_index.py
+"""
+Full-text search over the files of a classroom's resources and assignment
+attachments (index format and extraction in lms/fulltext.py).
+
+Saving or deleting a Resource or an Assignment queues an update of that
+classroom's index (lms/signals.py), at most one waiting per classroom. The
+update runs as a background job (lms/jobs.py), never in the request: the
+upload is answered first, and the file becomes searchable a moment later. Updates are incremental -- unchanged files are skipped by size,
+mtime and sha256 -- so scheduling one for every save stays cheap, and
+``manage.py index_content`` can be re-run at any time to finish or repair
+interrupted work.
+
+Indexes live under ``settings.LMS_SEARCH_INDEX_DIR``, one SQLite file per
+classroom; a purged classroom's index is deleted with it.
+"""
+import os
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from . import caching, fulltext, jobs
+from .models import Assignment, Resource
+
+
+def index_dir():
+    return str(getattr(settings, 'LMS_SEARCH_INDEX_DIR', os.path.join(settings.BASE_DIR, 'search_index')))
+
+
+def index_path(classroom_id):
+    return os.path.join(index_dir(), f"classroom-{classroom_id}.sqlite3")
+
+
+def sources(classroom_id):
+    """``[(storage name, path, title)]`` for every file the classroom's pages offer."""
+    files = {}
+    for model, field in ((Resource, 'file'), (Assignment, 'attachment')):
+        rows = model.objects.filter(classroom_id=classroom_id).exclude(**{field: ''}) \
+            .exclude(**{f'{field}__isnull': True}).values_list(field, 'title').order_by('pk')
+        for name, title in rows:
+            files.setdefault(name, (name, default_storage.path(name), title))
+    return list(files.values())
+
+
+# -----------------------------
+# UPDATING
+# -----------------------------
+def schedule(classroom_id):
+    """Queue an update of the classroom's index (joins the caller's transaction)."""
+    if classroom_id:
+        jobs.enqueue('index_classroom', key=f"index:{classroom_id}", classroom_id=classroom_id)
+
+
+def update(classroom_id):
+    """Update the classroom's index now. Returns ``fulltext.update()``'s counts."""
+    counts = fulltext.update(index_path(classroom_id), sources(classroom_id))
+    if counts['indexed'] or counts['removed']:
+        caching.bump(classroom_id)
+    return counts
+
+
+def remove(classroom_id):
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(index_path(classroom_id) + suffix)
+        except FileNotFoundError:
+            pass
+
+
+# -----------------------------
+# SEARCHING
+# -----------------------------
+def search(classroom, query, limit=50):
+    """Matching resources and assignments, best first: ``[{'title', 'kind', 'file_url', 'snippet'}]``."""
+    hits = fulltext.search(index_path(classroom.id), query, limit=limit)
+    if not hits:
+        return []
+    names = [name for name, _ in hits]
+    owners = {}
+    for assignment in Assignment.objects.filter(classroom=classroom, attachment__in=names):
+        owners.setdefault(assignment.attachment.name, (assignment.title, 'Assignment', assignment.attachment.url))
+    for resource in Resource.objects.filter(classroom=classroom, file__in=names):
+        owners[resource.file.name] = (resource.title, 'Resource', resource.file.url)
+
+    results = []
+    for name, snippet in hits:
+        if name not in owners:
+            continue  # deleted since the index was last updated
+        title, kind, file_url = owners[name]
+        snippet = escape(snippet).replace(fulltext.MATCH_START, '<mark>').replace(fulltext.MATCH_END, '</mark>')
+        results.append({'title': title, 'kind': kind, 'file_url': file_url, 'snippet': mark_safe(snippet)})
+    return results
@@ -0,0 +1,4 @@
+# lms/context_processors.py
+def principal(request):
+    """Expose ``request.principal`` to templates as ``principal``."""
+    return {'principal': getattr(request, 'principal', None)}
@@ -0,0 +1,94 @@
+# lms/counters.py
+"""
+Denormalized Classroom counters for the teacher dashboard.
+
+Views that add or remove enrollments, submissions, assignments or quizzes
+update the counters in the same transaction as the change:
+
+* ``adjust()``  applies exact +/- deltas with F() expressions (enrollments, grading).
+* ``recount()`` recomputes counters with one UPDATE ... SET = (subquery)
+  (assignment / quiz edits, and the time-based "open" / "upcoming" counts).
+
+Each teacher's dashboard fragment is cached under a version token that is
+replaced whenever one of their classrooms' counters change.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Assignment, Classroom, Enrollment, Quiz, Submission
+
+COUNTER_FIELDS = ('enrolled_count', 'ungraded_count', 'open_assignment_count', 'upcoming_quiz_count')
+
+
+# -----------------------------
+# DASHBOARD FRAGMENT VERSION
+# -----------------------------
+def _dashboard_key(teacher_id):
+    return f"lms:dashboard_version:{teacher_id}"
+
+
+def dashboard_version(teacher_id):
+    """Version token for a teacher's cached dashboard fragment."""
+    return cache.get_or_set(_dashboard_key(teacher_id), time.time_ns, None)
+
+
+def bump_dashboard(teacher_id):
+    if teacher_id:
+        transaction.on_commit(lambda: cache.set(_dashboard_key(teacher_id), time.time_ns(), None))
+
+
+# -----------------------------
+# COUNTER UPDATES
+# -----------------------------
+def adjust(classroom, **deltas):
+    """Apply ``field=delta`` increments, e.g. ``adjust(classroom, enrolled_count=1)``."""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    Classroom.objects.filter(pk=classroom.pk).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+    bump_dashboard(classroom.teacher_id)
+
+
+def _count(queryset, group_field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{group_field: OuterRef('pk')})
+            .values(group_field).annotate(n=Count('pk')).values('n')[:1],
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+def counter_expressions(now=None):
+    now = now or timezone.now()
+    return {
+        'enrolled_count': _count(Enrollment.objects.all(), 'classroom'),
+        'ungraded_count': _count(Submission.objects.filter(graded=False), 'assignment__classroom'),
+        'open_assignment_count': _count(Assignment.objects.filter(visible=True, deadline__gt=now), 'classroom'),
+        'upcoming_quiz_count': _count(Quiz.objects.filter(visible=True, end_time__gt=now), 'classroom'),
+    }
+
+
+def recount(classroom, fields=COUNTER_FIELDS):
+    """Recompute ``fields`` for one classroom from the source tables."""
+    expressions = counter_expressions()
+    Classroom.objects.filter(pk=classroom.pk).update(**{f: expressions[f] for f in fields})
+    bump_dashboard(classroom.teacher_id)
+
+
+def recount_all(classrooms=None):
+    """Refresh every counter (the refresh_classroom_counters job, so time-based counts don't go stale)."""
+    classrooms = classrooms if classrooms is not None else Classroom.objects.all()
+    teacher_ids = set(classrooms.values_list('teacher_id', flat=True))
+    updated = classrooms.update(**counter_expressions())
+    for teacher_id in teacher_ids:
+        bump_dashboard(teacher_id)
+    return updated
@@ -0,0 +1,115 @@
+# lms/derivatives.py
+"""
+Background derivatives of uploaded files: size, whether the file really is a
+PDF, its page count and a first-page thumbnail (lms/pdf.py).
+
+Saving a Submission, Assignment or Resource with a file queues a background
+job for that file in the same transaction (lms/signals.py, lms/jobs.py); the
+spool committer, which writes submissions with bulk queries, schedules its
+files itself. ``manage.py runworker`` does the work outside any request and
+writes one FileDerivative row per storage name when a file is done.
+Pages fetch the rows for all their files in one query, so rendering never
+opens a file.
+
+``manage.py generate_derivatives`` fills in files that have none yet (older
+uploads, or work lost when a process stopped).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+from . import caching, jobs, pdf
+from .models import Assignment, FileDerivative, Resource, Submission
+
+# (model, file field, lookup of the classroom id)
+SOURCES = [
+    (Submission, 'file', 'assignment__classroom_id'),
+    (Assignment, 'attachment', 'classroom_id'),
+    (Resource, 'file', 'classroom_id'),
+]
+
+
+# -----------------------------
+# SCHEDULING
+# -----------------------------
+def schedule(names):
+    """Queue derivative generation for the storage ``names`` that have none yet (joins the caller's transaction)."""
+    names = {name for name in names if name}
+    if names:
+        names -= set(FileDerivative.objects.filter(name__in=names).values_list('name', flat=True))
+    if names:
+        jobs.enqueue('derive_files', names=sorted(names))
+
+
+def store(name, info):
+    """Save one file's ``pdf.inspect()`` result and refresh the pages that show it."""
+    thumbnail = ''
+    if info['thumbnail']:
+        stem = os.path.splitext(os.path.basename(name))[0]
+        thumbnail = default_storage.save(f"thumbnails/{stem}.png", ContentFile(info['thumbnail']))
+    derivative, created = FileDerivative.objects.get_or_create(name=name, defaults={
+        'size': info['size'],
+        'is_pdf': info['is_pdf'],
+        'page_count': info['page_count'],
+        'thumbnail': thumbnail,
+        'error': info['error'],
+    })
+    if not created and thumbnail:
+        default_storage.delete(thumbnail)  # another worker got there first
+    for model, field, classroom_lookup in SOURCES:
+        for classroom_id in set(model.objects.filter(**{field: name}).values_list(classroom_lookup, flat=True)):
+            caching.bump(classroom_id)
+    return derivative
+
+
+# -----------------------------
+# READING / BACKFILL / CLEANUP
+# -----------------------------
+def for_names(names):
+    """{storage name: FileDerivative} for the given names, in one query."""
+    names = {name for name in names if name}
+    return {d.name: d for d in FileDerivative.objects.filter(name__in=names)} if names else {}
+
+
+async def afor_names(names):
+    """``for_names()`` on the async ORM."""
+    names = {name for name in names if name}
+    return {d.name: d async for d in FileDerivative.objects.filter(name__in=names)} if names else {}
+
+
+def missing_names():
+    """Names of uploaded files that have no derivative yet."""
+    names = set()
+    for model, field, _ in SOURCES:
+        names.update(model.objects.exclude(**{field: ''}).exclude(**{f'{field}__isnull': True})
+                     .values_list(field, flat=True).distinct())
+    return names - set(FileDerivative.objects.values_list('name', flat=True))
+
+
+def generate(names, workers=None):
+    """Generate derivatives for ``names`` now (``workers=1`` runs in-process). Returns the number stored."""
+    names = sorted(names)
+    paths = [default_storage.path(name) for name in names]
+    if workers == 1:
+        results = map(pdf.inspect, paths)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        results = pool.map(pdf.inspect, paths, chunksize=8)
+    try:
+        for name, info in zip(names, results):
+            store(name, info)
+    finally:
+        if workers != 1:
+            pool.shutdown()
+    return len(names)
+
+
+def remove(names):
+    """Forget the derivatives of deleted files, thumbnails included."""
+    derivatives = FileDerivative.objects.filter(name__in=set(names))
+    for thumbnail in derivatives.exclude(thumbnail='').values_list('thumbnail', flat=True):
+        default_storage.delete(thumbnail)
+    derivatives.delete()
@@ -1,6 +1,6 @@
 # lms/forms.py
 from django import forms
-from .models import Assignment, Quiz, Discussion, Reply, Profile
+from .models import Assignment, Quiz, Discussion, Reply, Profile, GradingScheme
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
 
@@ -45,6 +45,28 @@ class QuizForm(forms.ModelForm):
             "description": forms.Textarea(attrs={"rows": 3}),
         }
 
+class GradingSchemeForm(forms.ModelForm):
+    class Meta:
+        model = GradingScheme
+        fields = ['assignment_weight', 'assignment_policy', 'quiz_weight', 'quiz_policy', 'drop_count']
+        widgets = {
+            'assignment_weight': forms.NumberInput(attrs={'class': 'form-control bg-dark text-light border-secondary', 'step': '0.05', 'min': '0'}),
+            'quiz_weight': forms.NumberInput(attrs={'class': 'form-control bg-dark text-light border-secondary', 'step': '0.05', 'min': '0'}),
+            'assignment_policy': forms.Select(attrs={'class': 'form-select bg-dark text-light border-secondary'}),
+            'quiz_policy': forms.Select(attrs={'class': 'form-select bg-dark text-light border-secondary'}),
+            'drop_count': forms.NumberInput(attrs={'class': 'form-control bg-dark text-light border-secondary', 'min': '0'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        aw = cleaned_data.get('assignment_weight') or 0
+        qw = cleaned_data.get('quiz_weight') or 0
+        if aw < 0 or qw < 0:
+            raise forms.ValidationError("Weights cannot be negative.")
+        if aw + qw <= 0:
+            raise forms.ValidationError("At least one weight must be greater than zero.")
+        return cleaned_data
+
 class DiscussionForm(forms.ModelForm):
     class Meta:
         model = Discussion
@@ -0,0 +1,133 @@
+# lms/fulltext.py
+"""
+Per-classroom full-text indexes of uploaded files, in SQLite FTS5.
+
+Each classroom has its own index database (lms/content_index.py decides where),
+so indexing one course never takes a write lock that another course -- or the
+main database -- is waiting for, and a deleted course's index goes with one
+file. Two tables:
+
+* ``files``     what is indexed: storage name, size, mtime and sha256.
+* ``documents`` the FTS5 table: storage name, title and extracted text.
+
+``update()`` brings an index in line with the list of files it is given. A file
+whose size and mtime are unchanged is skipped without being read; a changed
+one is hashed, and only re-extracted when its sha256 differs. Every file is
+committed on its own, so an interrupted run resumes where it stopped.
+
+Nothing here imports Django, so ``update()`` can run in worker processes.
+"""
+import hashlib
+import os
+import re
+import sqlite3
+
+from . import pdf
+
+TEXT_EXTENSIONS = {'.txt', '.md', '.csv', '.py', '.c', '.cpp', '.h', '.java', '.js', '.html', '.sql', '.json'}
+READ_SIZE = 1024 * 1024
+MATCH_START, MATCH_END = '\x02', '\x03'  # snippet() markers; cannot occur in extracted text
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    name TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5(
+    name UNINDEXED, title, body, tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+_WORD = re.compile(r'\w+')
+
+
+def connect(index_path):
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+    db = sqlite3.connect(index_path, timeout=30)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.executescript(_SCHEMA)
+    return db
+
+
+def _sha256(path):
+    hasher = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(READ_SIZE), b''):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def extract(path):
+    """Searchable text of the file at ``path``: PDFs and plain-text types; '' for anything else."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in TEXT_EXTENSIONS and extension != '.pdf':
+        return ''
+    with open(path, 'rb') as f:
+        data = f.read()
+    if pdf.is_pdf(data):
+        return pdf.text(data)
+    return data.decode('utf-8', 'replace') if extension in TEXT_EXTENSIONS else ''
+
+
+def update(index_path, files):
+    """
+    Index ``files`` -- ``[(storage name, path, title)]``, everything the classroom
+    has -- and drop entries for names no longer listed.
+    Returns ``{'indexed', 'unchanged', 'removed', 'failed'}``.
+    """
+    counts = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+    db = connect(index_path)
+    try:
+        known = {row[0]: row[1:] for row in db.execute('SELECT name, size, mtime_ns, sha256 FROM files')}
+        titles = dict(db.execute('SELECT name, title FROM documents'))
+        for name, path, title in files:
+            try:
+                stat = os.stat(path)
+                size, mtime_ns = stat.st_size, stat.st_mtime_ns
+                previous = known.get(name)
+                if previous and previous[:2] == (size, mtime_ns) and titles.get(name) == title:
+                    counts['unchanged'] += 1
+                    continue
+                digest = _sha256(path)
+                with db:
+                    if previous and previous[2] == digest:
+                        # Same content (touched, or only retitled): no extraction
+                        db.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE name = ?', (size, mtime_ns, name))
+                        db.execute('UPDATE documents SET title = ? WHERE name = ?', (title, name))
+                        counts['unchanged'] += 1
+                        continue
+                    body = extract(path)
+                    db.execute('DELETE FROM documents WHERE name = ?', (name,))
+                    db.execute('INSERT INTO documents (name, title, body) VALUES (?, ?, ?)', (name, title, body))
+                    db.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', (name, size, mtime_ns, digest))
+                counts['indexed'] += 1
+            except Exception:  # a broken or vanished file must not stop the run; retried next time
+                counts['failed'] += 1
+
+        gone = set(known) - {name for name, _, _ in files}
+        with db:
+            for name in gone:
+                db.execute('DELETE FROM documents WHERE name = ?', (name,))
+                db.execute('DELETE FROM files WHERE name = ?', (name,))
+        counts['removed'] = len(gone)
+    finally:
+        db.close()
+    return counts
+
+
+def search(index_path, query, limit=50):
+    """
+    ``[(storage name, snippet)]`` best match first; every word of ``query`` must occur (as a prefix).
+    Matches in the snippet are wrapped in ``MATCH_START`` / ``MATCH_END``.
+    """
+    words = _WORD.findall(query)
+    if not words or not os.path.exists(index_path):
+        return []
+    match = ' '.join(f'"{word}"*' for word in words)
+    db = connect(index_path)
+    try:
+        return db.execute(
+            "SELECT name, snippet(documents, 2, ?, ?, ' … ', 12) FROM documents "
+            "WHERE documents MATCH ? ORDER BY bm25(documents, 0, 5.0, 1.0) LIMIT ?",
+            (MATCH_START, MATCH_END, match, limit),
+        ).fetchall()
+    finally:
+        db.close()
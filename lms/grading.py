@@ -0,0 +1,140 @@
+# lms/grading.py
+"""
+Whole-class grade computation.
+
+Loads a classroom's submission marks and best quiz scores as dense
+student x item matrices (one row per enrolled student, one column per
+visible assignment / quiz) in a handful of queries, then applies the
+classroom's GradingScheme column-wise to every row at once.
+
+The same GradeBook powers the student grade card in class_detail,
+the teacher grade overview and the CSV export.
+"""
+from django.db.models import Max
+
+from .models import Assignment, Enrollment, GradingScheme, Quiz, QuizAttempt, Submission
+
+
+# -----------------------------
+# POLICIES (matrix -> vector)
+# -----------------------------
+def _average(matrix, n_items, drop_count=0):
+    if n_items == 0:
+        return [0.0] * len(matrix)
+    return [sum(row) / n_items for row in matrix]
+
+
+def _best(matrix, n_items, drop_count=0):
+    if n_items == 0:
+        return [0.0] * len(matrix)
+    return [max(row) for row in matrix]
+
+
+def _drop_lowest(matrix, n_items, drop_count=0):
+    # Never drop every item: keep at least one column
+    keep = max(n_items - drop_count, 1)
+    if n_items == 0:
+        return [0.0] * len(matrix)
+    return [sum(sorted(row, reverse=True)[:keep]) / keep for row in matrix]
+
+
+POLICIES = {
+    'average': _average,
+    'best': _best,
+    'drop_lowest': _drop_lowest,
+}
+
+
+def get_scheme(classroom):
+    """Return the classroom's scheme, or an unsaved default (50% assignments avg, 50% best quiz)."""
+    try:
+        return GradingScheme.objects.get(classroom=classroom)
+    except GradingScheme.DoesNotExist:
+        return GradingScheme(classroom=classroom)
+
+
+# -----------------------------
+# GRADE BOOK
+# -----------------------------
+class GradeBook:
+    """
+    Dense grade matrices for a classroom.
+
+    ``assignment_matrix[i][j]`` is student i's marks for assignment j and
+    ``quiz_matrix[i][k]`` their best score for quiz k. Missing work counts as 0.
+    """
+
+    def __init__(self, classroom, scheme, students, assignments, quizzes, assignment_matrix, quiz_matrix):
+        self.classroom = classroom
+        self.scheme = scheme
+        self.students = students
+        self.assignments = assignments
+        self.quizzes = quizzes
+        self.assignment_matrix = assignment_matrix
+        self.quiz_matrix = quiz_matrix
+
+        assignment_policy = POLICIES.get(scheme.assignment_policy, _average)
+        quiz_policy = POLICIES.get(scheme.quiz_policy, _best)
+        self.assignment_scores = assignment_policy(assignment_matrix, len(assignments), scheme.drop_count)
+        self.quiz_scores = quiz_policy(quiz_matrix, len(quizzes), scheme.drop_count)
+
+        aw, qw = scheme.assignment_weight, scheme.quiz_weight
+        self.final_grades = [
+            aw * a + qw * q for a, q in zip(self.assignment_scores, self.quiz_scores)
+        ]
+
+    def rows(self):
+        """Yield one dict per student, ready for templates and CSV export."""
+        for i, student in enumerate(self.students):
+            yield {
+                'student': student,
+                'assignment_marks': self.assignment_matrix[i],
+                'quiz_scores': self.quiz_matrix[i],
+                'assignment_score': round(self.assignment_scores[i], 2),
+                'quiz_score': round(self.quiz_scores[i], 2),
+                'final_grade': round(self.final_grades[i], 2),
+            }
+
+    def row_for(self, student_id):
+        for row in self.rows():
+            if row['student'].id == student_id:
+                return row
+        return None
+
+
+def compute_classroom_grades(classroom, student_ids=None):
+    """
+    Build a GradeBook for every enrolled student (or only ``student_ids``).
+    Runs a fixed number of queries regardless of class size.
+    """
+    scheme = get_scheme(classroom)
+
+    enrollments = Enrollment.objects.filter(classroom=classroom).select_related('student__profile')
+    if student_ids is not None:
+        enrollments = enrollments.filter(student_id__in=student_ids)
+    students = [e.student for e in enrollments.order_by('student__username')]
+    row_index = {s.id: i for i, s in enumerate(students)}
+
+    assignments = list(Assignment.objects.filter(classroom=classroom, visible=True).order_by('deadline'))
+    quizzes = list(Quiz.objects.filter(classroom=classroom, visible=True).order_by('end_time'))
+    assignment_col = {a.id: j for j, a in enumerate(assignments)}
+    quiz_col = {q.id: k for k, q in enumerate(quizzes)}
+
+    assignment_matrix = [[0.0] * len(assignments) for _ in students]
+    quiz_matrix = [[0.0] * len(quizzes) for _ in students]
+
+    marks = Submission.objects.filter(
+        assignment__in=list(assignment_col),
+        student_id__in=list(row_index),
+    ).values_list('student_id', 'assignment_id', 'marks')
+    for student_id, assignment_id, value in marks:
+        assignment_matrix[row_index[student_id]][assignment_col[assignment_id]] = value or 0.0
+
+    best_scores = QuizAttempt.objects.filter(
+        quiz__in=list(quiz_col),
+        student_id__in=list(row_index),
+    ).values('student_id', 'quiz_id').annotate(best=Max('score')).order_by()
+    for row in best_scores:
+        quiz_matrix[row_index[row['student_id']]][quiz_col[row['quiz_id']]] = row['best'] or 0.0
+
+    return GradeBook(classroom, scheme, students, assignments, quizzes, assignment_matrix, quiz_matrix)
@@ -0,0 +1,213 @@
+# lms/jobs.py
+"""
+A small database-backed job queue: the Job table is the broker.
+
+Work that does not have to finish inside a request is registered as a task
+(``@task``, see lms/tasks.py) and queued with ``enqueue()``. Enqueueing inside
+a transaction commits the job together with the rows it is about, so a job
+can never refer to work that was rolled back. ``manage.py runworker`` runs
+the queued jobs in N processes.
+
+Claiming is a compare-and-swap: a worker picks the most urgent due job and
+flips it from queued to running with ``UPDATE ... WHERE status = 'queued'``.
+SQLite runs each UPDATE under its single write lock, so exactly one worker's
+update matches and the others move on to the next candidate; no row locks
+(which SQLite does not have) are needed.
+
+* Retries: a failing job is queued again after an exponential backoff, until
+  ``max_attempts`` is used up; then it stays ``failed`` with its traceback.
+* Leases: a job still ``running`` after ``LMS_JOB_LEASE`` seconds belongs to a
+  worker that died; it is queued again (counting as an attempt).
+* Keys: at most one *queued* job per non-empty key, so "recount classroom 7"
+  queued by fifty requests runs once. A job that is already running does not
+  block a new one, which picks up whatever changed meanwhile.
+* Scheduling: ``run_at`` delays a job; tasks registered with ``every`` are
+  recurring and put themselves back in the queue after each run.
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 10  # seconds before the first retry; doubles with every attempt
+BACKOFF_MAX = 60 * 60
+CLAIM_CANDIDATES = 10
+
+
+class Task:
+    def __init__(self, name, function, priority, max_attempts, every):
+        self.name = name
+        self.function = function
+        self.priority = priority
+        self.max_attempts = max_attempts
+        self.every = every
+
+
+_tasks = {}
+
+
+def task(name=None, *, priority=0, max_attempts=5, every=None):
+    """Register a function as a task; ``every`` (a timedelta) makes it recurring."""
+    def register(function):
+        task_name = name or function.__name__
+        _tasks[task_name] = Task(task_name, function, priority, max_attempts, every)
+        return function
+    return register
+
+
+# -----------------------------
+# QUEUEING
+# -----------------------------
+def enqueue(name, *, key='', priority=None, run_at=None, **kwargs):
+    """
+    Queue task ``name`` with JSON-serializable ``kwargs``. Joins the caller's transaction.
+    With a ``key`` that is already queued, nothing is written.
+    """
+    registered_task = _tasks[name]
+    if key and Job.objects.filter(key=key, status=Job.QUEUED).exists():
+        return  # a read: the common case under load takes no write lock
+    job = Job(
+        name=name,
+        kwargs=kwargs,
+        key=key,
+        priority=registered_task.priority if priority is None else priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=registered_task.max_attempts,
+    )
+    # INSERT OR IGNORE: a concurrent enqueue of the same key loses silently
+    Job.objects.bulk_create([job], ignore_conflicts=bool(key))
+
+
+def ensure_recurring():
+    """Queue every recurring task that has no queued or running job yet."""
+    for registered_task in _tasks.values():
+        if registered_task.every is None:
+            continue
+        key = f"every:{registered_task.name}"
+        if not Job.objects.filter(key=key, status__in=[Job.QUEUED, Job.RUNNING]).exists():
+            enqueue(registered_task.name, key=key)
+
+
+# -----------------------------
+# CLAIMING / RUNNING
+# -----------------------------
+def _lease():
+    return timedelta(seconds=getattr(settings, 'LMS_JOB_LEASE', 30 * 60))
+
+
+def release_expired(now=None):
+    """Queue again the jobs whose worker stopped without finishing them. Returns the count."""
+    now = now or timezone.now()
+    expired = Job.objects.filter(status=Job.RUNNING, locked_at__lt=now - _lease())
+    failed = expired.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, finished_at=now, last_error="Worker stopped while running the job (lease expired).",
+    )
+    return failed + expired.update(status=Job.QUEUED, locked_by='', locked_at=None, run_at=now)
+
+
+def claim(worker, now=None):
+    """Take the most urgent due job for ``worker``; None when nothing is due."""
+    now = now or timezone.now()
+    candidates = list(
+        Job.objects.filter(status=Job.QUEUED, run_at__lte=now)
+        .order_by('-priority', 'run_at', 'pk').values_list('pk', flat=True)[:CLAIM_CANDIDATES]
+    )
+    for pk in candidates:
+        taken = Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker, locked_at=now, attempts=F('attempts') + 1,
+        )
+        if taken:
+            return Job.objects.get(pk=pk)
+    return None
+
+
+def backoff(attempts):
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX))
+
+
+def run(job):
+    """Run a claimed job and record the outcome. Returns True when it succeeded."""
+    registered_task = _tasks.get(job.name)
+    started = time.monotonic()
+    try:
+        if registered_task is None:
+            raise LookupError(f"No task is registered as {job.name!r}")
+        registered_task.function(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception("Job %s (%s) failed on attempt %s", job.pk, job.name, job.attempts)
+        _finish(job, registered_task, error)
+        return False
+    logger.info("Job %s (%s) done in %.2fs", job.pk, job.name, time.monotonic() - started)
+    _finish(job, registered_task, '')
+    return True
+
+
+def _finish(job, registered_task, error):
+    now = timezone.now()
+    update = {'last_error': error[-4000:]}
+    requeue = {'status': Job.QUEUED, 'locked_by': '', 'locked_at': None}
+    if registered_task is not None and registered_task.every is not None:
+        # Recurring: back in the queue for the next interval, failed or not
+        update.update(requeue, run_at=now + registered_task.every, attempts=0)
+    elif error and job.attempts < job.max_attempts:
+        update.update(requeue, run_at=now + backoff(job.attempts))
+    else:
+        update.update(status=Job.FAILED if error else Job.DONE, finished_at=now)  # locked_by: who ran it
+    # Only while still ours: after an expired lease the job may belong to another worker
+    Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(**update)
+
+
+# -----------------------------
+# WORKER
+# -----------------------------
+def worker_name(number=0):
+    return f"{socket.gethostname()}:{os.getpid()}:{number}"
+
+
+def work(worker, stop=None, poll=None, once=False):
+    """
+    Claim and run jobs until ``stop`` (a threading.Event) is set.
+    With ``once``, return as soon as no job is due. Returns the number of jobs run.
+    """
+    stop = stop or threading.Event()
+    poll = poll if poll is not None else getattr(settings, 'LMS_JOB_POLL_INTERVAL', 1.0)
+    done = 0
+    last_release = 0.0
+    while not stop.is_set():
+        if time.monotonic() - last_release > 60:
+            release_expired()
+            last_release = time.monotonic()
+        job = claim(worker)
+        if job is None:
+            if once:
+                break
+            stop.wait(poll)
+            continue
+        run(job)
+        done += 1
+    return done
+
+
+def run_process(number, poll):
+    """Entry point of one ``runworker`` child process (forked after the parent closed its connections)."""
+    stop = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.set())  # finish the current job, then exit
+    try:
+        work(worker_name(number), stop=stop, poll=poll)
+    finally:
+        connection.close()
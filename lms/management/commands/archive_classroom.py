@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+from django.utils import timezone
+
+from lms.archive import ArchiveError, archive_classroom
+from lms.models import Classroom
+from lms.purge import CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Move finished classrooms' attendance, submissions, quiz attempts and replies into archive files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('codes', nargs='*', help="Classroom codes to archive.")
+        parser.add_argument('--idle-days', type=int,
+                            help="Archive every classroom whose last deadline / quiz closed more than N days ago.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        classrooms = Classroom.objects.filter(archived_at__isnull=True)
+        if options['codes']:
+            classrooms = classrooms.filter(code__in=options['codes'])
+        elif options['idle_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['idle_days'])
+            classrooms = classrooms.annotate(
+                last_deadline=Max('assignments__deadline'),
+                last_quiz=Max('quizzes__end_time'),
+            ).filter(start_date__lt=cutoff.date()).exclude(last_deadline__gte=cutoff).exclude(last_quiz__gte=cutoff)
+        else:
+            raise CommandError("Give classroom codes or --idle-days.")
+
+        archived = 0
+        for classroom in classrooms:
+            try:
+                counts = archive_classroom(classroom, chunk_size=options['chunk_size'])
+            except (ArchiveError, OSError) as exc:
+                self.stderr.write(f"{classroom.code}: {exc}")
+                continue
+            details = ', '.join(f"{label}: {n}" for label, n in counts.items() if n)
+            self.stdout.write(f"Archived {classroom.code} ({details or 'no rows'})")
+            archived += 1
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} classrooms."))
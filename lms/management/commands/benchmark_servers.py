@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms import server_benchmark
+from lms.models import Classroom
+
+
+class Command(BaseCommand):
+    help = ("Compare the concurrent throughput of the resources, discussions and quiz list pages: "
+            "sync views under WSGI against async views under ASGI (lms/server_benchmark.py).")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=600, help="Requests per run (default: 600).")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 10, 50],
+                            help="Concurrent clients; one run per value (default: 1 10 50).")
+        parser.add_argument('--classroom', type=int, help="Classroom to request (default: a generated one).")
+        parser.add_argument('--student', help="Username of an enrolled student (with --classroom).")
+        # Internal: run one server mode in this process and print JSON results
+        parser.add_argument('--run', choices=['wsgi', 'asgi'], help='(internal)')
+        parser.add_argument('--cookie', help='(internal)')
+
+    def handle(self, *args, **options):
+        if options['run']:
+            return self.run_mode(options)
+
+        generated = None
+        if options['classroom']:
+            classroom = Classroom.objects.filter(pk=options['classroom']).first()
+            student = classroom and classroom.enrollments.filter(student__username=options['student']) \
+                .select_related('student').first()
+            if student is None:
+                raise CommandError("--classroom needs --student, the username of a student enrolled in it.")
+            student = student.student
+        else:
+            classroom, student = generated = server_benchmark.dataset()
+        cookie = server_benchmark.session_cookie(student)
+        try:
+            self.stdout.write(
+                f"Classroom {classroom.code}: {classroom.resources.count()} resources, "
+                f"{classroom.discussions.count()} discussions, {classroom.quizzes.count()} quizzes; "
+                f"{options['requests']} requests per run, as {student.username}."
+            )
+            rows = []
+            for mode in ('wsgi', 'asgi'):
+                rows += self.run_child(mode, classroom, cookie, options)
+        finally:
+            server_benchmark.end_session(cookie)
+            if generated:
+                server_benchmark.remove(*generated)
+
+        self.stdout.write(f"{'server':<8}{'clients':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'failed':>8}")
+        for row in sorted(rows, key=lambda row: (row['concurrency'], row['mode'])):
+            self.stdout.write(
+                f"{row['mode']:<8}{row['concurrency']:>8}{row['throughput']:>10}"
+                f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['failures']:>8}"
+            )
+
+    def run_child(self, mode, classroom, cookie, options):
+        environment = dict(os.environ, LMS_ASYNC_VIEWS='1' if mode == 'asgi' else '0')
+        command = [
+            sys.executable, sys.argv[0], 'benchmark_servers', '--run', mode, '--cookie', cookie,
+            '--classroom', str(classroom.pk), '--requests', str(options['requests']),
+            '--concurrency', *map(str, options['concurrency']),
+        ]
+        finished = subprocess.run(command, env=environment, capture_output=True, text=True)
+        if finished.returncode:
+            raise CommandError(f"The {mode} run failed:\n{finished.stderr}")
+        return [json.loads(line) for line in finished.stdout.splitlines() if line.startswith('{')]
+
+    def run_mode(self, options):
+        urls = server_benchmark.paths(options['classroom'])
+        run = server_benchmark.run_wsgi if options['run'] == 'wsgi' else server_benchmark.run_asgi
+        for concurrency in options['concurrency']:
+            result = run(urls, options['cookie'], options['requests'], concurrency)
+            self.stdout.write(json.dumps({'mode': options['run'], 'concurrency': concurrency, **result}))
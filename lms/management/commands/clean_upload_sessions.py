@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from lms.uploads import clean_stale
+
+
+class Command(BaseCommand):
+    help = "Remove resumable resource uploads that have been idle too long, and their staging files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help="Idle time after which an upload is abandoned.")
+
+    def handle(self, *args, **options):
+        sessions, files = clean_stale(timedelta(hours=options['hours']))
+        self.stdout.write(self.style.SUCCESS(f"Removed {sessions} upload sessions and {files} staging files."))
@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms import spool
+
+
+class Command(BaseCommand):
+    help = "Commit spooled assignment uploads to the database in batches (also retries abandoned batches)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--watch', type=float, default=0,
+                            help="Keep running, checking the spool every N seconds.")
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            committed = spool.commit_pending(batch_size=options['batch_size'])
+            if committed or not options['watch']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Committed {committed} uploads in {time.monotonic() - started:.2f}s "
+                    f"({spool.pending_count()} pending)."
+                ))
+            if not options['watch']:
+                return
+            time.sleep(options['watch'])
@@ -0,0 +1,120 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from lms import analytics
+from lms.attendance import _days, _to_bytes, _to_int
+from lms.models import Attendance, AttendanceBitmap, Classroom, ClassSession
+
+
+class Command(BaseCommand):
+    help = "Convert attendance between per-day rows and per-term bitmaps."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['bitmap', 'rows'], required=True,
+                            help="Target storage layout.")
+        parser.add_argument('--classroom', type=int,
+                            help="Only convert this classroom id (default: all).")
+        parser.add_argument('--keep-source', action='store_true',
+                            help="Do not delete the source rows after converting.")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['to'] == 'bitmap':
+                created = self.rows_to_bitmap(options)
+            else:
+                created = self.bitmap_to_rows(options)
+
+        # Cached analytics were read from the old layout
+        classrooms = Classroom.all_objects.all()
+        if options['classroom']:
+            classrooms = classrooms.filter(pk=options['classroom'])
+        for classroom_id in classrooms.values_list('pk', flat=True):
+            analytics.invalidate(classroom_id)
+
+        self.stdout.write(self.style.SUCCESS(created))
+        self.stdout.write(
+            f"Set LMS_ATTENDANCE_STORAGE = '{options['to']}' in settings to read and write the new layout."
+        )
+
+    def rows_to_bitmap(self, options):
+        records = Attendance.objects.all()
+        bitmaps = AttendanceBitmap.objects.all()
+        if options['classroom']:
+            records = records.filter(enrollment__classroom_id=options['classroom'])
+            bitmaps = bitmaps.filter(enrollment__classroom_id=options['classroom'])
+        bitmaps.delete()
+
+        batch, sessions = [], set()
+        current = None  # [enrollment_id, term_start, held, present]
+        total = 0
+
+        def flush(row):
+            if row:
+                batch.append(AttendanceBitmap(
+                    enrollment_id=row[0], term_start=row[1],
+                    held=_to_bytes(row[2]), present=_to_bytes(row[3]),
+                ))
+            if len(batch) >= options['batch_size'] or (row is None and batch):
+                AttendanceBitmap.objects.bulk_create(batch)
+                batch.clear()
+
+        rows = records.order_by('enrollment_id', 'date').values_list(
+            'enrollment_id', 'enrollment__classroom_id', 'enrollment__classroom__start_date', 'date', 'present'
+        )
+        for enrollment_id, classroom_id, start_date, day, present in rows.iterator(chunk_size=options['batch_size']):
+            if current is None or current[0] != enrollment_id:
+                flush(current)
+                # Rows are date-ordered, so the first one is the earliest day for this enrollment
+                current = [enrollment_id, min(start_date, day), 0, 0]
+            bit = 1 << (day - current[1]).days
+            current[2] |= bit
+            if present:
+                current[3] |= bit
+            sessions.add((classroom_id, day))
+            total += 1
+        flush(current)
+        flush(None)
+
+        ClassSession.objects.bulk_create(
+            [ClassSession(classroom_id=c, date=d) for c, d in sessions],
+            batch_size=options['batch_size'],
+            ignore_conflicts=True,
+        )
+        if not options['keep_source']:
+            records.delete()
+        return f"Packed {total} attendance rows into bitmaps ({len(sessions)} class sessions)."
+
+    def rows_from_bitmap(self, bitmap):
+        present = _to_int(bitmap.present)
+        for day in _days(bitmap.term_start, _to_int(bitmap.held)):
+            yield Attendance(
+                enrollment_id=bitmap.enrollment_id,
+                date=day,
+                present=bool(present & (1 << (day - bitmap.term_start).days)),
+            )
+
+    def bitmap_to_rows(self, options):
+        bitmaps = AttendanceBitmap.objects.all()
+        records = Attendance.objects.all()
+        sessions = ClassSession.objects.all()
+        if options['classroom']:
+            bitmaps = bitmaps.filter(enrollment__classroom_id=options['classroom'])
+            records = records.filter(enrollment__classroom_id=options['classroom'])
+            sessions = sessions.filter(classroom_id=options['classroom'])
+        records.delete()
+
+        batch, total = [], 0
+        for bitmap in bitmaps.iterator(chunk_size=options['batch_size']):
+            for record in self.rows_from_bitmap(bitmap):
+                batch.append(record)
+                total += 1
+            if len(batch) >= options['batch_size']:
+                Attendance.objects.bulk_create(batch, ignore_conflicts=True)
+                batch = []
+        Attendance.objects.bulk_create(batch, ignore_conflicts=True)
+
+        if not options['keep_source']:
+            bitmaps.delete()
+            sessions.delete()
+        return f"Expanded bitmaps into {total} attendance rows."
@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms.derivatives import generate, missing_names
+
+
+class Command(BaseCommand):
+    help = "Extract page counts, sizes and thumbnails for uploaded files that have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        names = missing_names()
+        done = generate(names, workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {done} files in {time.monotonic() - started:.2f}s."))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms.content_index import update
+from lms.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Bring the full-text indexes of classroom files up to date (only new or changed files are read)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classroom', type=int, action='append', help="Classroom id (repeatable; default: all).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        classrooms = Classroom.objects.order_by('pk')
+        if options['classroom']:
+            classrooms = classrooms.filter(pk__in=options['classroom'])
+        totals = {'indexed': 0, 'unchanged': 0, 'removed': 0, 'failed': 0}
+        for classroom_id in classrooms.values_list('pk', flat=True):
+            counts = update(classroom_id)
+            for key in totals:
+                totals[key] += counts[key]
+        message = ", ".join(f"{count} {key}" for key, count in totals.items())
+        self.stdout.write(self.style.SUCCESS(f"{message} in {time.monotonic() - started:.2f}s."))
+        if totals['failed']:
+            self.stderr.write("Failed files are retried on the next run.")
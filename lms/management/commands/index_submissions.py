@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from lms.similarity import index, missing_names
+
+
+class Command(BaseCommand):
+    help = "Compute similarity signatures for submitted files that have none yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        done = index(missing_names(), workers=options['workers'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {done} files in {time.monotonic() - started:.2f}s."))
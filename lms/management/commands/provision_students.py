@@ -0,0 +1,49 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.models import Classroom
+from lms.provisioning import ProvisioningError, provision_students, read_rows
+
+
+class Command(BaseCommand):
+    help = "Create student accounts from a CSV with columns reg_no,name,email,department."
+
+    def add_arguments(self, parser):
+        parser.add_argument('csv_path')
+        parser.add_argument('--classroom', help="Enroll the students into the classroom with this code.")
+        parser.add_argument('--credentials-out',
+                            help="Write reg_no,username,password of the new accounts to this CSV file.")
+        parser.add_argument('--password', help="Use this initial password for every account instead of random ones.")
+        parser.add_argument('--workers', type=int, help="Password hashing processes (default: one per CPU).")
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        classroom = None
+        if options['classroom']:
+            try:
+                classroom = Classroom.objects.get(code=options['classroom'])
+            except Classroom.DoesNotExist:
+                raise CommandError(f"No classroom with code {options['classroom']}")
+
+        try:
+            with open(options['csv_path'], encoding='utf-8-sig') as f:
+                rows = read_rows(f.read())
+        except (OSError, ProvisioningError) as exc:
+            raise CommandError(exc)
+
+        result = provision_students(
+            rows,
+            classroom=classroom,
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+            password=options['password'],
+        )
+
+        if options['credentials_out']:
+            with open(options['credentials_out'], 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(['reg_no', 'username', 'password'])
+                writer.writerows(result.credentials)
+
+        self.stdout.write(self.style.SUCCESS(result.summary()))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from lms.purge import CHUNK_SIZE, pending_classrooms, purge_classroom
+
+
+class Command(BaseCommand):
+    help = "Purge classrooms marked for deletion (resumes purges that were interrupted)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        purged = 0
+        for classroom_id, code in pending_classrooms().values_list('id', 'code'):
+            summary = purge_classroom(classroom_id, chunk_size=options['chunk_size'])
+            details = ', '.join(f"{label}: {n}" for label, n in summary.items())
+            self.stdout.write(f"Purged {code} ({details})")
+            purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} classrooms."))
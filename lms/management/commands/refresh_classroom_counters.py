@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lms.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = "Recompute the denormalized Classroom counters now (the worker also does every 15 minutes)."
+
+    def handle(self, *args, **options):
+        updated = recount_all()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed counters for {updated} classrooms."))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from lms.archive import ArchiveError, restore_classroom
+from lms.models import Classroom
+
+
+class Command(BaseCommand):
+    help = "Bring an archived classroom's rows back into the live tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument('code', help="Classroom code.")
+
+    def handle(self, *args, **options):
+        try:
+            classroom = Classroom.objects.get(code=options['code'])
+            restored = restore_classroom(classroom)
+        except Classroom.DoesNotExist:
+            raise CommandError(f"No classroom with code {options['code']}")
+        except (ArchiveError, OSError) as exc:
+            raise CommandError(exc)
+
+        details = ', '.join(f"{label}: {n}" for label, n in restored.items() if n)
+        self.stdout.write(self.style.SUCCESS(f"Restored {classroom.code} ({details or 'no rows'})."))
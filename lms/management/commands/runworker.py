@@ -0,0 +1,50 @@
+import multiprocessing
+import signal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from lms import jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (lms/jobs.py) until stopped with Ctrl-C / SIGTERM."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=1, help="Worker processes (default: 1).")
+        parser.add_argument('--poll', type=float, default=None,
+                            help="Seconds an idle worker waits before looking again (default: LMS_JOB_POLL_INTERVAL).")
+        parser.add_argument('--once', action='store_true', help="Run the jobs that are due, then exit.")
+
+    def handle(self, *args, **options):
+        jobs.ensure_recurring()
+        released = jobs.release_expired()
+        if released:
+            self.stdout.write(f"Re-queued {released} jobs left running by a stopped worker.")
+
+        if options['once'] or options['processes'] <= 1:
+            done = jobs.work(jobs.worker_name(), poll=options['poll'], once=options['once'])
+            self.stdout.write(self.style.SUCCESS(f"Ran {done} jobs."))
+            return
+
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError("--processes needs fork (Unix); start one runworker per worker instead.")
+        connections.close_all()  # children must open their own
+        context = multiprocessing.get_context('fork')
+        children = [
+            context.Process(target=jobs.run_process, args=(number, options['poll']), name=f"lms-worker-{number}")
+            for number in range(options['processes'])
+        ]
+        for child in children:
+            child.start()
+        self.stdout.write(f"Started {len(children)} worker processes.")
+
+        def stop(signum, frame):
+            for child in children:
+                if child.is_alive():
+                    child.terminate()  # SIGTERM: each child finishes its current job first
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+        for child in children:
+            child.join()
+        self.stdout.write(self.style.SUCCESS("All workers stopped."))
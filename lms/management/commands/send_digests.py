@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from lms.notifications import send_digests
+
+
+class Command(BaseCommand):
+    help = "Send the pending notification digests now (one e-mail per user, over one connection)."
+
+    def handle(self, *args, **options):
+        sent = send_digests()
+        self.stdout.write(self.style.SUCCESS(f"Sent {sent} digest e-mail(s)."))
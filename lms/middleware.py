@@ -0,0 +1,47 @@
+# lms/middleware.py
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.models import AnonymousUser
+from django.utils.functional import SimpleLazyObject
+
+from .principal import get_principal, user_from_principal
+
+
+class PrincipalMiddleware:
+    """
+    Sets ``request.principal`` from the session and serves ``request.user``
+    from it, so authenticated pages need one single-row auth check instead of
+    the User and Profile queries.
+
+    Must come after AuthenticationMiddleware. The admin keeps Django's regular
+    ``request.user``. Both are lazy and may query the database, so async
+    views resolve them with ``principal.aresolve()`` first.
+    """
+
+    sync_capable = True
+    async_capable = True  # nothing here blocks, so ASGI requests need no thread hop
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        self.install(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.install(request)
+        return await self.get_response(request)
+
+    def install(self, request):
+        auth_user = request.user  # Django's lazy user; only evaluated on a principal miss
+        principal = SimpleLazyObject(lambda: get_principal(request, auth_user))
+        request.principal = principal
+
+        if not request.path_info.startswith('/admin/'):
+            request.user = SimpleLazyObject(
+                lambda: user_from_principal(principal) if principal.is_authenticated else AnonymousUser()
+            )
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0011_alter_reply_parent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GradingScheme',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('assignment_weight', models.FloatField(default=0.5)),
+                ('quiz_weight', models.FloatField(default=0.5)),
+                ('assignment_policy', models.CharField(choices=[('average', 'Average'), ('best', 'Best of'), ('drop_lowest', 'Drop lowest')], default='average', max_length=20)),
+                ('quiz_policy', models.CharField(choices=[('average', 'Average'), ('best', 'Best of'), ('drop_lowest', 'Drop lowest')], default='best', max_length=20)),
+                ('drop_count', models.PositiveIntegerField(default=1)),
+                ('classroom', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='grading_scheme', to='lms.classroom')),
+            ],
+        ),
+    ]
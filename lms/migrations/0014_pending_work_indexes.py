@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0013_attendance_bitmap'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assignment',
+            index=models.Index(fields=['classroom', 'visible', 'deadline'], name='lms_assignm_classro_f5fa2a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quiz',
+            index=models.Index(fields=['classroom', 'visible', 'end_time'], name='lms_quiz_classro_5ec720_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'student'], name='lms_quizatt_quiz_id_06605e_idx'),
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:52
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def populate_counters(apps, schema_editor):
+    Classroom = apps.get_model('lms', 'Classroom')
+    now = timezone.now()
+    for classroom in Classroom.objects.all():
+        classroom.enrolled_count = classroom.enrollments.count()
+        classroom.ungraded_count = apps.get_model('lms', 'Submission').objects.filter(
+            assignment__classroom=classroom, graded=False
+        ).count()
+        classroom.open_assignment_count = classroom.assignments.filter(visible=True, deadline__gt=now).count()
+        classroom.upcoming_quiz_count = classroom.quizzes.filter(visible=True, end_time__gt=now).count()
+        classroom.save(update_fields=[
+            'enrolled_count', 'ungraded_count', 'open_assignment_count', 'upcoming_quiz_count',
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0014_pending_work_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='enrolled_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='open_assignment_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='ungraded_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='upcoming_quiz_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
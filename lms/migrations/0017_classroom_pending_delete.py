@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0016_quiz_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='pending_delete_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
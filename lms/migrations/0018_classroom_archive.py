@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0017_classroom_pending_delete'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='classroom',
+            name='archive_path',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='classroom',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
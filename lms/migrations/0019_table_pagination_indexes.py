@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0018_classroom_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'submitted_at', 'id'], name='lms_quizatt_quiz_id_d8f9ac_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quizattempt',
+            index=models.Index(fields=['quiz', 'score', 'id'], name='lms_quizatt_quiz_id_ea1bdc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'submitted_at', 'id'], name='lms_submiss_assignm_3bd5ff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='submission',
+            index=models.Index(fields=['assignment', 'graded'], name='lms_submiss_assignm_a71042_idx'),
+        ),
+    ]
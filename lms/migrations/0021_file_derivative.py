@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 02:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lms', '0020_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FileDerivative',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('size', models.PositiveBigIntegerField(blank=True, null=True)),
+                ('is_pdf', models.BooleanField(default=False)),
+                ('page_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('thumbnail', models.FileField(blank=True, upload_to='thumbnails/')),
+                ('error', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
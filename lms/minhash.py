@@ -0,0 +1,84 @@
+# lms/minhash.py
+"""
+MinHash signatures for near-duplicate detection (lms/similarity.py).
+
+A document becomes the set of its word ``SHINGLE_WORDS``-grams; its signature
+is, for each of ``PERMUTATIONS`` universal hash functions, the smallest hash
+of any shingle. The share of positions where two signatures agree estimates
+the Jaccard similarity of the two shingle sets, so documents are compared
+through fixed-size signatures instead of their text.
+
+For locality-sensitive hashing the signature is cut into ``BANDS`` bands of
+``ROWS`` values. Two documents become a candidate pair when any band is equal,
+which happens with probability ``1 - (1 - s**ROWS)**BANDS`` at similarity
+``s`` -- about 0.5 at s = 0.42 and above 0.99 from s = 0.7.
+
+Nothing here imports Django, so ``fingerprint()`` can run in worker processes.
+"""
+import hashlib
+import random
+import re
+import struct
+
+from . import pdf
+
+SHINGLE_WORDS = 5
+PERMUTATIONS = 128
+BANDS, ROWS = 32, 4  # BANDS * ROWS == PERMUTATIONS
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r'\w+')
+_PACKING = struct.Struct(f'<{PERMUTATIONS}I')
+
+# Fixed seed: signatures stored in the database must stay comparable across releases
+_rng = random.Random(20240601)
+_COEFFICIENTS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(PERMUTATIONS)]
+
+
+def shingles(text):
+    """Set of 64-bit hashes of the text's overlapping word n-grams (case and punctuation ignored)."""
+    words = _WORD.findall(text.lower())
+    if not words:
+        return set()
+    size = min(SHINGLE_WORDS, len(words))
+    return {
+        int.from_bytes(hashlib.blake2b(' '.join(words[i:i + size]).encode(), digest_size=8).digest(), 'little')
+        for i in range(len(words) - size + 1)
+    }
+
+
+def signature(hashes):
+    """Packed MinHash signature (bytes) of a set of shingle hashes; None for an empty set."""
+    if not hashes:
+        return None
+    return _PACKING.pack(*(
+        min((a * h + b) % _PRIME for h in hashes) & _MAX_HASH for a, b in _COEFFICIENTS
+    ))
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity (0..1) of two packed signatures."""
+    return sum(x == y for x, y in zip(_PACKING.unpack(first), _PACKING.unpack(second))) / PERMUTATIONS
+
+
+def bands(packed):
+    """The LSH band keys of a packed signature: (band number, band bytes)."""
+    width = ROWS * 4
+    return [(band, packed[band * width:(band + 1) * width]) for band in range(BANDS)]
+
+
+def fingerprint(path):
+    """``{'sha256', 'shingles', 'signature', 'error'}`` for the file at ``path``."""
+    info = {'sha256': '', 'shingles': 0, 'signature': None, 'error': ''}
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        info['sha256'] = hashlib.sha256(data).hexdigest()
+        document = pdf.text(data) if pdf.is_pdf(data) else data.decode('utf-8', 'replace')
+        hashes = shingles(document)
+        info['shingles'] = len(hashes)
+        info['signature'] = signature(hashes)
+    except Exception as exc:  # a broken upload must not stop the batch
+        info['error'] = f"{type(exc).__name__}: {exc}"[:255]
+    return info
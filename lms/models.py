@@ -1,3 +1,5 @@
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -13,6 +15,8 @@ class Profile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES)
     department = models.CharField(max_length=100, blank=True, null=True)
     year = models.IntegerField(blank=True, null=True)
+    # Secret of the user's .ics feed URL (lms/calendar_feed.py); created on first use
+    calendar_token = models.CharField(max_length=64, unique=True, blank=True, null=True)
 
     def __str__(self):
         return f"{self.user.username} ({self.role})"
@@ -21,6 +25,13 @@ class Profile(models.Model):
 # -----------------------------
 # CLASSROOM
 # -----------------------------
+class ClassroomManager(models.Manager):
+    """Hides classrooms that are waiting to be purged (see lms/purge.py)."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(pending_delete_at__isnull=True)
+
+
 class Classroom(models.Model):
     name = models.CharField(max_length=200)
     code = models.CharField(max_length=50, unique=True)
@@ -28,6 +39,23 @@ class Classroom(models.Model):
     teacher = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='owned_classrooms')
     created_at = models.DateTimeField(auto_now_add=True)
     start_date = models.DateField(default=timezone.now) 
+
+    # Denormalized counters for the teacher dashboard (maintained by lms/counters.py)
+    enrolled_count = models.PositiveIntegerField(default=0)
+    ungraded_count = models.PositiveIntegerField(default=0)
+    open_assignment_count = models.PositiveIntegerField(default=0)
+    upcoming_quiz_count = models.PositiveIntegerField(default=0)
+
+    # Set when the teacher deletes the course; the rows are then purged in the background
+    pending_delete_at = models.DateTimeField(blank=True, null=True, db_index=True)
+
+    # Set when the term's rows have been moved to an archive (lms/archive.py)
+    archived_at = models.DateTimeField(blank=True, null=True)
+    archive_path = models.CharField(max_length=255, blank=True)
+
+    objects = ClassroomManager()
+    all_objects = models.Manager()
+
     def __str__(self):
         return f"{self.code} - {self.name}"
 
@@ -44,11 +72,8 @@ class Enrollment(models.Model):
         unique_together = ('student', 'classroom')
 
     def attendance_percent(self):
-        total_classes = self.attendance_records.count()
-        if total_classes == 0:
-            return 0.0
-        attended = self.attendance_records.filter(present=True).count()
-        return round((attended / total_classes) * 100, 2)
+        from .attendance import get_store
+        return get_store().percent(self)
 
     def __str__(self):
         return f"{self.student.username} → {self.classroom.code}"
@@ -74,6 +99,39 @@ class Attendance(models.Model):
         return f"{self.enrollment.student.username} - {self.enrollment.classroom.code} ({status})"
 
 
+# -----------------------------
+# BITMAP ATTENDANCE (compact storage mode)
+# -----------------------------
+class ClassSession(models.Model):
+    """Calendar of the dates on which attendance was taken for a classroom."""
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='sessions')
+    date = models.DateField()
+
+    class Meta:
+        unique_together = ('classroom', 'date')
+        ordering = ['date']
+
+    def __str__(self):
+        return f"{self.classroom.code} session on {self.date}"
+
+
+class AttendanceBitmap(models.Model):
+    """
+    One row per enrollment per term. Bit ``i`` of ``held`` / ``present``
+    stands for the day ``term_start + i days`` (little-endian bit order).
+    """
+    enrollment = models.ForeignKey(Enrollment, on_delete=models.CASCADE, related_name='attendance_bitmaps')
+    term_start = models.DateField()
+    held = models.BinaryField(default=b'')
+    present = models.BinaryField(default=b'')
+
+    class Meta:
+        unique_together = ('enrollment', 'term_start')
+
+    def __str__(self):
+        return f"{self.enrollment} (term from {self.term_start})"
+
+
 # -----------------------------
 # ASSIGNMENTS & SUBMISSIONS
 # -----------------------------
@@ -94,6 +152,12 @@ class Assignment(models.Model):
         help_text="Optional PDF or image of the assignment question."
     )
 
+    class Meta:
+        indexes = [
+            # Pending-work feed: visible assignments of a classroom by deadline
+            models.Index(fields=['classroom', 'visible', 'deadline']),
+        ]
+
     def __str__(self):
         return f"{self.title} ({self.classroom.code})"
 
@@ -120,6 +184,11 @@ class Submission(models.Model):
 
     class Meta:
         unique_together = ('assignment', 'student')
+        indexes = [
+            # Keyset pages of the submissions table (lms/pagination.py)
+            models.Index(fields=['assignment', 'submitted_at', 'id']),
+            models.Index(fields=['assignment', 'graded']),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.assignment.title}"
@@ -159,6 +228,13 @@ class Quiz(models.Model):
     allow_multiple_correct = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     visible = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Pending-work feed: visible quizzes of a classroom by closing time
+            models.Index(fields=['classroom', 'visible', 'end_time']),
+        ]
 
     def __str__(self):
         return f"{self.title} ({self.classroom.code})"
@@ -196,6 +272,13 @@ class QuizAttempt(models.Model):
 
     class Meta:
         ordering = ['-submitted_at']  # newest first
+        indexes = [
+            # "Has this student attempted this quiz?" anti-joins
+            models.Index(fields=['quiz', 'student']),
+            # Keyset pages of the attempts table (lms/pagination.py)
+            models.Index(fields=['quiz', 'submitted_at', 'id']),
+            models.Index(fields=['quiz', 'score', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.quiz.title}: {self.score}"
@@ -208,6 +291,27 @@ class QuizAttempt(models.Model):
 
 
 
+# -----------------------------
+# GRADING SCHEME (per classroom)
+# -----------------------------
+class GradingScheme(models.Model):
+    POLICY_CHOICES = (
+        ('average', 'Average'),
+        ('best', 'Best of'),
+        ('drop_lowest', 'Drop lowest'),
+    )
+    classroom = models.OneToOneField(Classroom, on_delete=models.CASCADE, related_name='grading_scheme')
+    assignment_weight = models.FloatField(default=0.5)
+    quiz_weight = models.FloatField(default=0.5)
+    assignment_policy = models.CharField(max_length=20, choices=POLICY_CHOICES, default='average')
+    quiz_policy = models.CharField(max_length=20, choices=POLICY_CHOICES, default='best')
+    # Only used by the "drop_lowest" policy
+    drop_count = models.PositiveIntegerField(default=1)
+
+    def __str__(self):
+        return f"Grading scheme for {self.classroom.code}"
+
+
 # -----------------------------
 # STUDY MATERIALS
 # -----------------------------
@@ -226,6 +330,54 @@ class Resource(models.Model):
         return self.title
 
 
+class FileDerivative(models.Model):
+    """Facts extracted in the background from an uploaded file, keyed by its storage name (lms/derivatives.py)."""
+    name = models.CharField(max_length=255, unique=True)
+    size = models.PositiveBigIntegerField(blank=True, null=True)
+    is_pdf = models.BooleanField(default=False)
+    page_count = models.PositiveIntegerField(blank=True, null=True)
+    thumbnail = models.FileField(upload_to='thumbnails/', blank=True)
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class SubmissionSignature(models.Model):
+    """MinHash signature of one uploaded submission file, keyed by its storage name (lms/similarity.py)."""
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    shingles = models.PositiveIntegerField(default=0)
+    signature = models.BinaryField(blank=True, null=True)  # None when the file has no readable text
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+
+class UploadSession(models.Model):
+    """A resumable chunked upload of a resource; the Resource row is only created at finalize (lms/uploads.py)."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    title = models.CharField(max_length=255)
+    description = models.TextField(blank=True)
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    # Progress: chunks 0 .. next_chunk-1 are in the staging file, with their sha256 hex digests concatenated
+    next_chunk = models.PositiveIntegerField(default=0)
+    received = models.PositiveBigIntegerField(default=0)
+    chunk_digests = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+
+
 # -----------------------------
 # DISCUSSIONS + COMMENTS
 # -----------------------------
@@ -263,3 +415,68 @@ class Reply(models.Model):
 
     def __str__(self):
         return f"Reply by {self.author.username} on {self.discussion.title}"
+
+
+# -----------------------------
+# BACKGROUND JOBS
+# -----------------------------
+class Job(models.Model):
+    """One unit of background work for ``manage.py runworker`` (lms/jobs.py)."""
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = ((QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed'))
+
+    name = models.CharField(max_length=100)  # a task registered with lms.jobs.task
+    kwargs = models.JSONField(default=dict, blank=True)
+    # Only one queued job per non-empty key: enqueueing the same work twice is a no-op
+    key = models.CharField(max_length=200, blank=True)
+    priority = models.SmallIntegerField(default=0)  # higher runs first
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Claiming: the due queued jobs, most urgent first
+            models.Index(fields=['status', '-priority', 'run_at'], name='lms_job_claim_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key'], condition=models.Q(status='queued') & ~models.Q(key=''), name='lms_job_queued_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+
+# -----------------------------
+# NOTIFICATIONS
+# -----------------------------
+class NotificationEvent(models.Model):
+    """Something to tell users about in their next digest e-mail (lms/notifications.py)."""
+    ASSIGNMENT, GRADE, REPLY = 'assignment', 'grade', 'reply'
+    KIND_CHOICES = ((ASSIGNMENT, 'New assignment'), (GRADE, 'Grade released'), (REPLY, 'Reply'))
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    classroom = models.ForeignKey(Classroom, on_delete=models.CASCADE, related_name='notification_events')
+    # None: every student enrolled in the classroom when the digest is sent
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    text = models.CharField(max_length=300)
+    url = models.CharField(max_length=300, blank=True)  # path on this site
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # Digest run: the unsent events, oldest first
+            models.Index(fields=['sent_at', 'id'], name='lms_notification_unsent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}: {self.text}"
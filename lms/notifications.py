@@ -0,0 +1,134 @@
+# lms/notifications.py
+"""
+E-mail digests of what happened in a user's courses.
+
+Requests only record events: a new assignment, a released grade, a reply to
+one's discussion or reply. Recording is one INSERT of a NotificationEvent in
+the request's transaction -- no mail is rendered or sent, and an assignment
+for a class of 300 is still one row, because "every enrolled student" is
+resolved when the digest goes out.
+
+``send_digests()`` (a recurring job, or ``manage.py send_digests``) collects
+the unsent events, groups them per recipient and sends one message per user
+through a single connection of the configured e-mail backend, in batches of
+``BATCH_SIZE``. Events are marked sent only after their messages went out, so
+a run that fails is simply repeated by the next one.
+
+Any Django e-mail backend works: SMTP (a local stand-in such as
+``python -m aiosmtpd -n -l localhost:1025`` with ``EMAIL_PORT=1025``), or the
+file / console backends (settings.py, ``LMS_EMAIL_BACKEND``).
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.mail import EmailMessage, get_connection
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Enrollment, NotificationEvent
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100     # messages handed to the backend per send_messages() call
+EVENTS_PER_RUN = 5000  # unsent events loaded per pass; a run makes passes until none are left
+
+
+# -----------------------------
+# RECORDING (in the request)
+# -----------------------------
+def assignment_posted(assignment):
+    """A visible assignment appeared: tell every student of the classroom."""
+    NotificationEvent.objects.create(
+        kind=NotificationEvent.ASSIGNMENT,
+        classroom_id=assignment.classroom_id,
+        text=f"New assignment: {assignment.title} (due {timezone.localtime(assignment.deadline):%d %b %Y, %H:%M})",
+        url=reverse('class_assignments_student', args=[assignment.classroom_id]),
+    )
+
+
+def grade_released(submission):
+    assignment = submission.assignment
+    NotificationEvent.objects.create(
+        kind=NotificationEvent.GRADE,
+        classroom_id=assignment.classroom_id,
+        recipient_id=submission.student_id,
+        text=f"Your grade for {assignment.title} is out: {submission.marks:g}",
+        url=reverse('class_assignments_student', args=[assignment.classroom_id]),
+    )
+
+
+def reply_posted(reply):
+    """Tell the discussion's author and, for a nested reply, the parent reply's author."""
+    discussion = reply.discussion
+    recipients = {discussion.author_id}
+    if reply.parent_id:
+        recipients.add(reply.parent.author_id)
+    recipients.discard(reply.author_id)
+    NotificationEvent.objects.bulk_create([
+        NotificationEvent(
+            kind=NotificationEvent.REPLY,
+            classroom_id=discussion.classroom_id,
+            recipient_id=recipient_id,
+            text=f"{reply.author.username} replied in {discussion.title}",
+            url=reverse('discussion_detail', args=[discussion.id]),
+        )
+        for recipient_id in sorted(recipients)
+    ])
+
+
+# -----------------------------
+# SENDING (in a job)
+# -----------------------------
+def _recipients(events):
+    """``{user id: [events]}``; classroom-wide events go to the classroom's current students."""
+    broadcast = {event.classroom_id for event in events if event.recipient_id is None}
+    students = defaultdict(list)
+    for classroom_id, student_id in Enrollment.objects.filter(classroom_id__in=broadcast) \
+            .values_list('classroom_id', 'student_id'):
+        students[classroom_id].append(student_id)
+
+    per_user = defaultdict(list)
+    for event in events:
+        for user_id in [event.recipient_id] if event.recipient_id else students[event.classroom_id]:
+            per_user[user_id].append(event)
+    return per_user
+
+
+def _message(user, events):
+    events = sorted(events, key=lambda event: (event.classroom.name, event.pk))
+    body = render_to_string('lms/email/digest.txt', {
+        'user': user,
+        'events': events,
+        'site_url': getattr(settings, 'LMS_SITE_URL', 'http://localhost:8000').rstrip('/'),
+    })
+    count = len(events)
+    subject = f"{count} update{'s' if count != 1 else ''} from your courses"
+    return EmailMessage(subject, body, to=[user.email])
+
+
+def send_digests():
+    """Send every pending event in one digest per user. Returns the number of messages sent."""
+    sent = 0
+    connection = get_connection()
+    with connection:  # one session with the mail server for the whole run
+        while True:
+            events = list(
+                NotificationEvent.objects.filter(sent_at__isnull=True).select_related('classroom')
+                .order_by('pk')[:EVENTS_PER_RUN]
+            )
+            if not events:
+                break
+            per_user = _recipients(events)
+            users = User.objects.filter(pk__in=per_user, is_active=True).exclude(email='') \
+                .only('username', 'email').order_by('pk')
+            messages = [_message(user, per_user[user.pk]) for user in users]
+            for start in range(0, len(messages), BATCH_SIZE):
+                sent += connection.send_messages(messages[start:start + BATCH_SIZE]) or 0
+            # Users without an address (or inactive) just miss these events
+            NotificationEvent.objects.filter(pk__in=[event.pk for event in events]).update(sent_at=timezone.now())
+    logger.info("Sent %s digest e-mails", sent)
+    return sent
+
@@ -0,0 +1,170 @@
+# lms/pagination.py
+"""
+Keyset (cursor) pagination for the teacher's submissions and attempts tables.
+
+Rows are ordered by one sort key plus the primary key as a tie-breaker, and a
+page is fetched with ``WHERE (key, id) > (last key, last id) LIMIT n`` instead of
+an OFFSET, so every page costs the same index range scan however deep it is.
+Cursors are opaque url-safe strings holding the boundary row's key and id.
+
+``table_page()`` applies the request's ``sort``, ``filter`` and ``q`` (register
+number / username search) parameters and returns the template context.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count, F, FloatField, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .reports import AUTO_ZERO_SUBMISSION
+
+PER_PAGE = 50
+
+
+class Page:
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.prev_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _encode(value, pk, direction):
+    # Datetimes keep full microsecond precision; anything coarser would match the boundary row again
+    if isinstance(value, datetime):
+        value = {'datetime': value.isoformat()}
+    raw = json.dumps([value, pk, direction])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _decode(cursor):
+    try:
+        value, pk, direction = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if direction not in ('next', 'prev') or not isinstance(pk, int):
+        return None
+    if isinstance(value, dict):
+        try:
+            value = parse_datetime(value.get('datetime') or '')
+        except (ValueError, TypeError):
+            return None
+        if value is None:
+            return None
+    return value, pk, direction
+
+
+def paginate(queryset, key, descending=False, cursor=None, per_page=PER_PAGE):
+    """
+    One page of ``queryset`` ordered by ``key`` (a field or annotation, never NULL) then pk.
+    ``cursor`` is a ``next_cursor`` / ``prev_cursor`` of a previous page; one that can't be
+    read, or doesn't fit ``key``, gives the first page.
+    """
+    position = _decode(cursor) if cursor else None
+    backwards = position is not None and position[2] == 'prev'
+
+    if position is not None:
+        value, pk, _ = position
+        op = 'lt' if descending != backwards else 'gt'
+        try:
+            queryset = queryset.filter(Q(**{f'{key}__{op}': value}) | Q(**{key: value, f'pk__{op}': pk}))
+        except (ValueError, TypeError, ValidationError):
+            # A value the sort key can't compare with (tampered, or from another sort): first page
+            position, backwards = None, False
+
+    order = [f'-{key}', '-pk'] if descending != backwards else [key, 'pk']
+    rows = list(queryset.order_by(*order)[:per_page + 1])
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    has_next = (not backwards and more) or (backwards and bool(rows))
+    has_prev = (backwards and more) or (not backwards and position is not None and bool(rows))
+    return Page(
+        rows,
+        next_cursor=_encode(getattr(rows[-1], key), rows[-1].pk, 'next') if has_next else None,
+        prev_cursor=_encode(getattr(rows[0], key), rows[0].pk, 'prev') if has_prev else None,
+    )
+
+
+# -----------------------------
+# TABLE DEFINITIONS
+# -----------------------------
+# sort name -> expression annotated as ``sort_key`` (must not be NULL)
+SUBMISSION_SORTS = {
+    'submitted': F('submitted_at'),
+    'student': F('student__username'),
+    'marks': Coalesce('marks', Value(-1.0), output_field=FloatField()),
+}
+SUBMISSION_FILTERS = {
+    'late': Q(submitted_at__gt=F('assignment__deadline')),
+    'ungraded': Q(graded=False),
+    'auto': AUTO_ZERO_SUBMISSION,
+}
+
+ATTEMPT_SORTS = {
+    'submitted': F('submitted_at'),
+    'student': F('student__username'),
+    'score': F('score'),
+}
+ATTEMPT_FILTERS = {
+    'late': Q(submitted_at__gt=F('quiz__end_time')),
+    'ungraded': Q(graded=False),
+    'auto': Q(auto_submitted=True),
+}
+
+
+def table_page(request, queryset, sorts, filters, default_sort='submitted', per_page=PER_PAGE):
+    """Apply ``sort`` / ``filter`` / ``q`` / ``cursor`` from the request; returns template context."""
+    sort = request.GET.get('sort', default_sort)
+    descending = sort.startswith('-')
+    if sort.lstrip('-') not in sorts:
+        sort, descending = default_sort, False
+    active_filter = request.GET.get('filter', '')
+    search = request.GET.get('q', '').strip()
+
+    if search:
+        queryset = queryset.filter(
+            Q(student__profile__reg_no__icontains=search) | Q(student__username__icontains=search)
+        )
+    # Row counts for every filter tab in one query
+    counts = queryset.aggregate(all=Count('pk'), **{
+        name: Count('pk', filter=condition) for name, condition in filters.items()
+    })
+    if active_filter in filters:
+        queryset = queryset.filter(filters[active_filter])
+    else:
+        active_filter = ''
+
+    page = paginate(
+        queryset.annotate(sort_key=sorts[sort.lstrip('-')]),
+        'sort_key',
+        descending=descending,
+        cursor=request.GET.get('cursor'),
+        per_page=per_page,
+    )
+    return {
+        'page': page,
+        'sort': sort.lstrip('-'),
+        'descending': descending,
+        'active_filter': active_filter,
+        'filter_counts': counts,
+        'search': search,
+    }
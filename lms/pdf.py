@@ -0,0 +1,364 @@
+# lms/pdf.py
+"""
+Minimal PDF inspection without third-party dependencies.
+
+Only what the LMS needs is read: whether a file really is a PDF, its page
+count, its text, and (when a renderer is available) a first-page thumbnail.
+The page count is the largest ``/Count`` of a ``/Type /Pages`` node -- the
+root of the page tree -- looked up in the file body and in compressed object
+streams; files without one fall back to counting ``/Type /Page`` objects.
+
+``text()`` walks the page tree and decodes the strings shown by each page's
+content streams, through the fonts' ``/ToUnicode`` maps where they have one.
+Only FlateDecode (or unfiltered) streams are read; that covers what word
+processors and "print to PDF" produce. PyMuPDF is used instead when installed.
+
+Thumbnails need a renderer: PyMuPDF when it is installed, else poppler's
+``pdftoppm`` when it is on PATH. Without either, ``thumbnail()`` returns None.
+
+Nothing here imports Django, so these functions can run in worker processes.
+"""
+import os
+import re
+import shutil
+import subprocess
+import zlib
+
+try:
+    import fitz  # PyMuPDF, optional
+except ImportError:
+    fitz = None
+
+THUMBNAIL_WIDTH = 160  # pixels
+
+_PAGES_NODE = re.compile(rb'/Type\s*/Pages\b')
+_PAGE_OBJECT = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_COUNT = re.compile(rb'/Count\s+(\d+)')
+_STREAM = re.compile(rb'stream\r?\n')
+_OBJECT = re.compile(rb'(\d+)\s+\d+\s+obj\b')
+_REF = re.compile(rb'(\d+)\s+\d+\s+R')
+_TOKEN = re.compile(rb'/[^\s/<>\[\]()%{}]*|[-+]?(?:\d+\.?\d*|\.\d+)|[A-Za-z\'"*]+|<<|>>|[\[\]{}]')
+_HEX_PAIR = re.compile(rb'<([0-9A-Fa-f\s]+)>')
+_ESCAPES = {ord('n'): b'\n', ord('r'): b'\r', ord('t'): b'\t', ord('b'): b'\b', ord('f'): b'\f'}
+
+
+def is_pdf(data):
+    return b'%PDF-' in data[:1024]
+
+
+def _object_streams(data):
+    """Decompressed contents of the file's object streams (where PDF 1.5+ keeps its dictionaries)."""
+    for match in _STREAM.finditer(data):
+        header = data[max(0, match.start() - 512):match.start()]
+        if b'/ObjStm' not in header[header.rfind(b'<<'):]:
+            continue
+        end = data.find(b'endstream', match.end())
+        try:
+            yield zlib.decompressobj().decompress(data[match.end():end if end != -1 else None])
+        except zlib.error:
+            continue
+
+
+def page_count(data):
+    """Number of pages of the PDF in ``data`` (bytes), or None if it cannot be told."""
+    counts, pages = [], 0
+    for body in (data, *_object_streams(data)):
+        for node in _PAGES_NODE.finditer(body):
+            # The node's /Count sits in the same dictionary, close to its /Type
+            window = body[max(0, node.start() - 256):node.end() + 256]
+            counts += [int(n) for n in _COUNT.findall(window)]
+        pages += len(_PAGE_OBJECT.findall(body))
+    if counts:
+        return max(counts)
+    return pages or None
+
+
+# -----------------------------
+# TEXT
+# -----------------------------
+def _objects(data):
+    """{object number: object body} for the file body and its object streams."""
+    objects = {}
+    for match in _OBJECT.finditer(data):
+        end = data.find(b'endobj', match.end())
+        objects[int(match.group(1))] = data[match.end():end if end != -1 else None]
+    for number, body in list(objects.items()):
+        if b'/ObjStm' not in _dictionary(body):
+            continue
+        content = _stream(body)
+        first = re.search(rb'/First\s+(\d+)', body)
+        if content is None or first is None:
+            continue
+        first = int(first.group(1))
+        header = [int(n) for n in content[:first].split()]
+        offsets = list(zip(header[::2], header[1::2]))
+        for i, (inner, offset) in enumerate(offsets):
+            end = offsets[i + 1][1] if i + 1 < len(offsets) else len(content) - first
+            objects.setdefault(inner, content[first + offset:first + end])
+    return objects
+
+
+def _dictionary(body):
+    """The object's dictionary, without the stream data that may follow it."""
+    start = body.find(b'stream')
+    return body[:start] if start != -1 else body
+
+
+def _stream(body):
+    """Decoded stream data of an object body, or None when it is not a readable stream."""
+    match = _STREAM.search(body)
+    if match is None:
+        return None
+    head, data = body[:match.start()], body[match.end():]
+    end = data.rfind(b'endstream')
+    data = data[:end if end != -1 else None]
+    if b'/Filter' not in head:
+        return data
+    if re.search(rb'/Filter\s*\[?\s*/FlateDecode\s*\]?', head) is None:
+        return None  # images and exotic filters carry no text we can read
+    try:
+        return zlib.decompressobj().decompress(data)
+    except zlib.error:
+        return None
+
+
+def _value(body, key):
+    """Raw value of ``key`` in a dictionary: a referenced object's number, or the inline bytes."""
+    match = re.search(re.escape(key) + rb'(?![A-Za-z])\s*', body)
+    if match is None:
+        return None
+    rest = body[match.end():]
+    ref = _REF.match(rest)
+    if ref:
+        return int(ref.group(1))
+    for opening, closing in ((b'<<', b'>>'), (b'[', b']')):
+        if rest.startswith(opening):
+            depth, i = 0, 0
+            while i < len(rest):
+                if rest.startswith(opening, i):
+                    depth, i = depth + 1, i + len(opening)
+                elif rest.startswith(closing, i):
+                    depth, i = depth - 1, i + len(closing)
+                    if depth == 0:
+                        return rest[:i]
+                else:
+                    i += 1
+            return rest
+    return rest.split(None, 1)[0] if rest.strip() else None
+
+
+def _resolve(objects, value):
+    return objects.get(value, b'') if isinstance(value, int) else (value or b'')
+
+
+def _pages(objects):
+    """Page object numbers in reading order (page tree order, else object order)."""
+    roots = [n for n, body in objects.items()
+             if _PAGES_NODE.search(_dictionary(body)) and b'/Parent' not in _dictionary(body)]
+    pages, seen = [], set()
+
+    def walk(number):
+        if number in seen or number not in objects:
+            return
+        seen.add(number)
+        body = _dictionary(objects[number])
+        if _PAGES_NODE.search(body):
+            for kid in _REF.findall(_resolve(objects, _value(body, b'/Kids'))):
+                walk(int(kid))
+        elif _PAGE_OBJECT.search(body):
+            pages.append(number)
+
+    for root in roots:
+        walk(root)
+    return pages or sorted(n for n, body in objects.items() if _PAGE_OBJECT.search(_dictionary(body)))
+
+
+def _cmap(data):
+    """{code bytes: text} from a ToUnicode CMap's bfchar / bfrange sections."""
+    mapping = {}
+
+    def text_of(hex_digits):
+        return bytes.fromhex(hex_digits.decode()).decode('utf-16-be', 'replace')
+
+    for section in re.findall(rb'beginbfchar(.*?)endbfchar', data, re.S):
+        pairs = [re.sub(rb'\s', b'', h) for h in _HEX_PAIR.findall(section)]
+        for source, target in zip(pairs[::2], pairs[1::2]):
+            mapping[bytes.fromhex(source.decode())] = text_of(target)
+    for section in re.findall(rb'beginbfrange(.*?)endbfrange', data, re.S):
+        for low, high, targets in re.findall(rb'<(\w+)>\s*<(\w+)>\s*(<\w+>|\[[^\]]*\])', section):
+            width, low, high = len(low) // 2, int(low, 16), int(high, 16)
+            if targets.startswith(b'['):
+                for i, target in enumerate(_HEX_PAIR.findall(targets)[:high - low + 1]):
+                    mapping[(low + i).to_bytes(width, 'big')] = text_of(re.sub(rb'\s', b'', target))
+            else:
+                start = int(targets[1:-1], 16)
+                for i in range(min(high - low + 1, 0x10000)):
+                    mapping[(low + i).to_bytes(width, 'big')] = chr(start + i) if start + i < 0x110000 else ''
+    return mapping
+
+
+def _fonts(objects, page):
+    """{resource name: ToUnicode map or None} for a page, resources inherited from its parents."""
+    body, resources = _dictionary(objects[page]), None
+    for _ in range(32):  # bounded walk up the page tree
+        resources = _value(body, b'/Resources')
+        parent = _value(body, b'/Parent')
+        if resources is not None or not isinstance(parent, int):
+            break
+        body = _dictionary(objects.get(parent, b''))
+    fonts = {}
+    font_dict = _resolve(objects, _value(_resolve(objects, resources), b'/Font'))
+    for name, number in re.findall(rb'/([^\s/<>\[\]()]+)\s*(\d+)\s+\d+\s+R', font_dict):
+        to_unicode = _value(_dictionary(objects.get(int(number), b'')), b'/ToUnicode')
+        data = _stream(objects.get(to_unicode, b'')) if isinstance(to_unicode, int) else None
+        fonts[name] = _cmap(data) if data else None
+    return fonts
+
+
+def _decode(raw, cmap):
+    if not cmap:
+        return raw.decode('latin-1')
+    widths = sorted({len(code) for code in cmap}, reverse=True)
+    out, i = [], 0
+    while i < len(raw):
+        for width in widths:
+            if raw[i:i + width] in cmap:
+                out.append(cmap[raw[i:i + width]])
+                i += width
+                break
+        else:
+            i += 1
+    return ''.join(out)
+
+
+class _String(bytes):
+    """A string operand, told apart from the name / number / keyword tokens around it."""
+
+
+def _literal(content, i):
+    """The literal string starting at ``content[i] == '('``; returns (bytes, index after it)."""
+    out, depth = bytearray(), 0
+    i += 1
+    while i < len(content):
+        c = content[i]
+        if c == 0x5C:  # backslash
+            i += 1
+            nxt = content[i:i + 1]
+            if nxt.isdigit():
+                octal = re.match(rb'[0-7]{1,3}', content[i:i + 3]).group()
+                out.append(int(octal, 8) & 0xFF)
+                i += len(octal)
+                continue
+            if nxt in (b'\r', b'\n'):
+                i += 2 if content[i:i + 2] == b'\r\n' else 1
+                continue
+            out += _ESCAPES.get(nxt[0], nxt) if nxt else b''
+        elif c == 0x28:
+            depth += 1
+            out.append(c)
+        elif c == 0x29:
+            if depth == 0:
+                return bytes(out), i + 1
+            depth -= 1
+            out.append(c)
+        else:
+            out.append(c)
+        i += 1
+    return bytes(out), i
+
+
+def _show_text(content, fonts):
+    """Text shown by one page's content stream."""
+    out, operands, cmap, i = [], [], None, 0
+    while i < len(content):
+        c = content[i:i + 1]
+        if c == b'(':
+            value, i = _literal(content, i)
+            operands.append(_String(value))
+            continue
+        if c == b'<' and content[i:i + 2] != b'<<':
+            end = content.find(b'>', i)
+            end = end if end != -1 else len(content)
+            digits = re.sub(rb'[^0-9A-Fa-f]', b'', content[i + 1:end])
+            operands.append(_String(bytes.fromhex((digits + b'0' * (len(digits) % 2)).decode())))
+            i = end + 1
+            continue
+        if c == b'%':
+            end = content.find(b'\n', i)
+            i = end if end != -1 else len(content)
+            continue
+        match = _TOKEN.match(content, i)
+        if match is None:
+            i += 1
+            continue
+        token, i = match.group(), match.end()
+        if token[:1] in b'/[]-+.0123456789' or token in (b'<<', b'>>', b'{', b'}'):
+            operands.append(token)
+            continue
+        if token == b'Tf' and len(operands) >= 2 and operands[-2][:1] == b'/' and not isinstance(operands[-2], _String):
+            cmap = fonts.get(operands[-2][1:])
+        elif token in (b'Tj', b"'", b'"') and operands and isinstance(operands[-1], _String):
+            out.append(_decode(operands[-1], cmap))
+        elif token == b'TJ':
+            brackets = [n for n, item in enumerate(operands) if item == b'[' and not isinstance(item, _String)]
+            start = brackets[-1] if brackets else len(operands)
+            for item in operands[start + 1:]:
+                if isinstance(item, _String):
+                    out.append(_decode(item, cmap))
+                elif item == b']':
+                    break
+                elif item[:1] in b'-+.0123456789' and float(item) < -200:
+                    out.append(' ')  # a kerning gap wide enough to be a space
+        if token in (b'Td', b'TD', b'T*', b'Tm', b"'", b'"', b'ET'):
+            out.append(' ')
+        operands = []
+    return ''.join(out)
+
+
+def text(data):
+    """Text of the PDF in ``data`` (bytes), pages in order; empty when none can be read."""
+    if fitz is not None:
+        with fitz.open(stream=data, filetype='pdf') as document:
+            return '\n'.join(page.get_text() for page in document)
+    objects = _objects(data)
+    pages = []
+    for page in _pages(objects):
+        fonts = _fonts(objects, page)
+        contents = _value(_dictionary(objects[page]), b'/Contents')
+        numbers = [contents] if isinstance(contents, int) else [int(n) for n in _REF.findall(contents or b'')]
+        streams = (_stream(objects.get(number, b'')) for number in numbers)
+        pages.append(_show_text(b'\n'.join(s for s in streams if s), fonts))
+    return '\n'.join(pages)
+
+
+def thumbnail(path, width=THUMBNAIL_WIDTH):
+    """PNG bytes of the first page scaled to ``width`` pixels, or None without a renderer."""
+    if fitz is not None:
+        with fitz.open(path) as document:
+            page = document[0]
+            zoom = width / page.rect.width
+            return page.get_pixmap(matrix=fitz.Matrix(zoom, zoom)).tobytes('png')
+    if shutil.which('pdftoppm'):
+        result = subprocess.run(
+            ['pdftoppm', '-png', '-f', '1', '-l', '1', '-scale-to-x', str(width), '-scale-to-y', '-1',
+             '-singlefile', path, '-'],
+            capture_output=True, timeout=60,
+        )
+        return result.stdout if result.returncode == 0 and result.stdout else None
+    return None
+
+
+def inspect(path):
+    """``{'size', 'is_pdf', 'page_count', 'thumbnail', 'error'}`` for the file at ``path``."""
+    info = {'size': None, 'is_pdf': False, 'page_count': None, 'thumbnail': None, 'error': ''}
+    try:
+        info['size'] = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            data = f.read()
+        info['is_pdf'] = is_pdf(data)
+        if info['is_pdf']:
+            info['page_count'] = page_count(data)
+            info['thumbnail'] = thumbnail(path)
+    except Exception as exc:  # a broken upload must not stop the batch
+        info['error'] = f"{type(exc).__name__}: {exc}"[:255]
+    return info
@@ -0,0 +1,175 @@
+# lms/principal.py
+"""
+Compact per-session user principal.
+
+The first authenticated request of a session goes through Django's normal
+auth (session hash check, User + Profile rows) and stores a small principal
+-- id, username, role, reg_no, a couple of flags and the session auth hash --
+in the session. Later requests rebuild ``request.user`` (with its ``profile``)
+from that principal as a deferred-field instance, so role checks and
+``teacher=request.user`` filters need no User or Profile rows. Any field that
+isn't part of the principal is still loaded on first access.
+
+Session revocation does not depend on the cache: every request reads the
+user's password hash and active flag (one indexed single-row query) and
+compares the principal's auth hash with both the session's and the one
+derived from the current password, exactly as Django's ``get_user`` does. A
+password change or deactivation logs other sessions out in every process.
+
+Each user also has a version token in the cache; saving their User or Profile
+replaces it (lms/signals.py), which makes the next request rebuild the
+principal so a new role or register number is picked up. With several worker
+processes, use a shared cache backend (LMS_CACHE_BACKEND=file) so they all see
+those changes straight away.
+"""
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY as AUTH_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.crypto import constant_time_compare
+
+from .models import Profile
+
+SESSION_KEY = '_lms_principal'
+
+
+class Principal:
+    is_authenticated = True
+
+    def __init__(self, id, username, role, reg_no, profile_id, is_staff, is_superuser, version, auth_hash):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.reg_no = reg_no
+        self.profile_id = profile_id
+        self.is_staff = is_staff
+        self.is_superuser = is_superuser
+        self.version = version
+        self.auth_hash = auth_hash
+
+    @property
+    def is_teacher(self):
+        return self.role == 'teacher'
+
+    @property
+    def is_student(self):
+        return self.role == 'student'
+
+    def as_dict(self):
+        return dict(self.__dict__)
+
+
+class AnonymousPrincipal:
+    is_authenticated = False
+    id = None
+    username = ''
+    role = None
+    reg_no = None
+    is_teacher = False
+    is_student = False
+    is_staff = False
+    is_superuser = False
+
+
+# -----------------------------
+# VERSIONING / INVALIDATION
+# -----------------------------
+def _version_key(user_id):
+    return f"lms:principal_version:{user_id}"
+
+
+def principal_version(user_id):
+    return cache.get_or_set(_version_key(user_id), time.time_ns, None)
+
+
+def invalidate(user_id):
+    """Force the user's sessions to rebuild their principal on the next request."""
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+# -----------------------------
+# LOADING
+# -----------------------------
+def build(user):
+    """Principal for an authenticated User (reads its Profile)."""
+    profile = Profile.objects.filter(user=user).only('id', 'role', 'reg_no').first()
+    return Principal(
+        id=user.id,
+        username=user.username,
+        role=profile.role if profile else None,
+        reg_no=profile.reg_no if profile else None,
+        profile_id=profile.id if profile else None,
+        is_staff=user.is_staff,
+        is_superuser=user.is_superuser,
+        version=principal_version(user.id),
+        auth_hash=user.get_session_auth_hash(),
+    )
+
+
+def _session_still_valid(request, data):
+    """Django's session hash check against the current password, without loading the User."""
+    auth_hash = data.get('auth_hash')
+    if not auth_hash or not constant_time_compare(auth_hash, request.session.get(HASH_SESSION_KEY, '')):
+        return False
+    row = User.objects.filter(pk=data['id']).values_list('password', 'is_active').first()
+    if row is None or not row[1]:
+        return False
+    return constant_time_compare(auth_hash, User(password=row[0]).get_session_auth_hash())
+
+
+def get_principal(request, auth_user):
+    """
+    Principal for the request. ``auth_user`` is Django's own lazy ``request.user``;
+    it is only evaluated when the session has no valid principal yet.
+    """
+    user_id = request.session.get(AUTH_SESSION_KEY)
+    if user_id is None:
+        return AnonymousPrincipal()
+
+    data = request.session.get(SESSION_KEY)
+    if (
+        data and str(data['id']) == str(user_id)
+        and data['version'] == principal_version(data['id'])
+        and _session_still_valid(request, data)
+    ):
+        return Principal(**data)
+
+    if not auth_user.is_authenticated:
+        return AnonymousPrincipal()
+    principal = build(auth_user)
+    request.session[SESSION_KEY] = principal.as_dict()
+    return principal
+
+
+def user_from_principal(principal):
+    """A User (with cached Profile) built from the principal without touching the database."""
+    # from_db() takes the loaded values in the model's field order, whatever the order of the names
+    user = User.from_db(
+        DEFAULT_DB_ALIAS,
+        ['id', 'is_superuser', 'username', 'is_staff', 'is_active'],
+        [principal.id, principal.is_superuser, principal.username, principal.is_staff, True],
+    )
+    if principal.profile_id:
+        profile = Profile.from_db(
+            DEFAULT_DB_ALIAS,
+            ['id', 'user_id', 'reg_no', 'role'],
+            [principal.profile_id, principal.id, principal.reg_no, principal.role],
+        )
+        Profile.user.field.set_cached_value(profile, user)
+    else:
+        profile = None
+    User.profile.related.set_cached_value(user, profile)
+    return user
+
+
+async def aresolve(request):
+    """
+    Evaluate the request's lazy principal and user in a worker thread (they may
+    query the database) and return the principal; afterwards async code can
+    use ``request.principal`` and ``request.user`` freely.
+    """
+    await sync_to_async(lambda: (request.principal.is_authenticated, request.user.is_authenticated))()
+    return request.principal
@@ -0,0 +1,178 @@
+# lms/question_bank.py
+"""
+Quiz question banks and the cached quiz paper.
+
+A bank is a CSV or JSON file of questions with two or more options and one or
+more correct answers. The whole file is validated before anything is written;
+questions and options are then inserted with one ``bulk_create`` each, in one
+transaction, and the classroom cache generation is bumped once so the cached
+quiz paper / answer key used by ``attempt_quiz`` is rebuilt.
+
+CSV: a header row with ``question``, ``option1`` ... ``optionN`` and ``correct``,
+where ``correct`` lists the correct option numbers or letters (``"2"``, ``"1;3"``, ``"A,C"``)
+and nothing else -- option text is never matched in CSV.
+
+JSON: a list of ``{"question": ..., "options": [...], "correct": [...]}``, where
+each ``correct`` entry is either an integer option number (1-based) or a string
+holding the correct option's exact text (case-insensitive); a string that
+matches two options, or any other JSON type, is rejected.
+
+Blank options are left out, but option numbers count them: with ``option2``
+empty, ``correct`` = 3 is still the third column. Naming a blank option as
+correct is an error.
+"""
+import csv
+import io
+import json
+import re
+
+from django.db import transaction
+
+from . import caching, counters
+from .models import Option, Question
+
+
+class QuestionBankError(ValueError):
+    def __init__(self, errors):
+        self.errors = errors
+        super().__init__('; '.join(errors))
+
+
+# -----------------------------
+# PARSING & VALIDATION
+# -----------------------------
+def _csv_index(token, options):
+    """0-based option index for a CSV ``correct`` token: a 1-based number or a single letter."""
+    if token.isdigit():
+        return int(token) - 1
+    if len(token) == 1 and token.isascii() and token.isalpha():
+        return ord(token.upper()) - ord('A')
+    raise ValueError(f"correct answer '{token}' is not an option number or letter.")
+
+
+def _json_index(token, options):
+    """0-based option index for a JSON ``correct`` entry: an integer position or the option's text."""
+    if isinstance(token, int) and not isinstance(token, bool):
+        return token - 1
+    if not isinstance(token, str):
+        raise ValueError(f"correct answer {json.dumps(token)} must be an option number or the option's text.")
+    matches = [i for i, o in enumerate(options) if o and o.lower() == token.strip().lower()]
+    if len(matches) > 1:
+        raise ValueError(f"correct answer '{token}' matches more than one option.")
+    if not matches:
+        raise ValueError(f"correct answer '{token}' does not match an option.")
+    return matches[0]
+
+
+def _validate(number, text, options, correct_tokens, allow_multiple, index_of):
+    errors = []
+    text = (text or '').strip()
+    # Answers refer to the columns / list positions as written, so blank options are dropped only afterwards
+    options = ['' if o is None else str(o).strip() for o in options]
+    correct = set()
+    for token in correct_tokens:
+        try:
+            index = index_of(token, options)
+        except ValueError as exc:
+            errors.append(f"Question {number}: {exc}")
+            continue
+        if not 0 <= index < len(options):
+            errors.append(f"Question {number}: correct answer {json.dumps(token)} does not match an option.")
+        elif not options[index]:
+            errors.append(f"Question {number}: correct answer {json.dumps(token)} is an empty option.")
+        else:
+            correct.add(index)
+    options = [(o, i in correct) for i, o in enumerate(options) if o]
+
+    if not text:
+        errors.append(f"Question {number}: question text is empty.")
+    if len(options) < 2:
+        errors.append(f"Question {number}: at least two options are required.")
+    if not correct and not errors:
+        errors.append(f"Question {number}: no correct answer given.")
+    if len(correct) > 1 and not allow_multiple:
+        errors.append(f"Question {number}: several correct answers, but the quiz allows only one.")
+    return errors, (text, options)
+
+
+def _csv_entries(data):
+    reader = csv.DictReader(io.StringIO(data))
+    fields = [f.strip().lower() for f in (reader.fieldnames or [])]
+    if 'question' not in fields or 'correct' not in fields:
+        raise QuestionBankError(["CSV needs 'question', 'option1'.. and 'correct' columns."])
+    for raw in reader:
+        row = {(k or '').strip().lower(): v for k, v in raw.items()}
+        options = [row[f] for f in fields if f.startswith('option')]
+        yield row.get('question'), options, [t for t in re.split(r'[;,|\s]+', row.get('correct') or '') if t]
+
+
+def _json_entries(data):
+    try:
+        items = json.loads(data)
+    except json.JSONDecodeError as exc:
+        raise QuestionBankError([f"Invalid JSON: {exc}"])
+    if isinstance(items, dict):
+        items = items.get('questions', [])
+    if not isinstance(items, list):
+        raise QuestionBankError(["JSON must be a list of questions."])
+    for item in items:
+        if not isinstance(item, dict):
+            yield None, [], []
+            continue
+        correct = item.get('correct', [])
+        yield item.get('question'), item.get('options') or [], correct if isinstance(correct, list) else [correct]
+
+
+def parse_bank(filename, data, allow_multiple=True):
+    """
+    Parse and validate a whole bank. Returns ``[(text, [(option, is_correct), ...]), ...]``
+    or raises ``QuestionBankError`` listing every problem found.
+    """
+    if filename.lower().endswith('.json'):
+        entries, index_of = _json_entries(data), _json_index
+    else:
+        entries, index_of = _csv_entries(data), _csv_index
+    questions, errors = [], []
+    for number, (text, options, correct) in enumerate(entries, start=1):
+        problems, question = _validate(number, text, options, correct, allow_multiple, index_of)
+        errors += problems
+        questions.append(question)
+    if not questions and not errors:
+        errors.append("The file contains no questions.")
+    if errors:
+        raise QuestionBankError(errors)
+    return questions
+
+
+# -----------------------------
+# IMPORT
+# -----------------------------
+@transaction.atomic
+def import_questions(quiz, questions):
+    """Insert parsed ``questions`` into ``quiz`` with two bulk inserts; returns the number added."""
+    created = Question.objects.bulk_create([Question(quiz=quiz, text=text) for text, _ in questions])
+    Option.objects.bulk_create([
+        Option(question=question, text=option, is_correct=is_correct)
+        for question, (_, options) in zip(created, questions)
+        for option, is_correct in options
+    ])
+    quiz.visible = True
+    quiz.save()  # also starts a new cache generation for the classroom
+    counters.recount(quiz.classroom, ['upcoming_quiz_count'])
+    return len(created)
+
+
+# -----------------------------
+# CACHED PAPER / ANSWER KEY
+# -----------------------------
+def quiz_paper(quiz):
+    """The quiz's questions with their options prefetched, cached per classroom generation."""
+    return caching.cached(
+        quiz.classroom_id, f"quiz_paper:{quiz.id}",
+        lambda: list(quiz.questions.order_by('id').prefetch_related('options')),
+    )
+
+
+def answer_key(paper):
+    """{question id: set of correct option ids} for a quiz paper."""
+    return {q.id: {o.id for o in q.options.all() if o.is_correct} for q in paper}
@@ -0,0 +1,109 @@
+# lms/quiz_events.py
+"""
+Server-sent events for a classroom's quiz windows.
+
+Quiz pages used to run their own clock against a time rendered into the page,
+or had to poll to learn that a quiz opened or closed. Now one long-lived
+``text/event-stream`` per page (``quiz_events`` view, served by the ASGI
+application) tells every connected student:
+
+* ``tick``   a snapshot of the classroom's visible quizzes: ``[{'quiz', 'state',
+             'remaining'}]``, ``state`` one of upcoming / open / closed and
+             ``remaining`` the seconds until it next changes. Sent on connect,
+             every ``HEARTBEAT`` seconds and right after every transition; the
+             page counts down locally in between.
+* ``open`` / ``close``  a quiz's window started or ended. A page holding an
+             attempt submits the answers so far when its quiz closes; the
+             attempt view accepts them for ``SUBMIT_GRACE`` after the end.
+
+Remaining times are relative, so a student's wrong clock does not matter. The
+stream wakes up exactly at the next transition. The quizzes are loaded when
+it starts and again whenever the classroom's cache generation changes (a
+teacher edited a quiz), which is a single cache read per wake-up -- an idle
+connection costs no queries. A stream ends after ``LIFETIME`` seconds and
+the browser's EventSource reconnects by itself, so no connection lives for
+ever.
+
+Under WSGI a stream cannot stay open without holding a worker thread, so the
+view sends one snapshot and lets EventSource reconnect every ``RETRY_MS``.
+That is polling again, only as a fallback.
+"""
+import asyncio
+import json
+from datetime import timedelta
+
+from django.utils import timezone
+
+from . import caching
+from .models import Quiz
+
+HEARTBEAT = 15      # seconds between snapshots while nothing changes
+LIFETIME = 10 * 60  # seconds before the server ends a stream (the client reconnects)
+RETRY_MS = 3000     # EventSource reconnection delay
+SUBMIT_GRACE = timedelta(seconds=30)  # answers sent when a quiz closes may arrive a little late
+UPCOMING, OPEN, CLOSED = 'upcoming', 'open', 'closed'
+
+
+def state(quiz, now):
+    """``(state, seconds until the next change)``; ``None`` once closed."""
+    if now < quiz['start_time']:
+        return UPCOMING, (quiz['start_time'] - now).total_seconds()
+    if now < quiz['end_time']:
+        return OPEN, (quiz['end_time'] - now).total_seconds()
+    return CLOSED, None
+
+
+def snapshot(quizzes, now):
+    result = []
+    for quiz in quizzes:
+        current, remaining = state(quiz, now)
+        result.append({
+            'quiz': quiz['pk'],
+            'state': current,
+            'remaining': None if remaining is None else round(remaining, 1),
+        })
+    return result
+
+
+def message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _quizzes(classroom_id):
+    return Quiz.objects.filter(classroom_id=classroom_id, visible=True) \
+        .values('pk', 'start_time', 'end_time').order_by('start_time', 'pk')
+
+
+def single(classroom_id):
+    """The whole response for a server that cannot hold a stream open: one snapshot."""
+    return [f"retry: {RETRY_MS}\n\n", message('tick', snapshot(list(_quizzes(classroom_id)), timezone.now()))]
+
+
+async def stream(classroom_id, lifetime=LIFETIME, sleep=asyncio.sleep, clock=timezone.now):
+    """The event stream of a classroom (an async iterator of SSE messages)."""
+    yield f"retry: {RETRY_MS}\n\n"
+    generation = await caching.ageneration(classroom_id)
+    quizzes = [quiz async for quiz in _quizzes(classroom_id)]
+    previous = {}
+    ends = clock() + timedelta(seconds=lifetime)
+    while True:
+        now = clock()
+        current = snapshot(quizzes, now)
+        for entry in current:
+            before = previous.get(entry['quiz'])
+            if before is not None and before != entry['state'] and entry['state'] in (OPEN, CLOSED):
+                yield message('open' if entry['state'] == OPEN else 'close', {'quiz': entry['quiz']})
+        yield message('tick', current)
+        previous = {entry['quiz']: entry['state'] for entry in current}
+
+        left = (ends - now).total_seconds()
+        if left <= 0:
+            return
+        waits = [entry['remaining'] for entry in current if entry['remaining'] is not None]
+        # Wake just after the next transition so it is reported on time
+        await sleep(min([HEARTBEAT, left] + [remaining + 0.05 for remaining in waits]))
+
+        latest = await caching.ageneration(classroom_id)
+        if latest != generation:
+            generation = latest
+            quizzes = [quiz async for quiz in _quizzes(classroom_id)]
@@ -0,0 +1,211 @@
+# lms/reports.py
+"""
+Cross-classroom reports built from grouped aggregate queries.
+
+Each report runs a fixed number of GROUP BY queries over the whole set of
+classrooms instead of looping per student, and is cached for a short time.
+"""
+import math
+
+from django.core.cache import cache
+from django.db.models import Count, Exists, OuterRef, Q
+from django.urls import reverse
+from django.utils import timezone
+
+from .attendance import get_store
+from .models import Assignment, Enrollment, Quiz, QuizAttempt, Submission
+
+AT_RISK_CACHE_TTL = 120  # seconds
+DEFAULT_ATTENDANCE_THRESHOLD = 75
+
+# A submission row with no file and no marks is the placeholder created by auto-zeroing
+AUTO_ZERO_SUBMISSION = (Q(file='') | Q(file__isnull=True)) & (Q(marks=0) | Q(marks__isnull=True))
+
+
+# -----------------------------
+# AT-RISK STUDENTS (teacher)
+# -----------------------------
+def parse_threshold(value):
+    """
+    An attendance threshold (percent) from request input: clamped to 0-100;
+    the default for anything that isn't a finite number (``nan``, ``inf``, text).
+    """
+    try:
+        threshold = float(value)
+    except (TypeError, ValueError):
+        return DEFAULT_ATTENDANCE_THRESHOLD
+    if not math.isfinite(threshold):
+        return DEFAULT_ATTENDANCE_THRESHOLD
+    return min(max(threshold, 0), 100)
+
+
+def at_risk_report(teacher, attendance_threshold=DEFAULT_ATTENDANCE_THRESHOLD):
+    """
+    Students across all of ``teacher``'s classrooms who are below the
+    attendance threshold, have overdue (auto-zero) assignments or missed quizzes.
+
+    Returns a list of ``{'classroom': ..., 'students': [...]}`` groups.
+    """
+    cache_key = f"lms:at_risk:{teacher.id}:{attendance_threshold}"
+    report = cache.get(cache_key)
+    if report is None:
+        report = _build_at_risk_report(teacher, attendance_threshold)
+        cache.set(cache_key, report, AT_RISK_CACHE_TTL)
+    return report
+
+
+def _build_at_risk_report(teacher, attendance_threshold):
+    now = timezone.now()
+
+    # 1. Roster of every enrollment in the teacher's classrooms
+    roster = Enrollment.objects.filter(
+        classroom__teacher=teacher,
+        classroom__pending_delete_at__isnull=True,
+        classroom__archived_at__isnull=True,
+    ).values(
+        'id', 'student_id', 'student__username', 'student__profile__reg_no',
+        'classroom_id', 'classroom__code', 'classroom__name',
+    )
+
+    # 2. Attendance totals per enrollment (row counts or bitmap popcounts)
+    attendance = get_store().totals(Enrollment.objects.filter(classroom__teacher=teacher, classroom__archived_at__isnull=True))
+
+    # 3. Assignments past deadline per classroom vs. real (non auto-zero) submissions per student
+    ended_assignments = dict(
+        Assignment.objects.filter(
+            classroom__teacher=teacher, classroom__archived_at__isnull=True, visible=True, deadline__lt=now,
+        )
+        .values('classroom_id').annotate(n=Count('id')).order_by()
+        .values_list('classroom_id', 'n')
+    )
+    submitted = {
+        (row['student_id'], row['assignment__classroom_id']): row['n']
+        for row in Submission.objects.filter(
+            assignment__classroom__teacher=teacher,
+            assignment__classroom__archived_at__isnull=True,
+            assignment__visible=True,
+            assignment__deadline__lt=now,
+        ).exclude(AUTO_ZERO_SUBMISSION)
+        .values('student_id', 'assignment__classroom_id')
+        .annotate(n=Count('id')).order_by()
+    }
+
+    # 4. Quizzes that have closed per classroom vs. quizzes actually attempted per student
+    ended_quizzes = dict(
+        Quiz.objects.filter(
+            classroom__teacher=teacher, classroom__archived_at__isnull=True, visible=True, end_time__lt=now,
+        )
+        .values('classroom_id').annotate(n=Count('id')).order_by()
+        .values_list('classroom_id', 'n')
+    )
+    attempted = {
+        (row['student_id'], row['quiz__classroom_id']): row['n']
+        for row in QuizAttempt.objects.filter(
+            quiz__classroom__teacher=teacher,
+            quiz__classroom__archived_at__isnull=True,
+            quiz__visible=True,
+            quiz__end_time__lt=now,
+            auto_submitted=False,
+        )
+        .values('student_id', 'quiz__classroom_id')
+        .annotate(n=Count('quiz_id', distinct=True)).order_by()
+    }
+
+    groups = {}
+    for e in roster:
+        key = (e['student_id'], e['classroom_id'])
+        total, present = attendance.get(e['id'], (0, 0))
+        attendance_pct = round(present / total * 100, 2) if total else None
+        overdue = ended_assignments.get(e['classroom_id'], 0) - submitted.get(key, 0)
+        missed = ended_quizzes.get(e['classroom_id'], 0) - attempted.get(key, 0)
+
+        reasons = []
+        if attendance_pct is not None and attendance_pct < attendance_threshold:
+            reasons.append('attendance')
+        if overdue > 0:
+            reasons.append('overdue')
+        if missed > 0:
+            reasons.append('quizzes')
+        if not reasons:
+            continue
+
+        group = groups.setdefault(e['classroom_id'], {
+            'classroom': {
+                'id': e['classroom_id'],
+                'code': e['classroom__code'],
+                'name': e['classroom__name'],
+            },
+            'students': [],
+        })
+        group['students'].append({
+            'student_id': e['student_id'],
+            'username': e['student__username'],
+            'reg_no': e['student__profile__reg_no'],
+            'attendance': attendance_pct,
+            'overdue': overdue,
+            'missed_quizzes': missed,
+            'reasons': reasons,
+        })
+
+    report = sorted(groups.values(), key=lambda g: g['classroom']['code'])
+    for group in report:
+        group['students'].sort(key=lambda s: (s['attendance'] if s['attendance'] is not None else 100, s['username']))
+    return report
+
+
+# -----------------------------
+# PENDING WORK (student)
+# -----------------------------
+def pending_work(student):
+    """
+    Unsubmitted assignments and unattempted quizzes that are still open, across
+    every classroom ``student`` is enrolled in, ordered by due time.
+
+    Two anti-join queries (NOT EXISTS on Submission / QuizAttempt).
+    """
+    now = timezone.now()
+
+    assignments = (
+        Assignment.objects.filter(
+            classroom__enrollments__student=student,
+            classroom__pending_delete_at__isnull=True,
+            classroom__archived_at__isnull=True,
+            visible=True,
+            deadline__gt=now,
+        )
+        .filter(~Exists(Submission.objects.filter(assignment=OuterRef('pk'), student=student)))
+        .select_related('classroom')
+        .order_by('deadline')
+    )
+    quizzes = (
+        Quiz.objects.filter(
+            classroom__enrollments__student=student,
+            classroom__pending_delete_at__isnull=True,
+            classroom__archived_at__isnull=True,
+            visible=True,
+            end_time__gt=now,
+        )
+        .filter(~Exists(QuizAttempt.objects.filter(quiz=OuterRef('pk'), student=student)))
+        .select_related('classroom')
+        .order_by('end_time')
+    )
+
+    items = [{
+        'kind': 'assignment',
+        'title': a.title,
+        'classroom': a.classroom,
+        'due': a.deadline,
+        'is_open': True,
+        'url': reverse('class_assignments_student', args=[a.classroom_id]),
+    } for a in assignments]
+    items += [{
+        'kind': 'quiz',
+        'title': q.title,
+        'classroom': q.classroom,
+        'due': q.end_time,
+        'is_open': q.start_time <= now,
+        'url': reverse('attempt_quiz', args=[q.id]) if q.start_time <= now
+        else reverse('class_quizzes_student', args=[q.classroom_id]),
+    } for q in quizzes]
+    items.sort(key=lambda item: item['due'])
+    return items
@@ -0,0 +1,201 @@
+# lms/server_benchmark.py
+"""
+Concurrent-throughput benchmark of the read pages under WSGI and ASGI
+(``manage.py benchmark_servers``).
+
+Both servers are driven in-process, without sockets, so only Django and the
+views are measured:
+
+* WSGI: ``get_wsgi_application()`` called from N threads, as a threaded WSGI
+  server (gunicorn --threads, mod_wsgi) would; the sync views of lms/views.py.
+* ASGI: ``get_asgi_application()`` called from N concurrent tasks on one event
+  loop, as uvicorn would; the async views of lms/async_views.py.
+
+Each of the N clients sends its next request as soon as the previous one is
+answered. The pages are the resources, discussions and quiz list of one
+classroom, requested in turn as one enrolled student, without ETags, so every
+request is rendered in full. Each mode runs in its own process, because
+``LMS_ASYNC_VIEWS`` picks the URL routes once per process.
+
+Unless pointed at an existing classroom, the benchmark creates its own under
+unique names in the configured database and removes it -- rows, users and the
+login session -- when it is done (``dataset()`` / ``remove()``).
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from . import purge
+from .models import Classroom, Discussion, Enrollment, Profile, Quiz, Resource
+
+HOST = 'localhost'
+PAGES = ('class_resources', 'class_discussions', 'class_quizzes_student')
+
+
+# -----------------------------
+# DATASET
+# -----------------------------
+def dataset(resources=60, discussions=40, quizzes=20):
+    """A new benchmark classroom and its student, under names no real data uses: ``(classroom, student)``."""
+    tag = f"bench-{uuid.uuid4().hex[:8]}"
+    with transaction.atomic():
+        teacher = User.objects.create(username=f"{tag}-teacher")
+        Profile.objects.create(user=teacher, role='teacher')
+        student = User.objects.create(username=f"{tag}-student")
+        Profile.objects.create(user=student, role='student', reg_no=tag.upper())
+        classroom = Classroom.objects.create(code=tag.upper(), name='Benchmark course', teacher=teacher)
+        Enrollment.objects.create(classroom=classroom, student=student)
+        now = timezone.now()
+        Resource.objects.bulk_create(
+            Resource(classroom=classroom, title=f"Lecture {n}", description="Slides and notes " * 8,
+                     file=f"resources/{tag}-lecture-{n}.pdf", uploaded_by=teacher)
+            for n in range(resources)
+        )
+        Discussion.objects.bulk_create(
+            Discussion(classroom=classroom, author=teacher, title=f"Week {n}", content="Questions about " * 30)
+            for n in range(discussions)
+        )
+        Quiz.objects.bulk_create(
+            Quiz(classroom=classroom, title=f"Quiz {n}", visible=True,
+                 start_time=now + timedelta(days=n - quizzes // 2),
+                 end_time=now + timedelta(days=n - quizzes // 2, hours=1))
+            for n in range(quizzes)
+        )
+    return classroom, student
+
+
+def remove(classroom, student):
+    """Delete what ``dataset()`` created."""
+    Classroom.all_objects.filter(pk=classroom.pk).update(pending_delete_at=timezone.now())
+    purge.purge_classroom(classroom.pk)
+    User.objects.filter(pk__in=[classroom.teacher_id, student.pk]).delete()
+
+
+def session_cookie(user):
+    """A ``Cookie`` header value of a logged-in session for ``user``, as if they had signed in."""
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = str(user.pk)
+    session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    return f"{settings.SESSION_COOKIE_NAME}={session.session_key}"
+
+
+def end_session(cookie):
+    """Log out the session behind a ``session_cookie()`` value."""
+    import_module(settings.SESSION_ENGINE).SessionStore(cookie.partition('=')[2]).delete()
+
+
+def paths(classroom_id):
+    return [reverse(name, args=[classroom_id]) for name in PAGES]
+
+
+def summary(latencies, failures, elapsed):
+    ordered = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'failures': failures,
+        'throughput': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(statistics.median(ordered) * 1000, 1),
+        'p95_ms': round(ordered[int(len(ordered) * 0.95) - 1] * 1000, 1),
+    }
+
+
+# -----------------------------
+# WSGI
+# -----------------------------
+def run_wsgi(urls, cookie, requests, concurrency):
+    from django.core.wsgi import get_wsgi_application
+    application = get_wsgi_application()
+
+    def request(path):
+        environ = {
+            'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'SERVER_NAME': HOST, 'HTTP_HOST': HOST,
+            'HTTP_COOKIE': cookie,
+        }
+        setup_testing_defaults(environ)
+        status = []
+        started = time.perf_counter()
+        body = application(environ, lambda line, headers, exc_info=None: status.append(line))
+        try:
+            for _ in body:
+                pass
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return time.perf_counter() - started, status[0].startswith('200')
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(request, urls))  # warm-up: connections, caches, templates
+        started = time.perf_counter()
+        results = list(pool.map(request, [urls[n % len(urls)] for n in range(requests)]))
+        elapsed = time.perf_counter() - started
+    return summary([latency for latency, _ in results], sum(not ok for _, ok in results), elapsed)
+
+
+# -----------------------------
+# ASGI
+# -----------------------------
+def run_asgi(urls, cookie, requests, concurrency):
+    from django.core.asgi import get_asgi_application
+    application = get_asgi_application()
+
+    async def request(path):
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'host', HOST.encode()), (b'cookie', cookie.encode())],
+            'client': ('127.0.0.1', 50000), 'server': (HOST, 80),
+        }
+        requested = False
+        finished = asyncio.Event()
+        status = []
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+            await finished.wait()  # the client stays connected until the response is complete
+            return {'type': 'http.disconnect'}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                status.append(message['status'])
+            elif message['type'] == 'http.response.body' and not message.get('more_body'):
+                finished.set()
+
+        started = time.perf_counter()
+        await application(scope, receive, send)
+        return time.perf_counter() - started, status == [200]
+
+    async def client(queue, results):
+        while queue:
+            results.append(await request(queue.pop()))
+
+    async def load(urls_to_request):
+        queue = list(reversed(urls_to_request))
+        results = []
+        await asyncio.gather(*(client(queue, results) for _ in range(concurrency)))
+        return results
+
+    async def main():
+        await load(list(urls) * max(1, concurrency // len(urls)))  # warm-up
+        started = time.perf_counter()
+        results = await load([urls[n % len(urls)] for n in range(requests)])
+        return results, time.perf_counter() - started
+
+    results, elapsed = asyncio.run(main())
+    return summary([latency for latency, _ in results], sum(not ok for _, ok in results), elapsed)
@@ -0,0 +1,82 @@
+# lms/signals.py
+"""
+Model signals that keep cached state fresh: classroom cache generations
+(lms/caching.py) and session principals (lms/principal.py). Saved uploads
+queue background jobs (lms/jobs.py) in the same transaction: derivatives
+(lms/derivatives.py), submission signatures (lms/similarity.py) and the
+classroom's full-text index (lms/content_index.py).
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import caching, content_index, derivatives, principal, similarity
+from .models import Assignment, Discussion, Option, Profile, Question, Quiz, Reply, Resource, Submission
+
+
+@receiver([post_save, post_delete], sender=Assignment)
+@receiver([post_save, post_delete], sender=Quiz)
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=Discussion)
+def bump_classroom_generation(sender, instance, **kwargs):
+    caching.bump(instance.classroom_id)
+
+
+@receiver([post_save, post_delete], sender=Reply)
+def bump_generation_for_reply(sender, instance, **kwargs):
+    classroom_id = (
+        Discussion.objects.filter(pk=instance.discussion_id)
+        .values_list('classroom_id', flat=True)
+        .first()
+    )
+    caching.bump(classroom_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def bump_generation_for_question(sender, instance, **kwargs):
+    # Cached quiz papers / answer keys (lms/question_bank.py)
+    classroom_id = Quiz.objects.filter(pk=instance.quiz_id).values_list('classroom_id', flat=True).first()
+    caching.bump(classroom_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def bump_generation_for_option(sender, instance, **kwargs):
+    classroom_id = (
+        Question.objects.filter(pk=instance.question_id)
+        .values_list('quiz__classroom_id', flat=True)
+        .first()
+    )
+    caching.bump(classroom_id)
+
+
+@receiver([post_save, post_delete], sender=Profile)
+def invalidate_principal_for_profile(sender, instance, **kwargs):
+    principal.invalidate(instance.user_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_principal_for_user(sender, instance, **kwargs):
+    # Password changes must go back through Django's session hash check
+    principal.invalidate(instance.pk)
+
+
+@receiver(post_save, sender=Submission)
+@receiver(post_save, sender=Resource)
+def derive_uploaded_file(sender, instance, **kwargs):
+    derivatives.schedule([instance.file.name])
+
+
+@receiver(post_save, sender=Assignment)
+def derive_assignment_attachment(sender, instance, **kwargs):
+    derivatives.schedule([instance.attachment.name])
+
+
+@receiver(post_save, sender=Submission)
+def index_submission_text(sender, instance, **kwargs):
+    similarity.schedule([instance.file.name])
+
+
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=Assignment)
+def reindex_classroom_files(sender, instance, **kwargs):
+    content_index.schedule(instance.classroom_id)
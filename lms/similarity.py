@@ -0,0 +1,132 @@
+# lms/similarity.py
+"""
+Near-duplicate detection across the submissions of an assignment.
+
+Each submitted file is read once, in a background job: its text is extracted
+(lms/pdf.py) and reduced to a MinHash signature (lms/minhash.py), stored as a
+SubmissionSignature keyed by the file's storage name. A resubmission is saved
+under a new name, so only that one file is indexed again; every other
+signature is reused as it is.
+
+``report()`` never opens a file. It loads the assignment's signatures in one
+query, buckets them by LSH band so only submissions sharing a band are
+compared -- instead of all n² pairs -- and ranks the candidate pairs by their
+estimated similarity. Byte-identical files are always reported, text or not.
+
+``manage.py index_submissions`` fills in signatures for older uploads.
+"""
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+from django.core.files.storage import default_storage
+
+from . import jobs, minhash
+from .models import Submission, SubmissionSignature
+
+THRESHOLD = 0.5  # estimated Jaccard similarity from which a pair is reported
+MAX_PAIRS = 100
+
+
+# -----------------------------
+# INDEXING
+# -----------------------------
+def schedule(names):
+    """Queue signatures for the submission files ``names`` that have none yet (joins the caller's transaction)."""
+    names = {name for name in names if name}
+    if names:
+        names -= set(SubmissionSignature.objects.filter(name__in=names).values_list('name', flat=True))
+    if names:
+        jobs.enqueue('fingerprint_submissions', names=sorted(names))
+
+
+def store(name, info):
+    """Save one file's ``minhash.fingerprint()`` result."""
+    signature, _ = SubmissionSignature.objects.get_or_create(name=name, defaults={
+        'sha256': info['sha256'],
+        'shingles': info['shingles'],
+        'signature': info['signature'],
+        'error': info['error'],
+    })
+    return signature
+
+
+def missing_names():
+    """Names of submitted files that have no signature yet."""
+    names = set(Submission.objects.exclude(file='').exclude(file__isnull=True).values_list('file', flat=True))
+    return names - set(SubmissionSignature.objects.values_list('name', flat=True))
+
+
+def index(names, workers=None):
+    """Compute signatures for ``names`` now (``workers=1`` runs in-process). Returns the number stored."""
+    names = sorted(names)
+    paths = [default_storage.path(name) for name in names]
+    if workers == 1:
+        results = map(minhash.fingerprint, paths)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        results = pool.map(minhash.fingerprint, paths, chunksize=8)
+    try:
+        for name, info in zip(names, results):
+            store(name, info)
+    finally:
+        if workers != 1:
+            pool.shutdown()
+    return len(names)
+
+
+def remove(names):
+    SubmissionSignature.objects.filter(name__in=set(names)).delete()
+
+
+# -----------------------------
+# REPORT
+# -----------------------------
+def report(assignment, threshold=THRESHOLD, limit=MAX_PAIRS):
+    """
+    Most similar submission pairs of ``assignment``:
+    ``{'pairs': [{'first', 'second', 'similarity', 'identical'}], 'indexed', 'pending'}``
+    where ``first`` / ``second`` are ``(submission id, student username)``.
+    """
+    submissions = list(
+        Submission.objects.filter(assignment=assignment).exclude(file='').exclude(file__isnull=True)
+        .values_list('id', 'student__username', 'file')
+    )
+    signatures = {
+        s.name: s for s in SubmissionSignature.objects.filter(name__in={name for _, _, name in submissions})
+        .only('name', 'sha256', 'signature')
+    }
+    indexed = [(sid, username, signatures[name]) for sid, username, name in submissions if name in signatures]
+
+    # Candidates: submissions that share an LSH band, or the exact same bytes
+    buckets = defaultdict(list)
+    for i, (_, _, signature) in enumerate(indexed):
+        if signature.sha256:
+            buckets[('sha256', signature.sha256)].append(i)
+        if signature.signature:
+            for key in minhash.bands(bytes(signature.signature)):
+                buckets[key].append(i)
+    candidates = set()
+    for members in buckets.values():
+        candidates.update(combinations(members, 2))
+
+    pairs = []
+    for i, j in candidates:
+        (first_id, first_user, first), (second_id, second_user, second) = indexed[i], indexed[j]
+        identical = bool(first.sha256) and first.sha256 == second.sha256
+        if identical:
+            score = 1.0
+        elif first.signature and second.signature:
+            score = minhash.similarity(bytes(first.signature), bytes(second.signature))
+        else:
+            continue
+        if score >= threshold:
+            pairs.append({
+                'first': (first_id, first_user),
+                'second': (second_id, second_user),
+                'similarity': score,
+                'identical': identical,
+            })
+    pairs.sort(key=lambda pair: (-pair['similarity'], pair['first'][1], pair['second'][1]))
+    return {'pairs': pairs[:limit], 'indexed': len(indexed), 'pending': len(submissions) - len(indexed)}
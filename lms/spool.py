@@ -0,0 +1,269 @@
+# lms/spool.py
+"""
+Admission control for assignment uploads around a deadline.
+
+``submit_assignment`` writes no submission rows itself. It copies the upload
+into ``settings.LMS_SPOOL_DIR`` with a small JSON manifest stamped with the
+time the request was accepted, and that time becomes the submission's
+``submitted_at`` however long the upload waits. A committer then turns the
+spooled uploads into Submission / SubmissionHistory rows in batches, one short
+transaction per batch, so a deadline rush takes the SQLite write lock once per
+batch instead of twice per upload.
+
+The committer is a background job (lms/jobs.py): ``wake()`` queues one unless
+one is already waiting, which under a deadline rush is a single read per
+upload. A recurring sweep and ``manage.py commit_submissions`` drain the spool
+as well. Where no worker runs (``LMS_JOB_WORKER`` off, e.g. under runserver)
+``wake()`` commits in the request instead, so uploads never wait for a job
+nobody will run. Manifests are claimed by an atomic rename, so two committers never
+take the same upload, and a claim left behind by a crashed process is released
+again after ``CLAIM_TIMEOUT``.
+
+Pages ask which of a student's uploads are still waiting (``pending_for()``)
+on every render, so each entry also leaves an empty marker file in a
+directory of its student, removed when it is committed; the answer is one
+small directory listing, however full the spool is.
+
+When ``LMS_SPOOL_MAX_PENDING`` uploads are already waiting, ``accept`` raises
+``SpoolFull`` and the view answers 503 with Retry-After, instead of taking on
+more work than the committer can catch up with.
+"""
+import json
+import logging
+import os
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from . import counters, derivatives, jobs, similarity
+from .models import Assignment, Classroom, Submission, SubmissionHistory
+
+logger = logging.getLogger(__name__)
+
+CLAIM_TIMEOUT = 10 * 60  # seconds
+RETRY_AFTER = 5  # seconds a rejected upload is asked to wait
+
+PENDING, CLAIMED, UPLOAD = '.json', '.claimed', '.upload'
+
+
+class SpoolFull(Exception):
+    pass
+
+
+def spool_dir():
+    directory = str(getattr(settings, 'LMS_SPOOL_DIR', os.path.join(settings.BASE_DIR, 'spool')))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _student_dir(directory, student_id):
+    return os.path.join(directory, 'students', str(student_id))
+
+
+def _entries(directory, suffix):
+    """Spool entry names with ``suffix``, oldest first (names start with the accept time)."""
+    return sorted(e.name[:-len(suffix)] for e in os.scandir(directory) if e.name.endswith(suffix))
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w') as f:
+        json.dump(data, f)
+    os.replace(path + '.tmp', path)
+
+
+# -----------------------------
+# ACCEPTING
+# -----------------------------
+def pending_count():
+    return sum(1 for e in os.scandir(spool_dir()) if e.name.endswith((PENDING, CLAIMED)))
+
+
+def accept(assignment, student, upload, accepted_at):
+    """Spool ``upload`` as ``student``'s submission accepted at ``accepted_at``. Raises ``SpoolFull``."""
+    if pending_count() >= getattr(settings, 'LMS_SPOOL_MAX_PENDING', 1000):
+        raise SpoolFull()
+
+    directory = spool_dir()
+    # <accept time>-<student>-<assignment>-<random>: sortable, and pending_for() needs no file reads
+    entry = f"{time.time_ns():020d}-{student.id}-{assignment.id}-{uuid.uuid4().hex[:8]}"
+    with open(os.path.join(directory, entry + UPLOAD), 'wb') as out:
+        for chunk in upload.chunks():
+            out.write(chunk)
+    _write_json(os.path.join(directory, entry + PENDING), {
+        'assignment': assignment.id,
+        'student': student.id,
+        'name': os.path.basename(upload.name),
+        'accepted_at': accepted_at.isoformat(),
+    })
+    markers = _student_dir(directory, student.id)
+    os.makedirs(markers, exist_ok=True)
+    open(os.path.join(markers, entry), 'w').close()
+    return entry
+
+
+def pending_for(student_id):
+    """Assignment ids with an upload by ``student_id`` that is spooled but not yet committed."""
+    try:
+        entries = os.listdir(_student_dir(spool_dir(), student_id))
+    except FileNotFoundError:
+        return set()
+    return {int(entry.split('-')[2]) for entry in entries}
+
+
+# -----------------------------
+# COMMITTING
+# -----------------------------
+def _release_abandoned(directory):
+    cutoff = time.time() - CLAIM_TIMEOUT
+    for entry in _entries(directory, CLAIMED):
+        path = os.path.join(directory, entry + CLAIMED)
+        try:
+            if os.stat(path).st_mtime < cutoff:
+                os.rename(path, os.path.join(directory, entry + PENDING))
+        except FileNotFoundError:
+            pass  # committed or released by another committer meanwhile
+
+
+def _claim(directory, limit):
+    claimed = []
+    for entry in _entries(directory, PENDING):
+        path = os.path.join(directory, entry + CLAIMED)
+        try:
+            os.rename(os.path.join(directory, entry + PENDING), path)
+        except FileNotFoundError:
+            continue  # another committer took it
+        os.utime(path)  # the claim's age counts from now
+        claimed.append(entry)
+        if len(claimed) == limit:
+            break
+    return claimed
+
+
+def _write_rows(records):
+    """Create / update the submissions and their history for one batch (``records`` in accept order)."""
+    existing = {
+        (s.assignment_id, s.student_id): s
+        for s in Submission.objects.filter(
+            assignment_id__in={r['assignment'] for r in records},
+            student_id__in={r['student'] for r in records},
+        )
+    }
+    classroom_of = dict(
+        Assignment.objects.filter(id__in={r['assignment'] for r in records}).values_list('id', 'classroom_id')
+    )
+
+    submissions, created, history = {}, [], []
+    newly_ungraded = Counter()
+    for record in records:
+        key = (record['assignment'], record['student'])
+        submission = submissions.get(key) or existing.get(key)
+        if submission is None:
+            submission = Submission(assignment_id=key[0], student_id=key[1])
+            created.append(submission)
+            newly_ungraded[classroom_of[key[0]]] += 1
+            action = 'First Submission'
+        else:
+            if not submission.file and submission.pk:
+                # An auto-zero placeholder written while this on-time upload waited in the spool
+                submission.marks, submission.released = None, False
+                if submission.graded:
+                    newly_ungraded[classroom_of[key[0]]] += 1
+                submission.graded = False
+            else:
+                submission.last_resubmitted_at = record['accepted_at']
+            action = 'Resubmission' if submission.file else 'First Submission'
+        submission.file = record['file']
+        submission.submitted_at = record['accepted_at']
+        submissions[key] = submission
+        history.append((submission, action, record['accepted_at']))
+
+    accepted_at = {key: s.submitted_at for key, s in submissions.items()}
+    Submission.objects.bulk_create(created)
+    for key, submission in submissions.items():
+        submission.submitted_at = accepted_at[key]  # bulk_create stamped auto_now_add
+    Submission.objects.bulk_update(
+        list(submissions.values()), ['file', 'submitted_at', 'last_resubmitted_at', 'marks', 'graded', 'released']
+    )
+
+    rows = SubmissionHistory.objects.bulk_create([
+        SubmissionHistory(submission=submission, action=action) for submission, action, _ in history
+    ])
+    for row, (_, _, stamp) in zip(rows, history):
+        row.timestamp = stamp
+    SubmissionHistory.objects.bulk_update(rows, ['timestamp'])
+
+    for classroom in Classroom.all_objects.filter(id__in=newly_ungraded).only('id', 'teacher_id'):
+        counters.adjust(classroom, ungraded_count=newly_ungraded[classroom.id])
+
+
+def _commit(directory, entries):
+    records = []
+    for entry in entries:
+        with open(os.path.join(directory, entry + CLAIMED)) as f:
+            record = json.load(f)
+        record['entry'] = entry
+        record['accepted_at'] = parse_datetime(record['accepted_at'])
+        records.append(record)
+
+    # Uploads for assignments deleted in the meantime are dropped
+    live = set(Assignment.objects.filter(id__in={r['assignment'] for r in records}).values_list('id', flat=True))
+    records = [r for r in records if r['assignment'] in live]
+
+    # Move the files into media storage before taking the write lock
+    for record in records:
+        with open(os.path.join(directory, record['entry'] + UPLOAD), 'rb') as f:
+            record['file'] = default_storage.save(f"submissions/{record['name']}", File(f))
+    try:
+        with transaction.atomic():
+            _write_rows(records)
+            derivatives.schedule(record['file'] for record in records)
+            similarity.schedule(record['file'] for record in records)
+    except Exception:
+        for record in records:
+            default_storage.delete(record['file'])
+        for entry in entries:
+            os.rename(os.path.join(directory, entry + CLAIMED), os.path.join(directory, entry + PENDING))
+        raise
+
+    for entry in entries:
+        marker = os.path.join(_student_dir(directory, entry.split('-')[1]), entry)
+        for path in (os.path.join(directory, entry + CLAIMED), os.path.join(directory, entry + UPLOAD), marker):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    return len(records)
+
+
+def commit_pending(batch_size=None):
+    """Commit every spooled upload, ``batch_size`` per transaction. Returns the number committed."""
+    batch_size = batch_size or getattr(settings, 'LMS_SPOOL_BATCH_SIZE', 100)
+    directory = spool_dir()
+    _release_abandoned(directory)
+    committed = 0
+    while True:
+        entries = _claim(directory, batch_size)
+        if not entries:
+            return committed
+        committed += _commit(directory, entries)
+
+
+# -----------------------------
+# COMMITTER JOB
+# -----------------------------
+def wake():
+    """Queue the committer job unless one is already waiting to run; without a worker, commit now."""
+    if getattr(settings, 'LMS_JOB_WORKER', False):
+        jobs.enqueue('commit_submissions', key='commit_submissions')
+        return
+    try:
+        commit_pending()
+    except Exception:
+        # The upload is safe in the spool; the next wake() or manage.py commit_submissions retries it
+        logger.exception("Committing spooled submissions failed")
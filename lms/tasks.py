@@ -0,0 +1,75 @@
+# lms/tasks.py
+"""
+The background tasks run by ``manage.py runworker`` (queue in lms/jobs.py).
+
+Each task is a thin wrapper: the work itself lives in the module it belongs
+to, which also decides when to ``jobs.enqueue()`` it. Tasks must be safe to
+run twice -- a retry or an expired lease can repeat one -- which all of them
+are, because each one only finishes whatever is still left to do.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import content_index, counters, derivatives, jobs, notifications, purge, similarity, spool, uploads
+from .models import Job, NotificationEvent
+
+
+# -----------------------------
+# QUEUED BY THE APP
+# -----------------------------
+@jobs.task(priority=10)
+def commit_submissions():
+    spool.commit_pending()
+
+
+@jobs.task()
+def purge_classroom(classroom_id):
+    purge.purge_classroom(classroom_id)
+
+
+@jobs.task(priority=-5)
+def derive_files(names):
+    derivatives.generate(names, workers=1)
+
+
+@jobs.task(priority=-5)
+def fingerprint_submissions(names):
+    similarity.index(names, workers=1)
+
+
+@jobs.task(priority=-10)
+def index_classroom(classroom_id):
+    content_index.update(classroom_id)
+
+
+# -----------------------------
+# RECURRING
+# -----------------------------
+@jobs.task(every=timedelta(minutes=5))
+def sweep_spool():
+    # Uploads whose committer job was lost, or claims left by a crashed worker
+    spool.commit_pending()
+
+
+@jobs.task(every=timedelta(minutes=15))
+def refresh_classroom_counters():
+    # The open-assignment / upcoming-quiz counts change as deadlines pass, with no write to recount on
+    counters.recount_all()
+
+
+@jobs.task(every=timedelta(hours=6))
+def clean_upload_sessions():
+    uploads.clean_stale()
+
+
+@jobs.task(every=timedelta(minutes=getattr(settings, 'LMS_DIGEST_INTERVAL_MINUTES', 60)))
+def send_digests():
+    notifications.send_digests()
+
+
+@jobs.task(every=timedelta(days=1))
+def prune_jobs(days=7):
+    Job.objects.filter(status=Job.DONE, finished_at__lt=timezone.now() - timedelta(days=days)).delete()
+    NotificationEvent.objects.filter(sent_at__lt=timezone.now() - timedelta(days=days)).delete()
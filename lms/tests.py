@@ -1,3 +1,1392 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import zlib
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.conf import settings as django_settings
+from django.core import mail, serializers
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
+from django.db.models import F
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import (
+    analytics, archive, attendance, caching, calendar_feed, cloning, content_index, counters, derivatives, fulltext,
+    grading, jobs, minhash, notifications, pdf, principal, provisioning, quiz_events, reports, similarity, spool, tasks,
+    uploads,
+)
+from .forms import GradingSchemeForm
+from .question_bank import QuestionBankError, parse_bank
+from .models import (
+    Assignment, Attendance, AttendanceBitmap, Classroom, ClassSession, Discussion, Enrollment, FileDerivative, GradingScheme, Job,
+    NotificationEvent, Option, Profile, Question, Quiz, QuizAttempt, Reply, Resource, Submission, SubmissionHistory,
+    UploadSession,
+)
+from .pagination import SUBMISSION_SORTS, _encode, paginate
+
+
+def make_student(username, reg_no=None):
+    user = User.objects.create(username=username)
+    Profile.objects.create(user=user, role='student', reg_no=reg_no or username.upper())
+    return user
+
+
+class FileSandboxTestCase(TestCase):
+    """Media, search index, spool, staging and archive directories in a temporary tree (``self.root``)."""
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.media = f'{self.root}/media'
+        settings = override_settings(
+            MEDIA_ROOT=self.media, LMS_SEARCH_INDEX_DIR=f'{self.root}/index', LMS_SPOOL_DIR=f'{self.root}/spool',
+            LMS_UPLOAD_STAGING_DIR=f'{self.root}/staging', LMS_ARCHIVE_DIR=f'{self.root}/archive',
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class GradingTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.ann, self.bob = make_student('ann'), make_student('bob')
+        for student in (self.ann, self.bob):
+            Enrollment.objects.create(classroom=self.classroom, student=student)
+        now = timezone.now()
+        assignments = [
+            Assignment.objects.create(classroom=self.classroom, title=f'A{n}', deadline=now + timedelta(days=n))
+            for n in range(3)
+        ]
+        hidden = Assignment.objects.create(classroom=self.classroom, title='Hidden', deadline=now, visible=False)
+        for assignment, marks in zip(assignments, (90, 60, 30)):
+            Submission.objects.create(assignment=assignment, student=self.ann, marks=marks)
+        Submission.objects.create(assignment=assignments[0], student=self.bob, marks=80)  # the rest missing
+        Submission.objects.create(assignment=hidden, student=self.bob, marks=100)
+        quizzes = [
+            Quiz.objects.create(classroom=self.classroom, title=f'Q{n}', visible=True, end_time=now + timedelta(days=n))
+            for n in range(2)
+        ]
+        for quiz, scores in zip(quizzes, ((40, 70), (50,))):
+            for score in scores:
+                QuizAttempt.objects.create(quiz=quiz, student=self.ann, score=score)
+
+    def scheme(self, **fields):
+        GradingScheme.objects.update_or_create(classroom=self.classroom, defaults=fields)
+        return {row['student'].username: row for row in grading.compute_classroom_grades(self.classroom).rows()}
+
+    def test_matrices_take_visible_items_best_attempt_and_zero_for_missing_work(self):
+        book = grading.compute_classroom_grades(self.classroom)
+        self.assertEqual([s.username for s in book.students], ['ann', 'bob'])
+        self.assertEqual(book.assignment_matrix, [[90, 60, 30], [80, 0, 0]])
+        self.assertEqual(book.quiz_matrix, [[70, 50], [0, 0]])
+
+    def test_default_scheme_is_half_assignment_average_half_best_quiz(self):
+        rows = {row['student'].username: row for row in grading.compute_classroom_grades(self.classroom).rows()}
+        self.assertFalse(GradingScheme.objects.exists())
+        self.assertEqual(rows['ann']['assignment_score'], 60)
+        self.assertEqual(rows['ann']['quiz_score'], 70)
+        self.assertEqual(rows['ann']['final_grade'], 65)
+        self.assertEqual(rows['bob']['final_grade'], 13.33)
+
+    def test_policies_and_weights(self):
+        rows = self.scheme(assignment_policy='best', quiz_policy='average', assignment_weight=0.25, quiz_weight=0.75)
+        self.assertEqual(rows['ann']['assignment_score'], 90)
+        self.assertEqual(rows['ann']['quiz_score'], 60)
+        self.assertEqual(rows['ann']['final_grade'], 67.5)
+
+    def test_drop_lowest_keeps_at_least_one_item(self):
+        rows = self.scheme(assignment_policy='drop_lowest', drop_count=1)
+        self.assertEqual(rows['ann']['assignment_score'], 75)
+        self.assertEqual(rows['bob']['assignment_score'], 40)
+        rows = self.scheme(assignment_policy='drop_lowest', drop_count=5)
+        self.assertEqual(rows['ann']['assignment_score'], 90)
+        self.assertEqual(rows['bob']['assignment_score'], 80)
+
+    def test_no_items_grade_zero(self):
+        Assignment.objects.all().delete()
+        Quiz.objects.all().delete()
+        for policy in ('average', 'best', 'drop_lowest'):
+            rows = self.scheme(assignment_policy=policy, quiz_policy=policy)
+            self.assertEqual(rows['ann']['final_grade'], 0)
+
+    def test_form_rejects_negative_or_all_zero_weights(self):
+        fields = {'assignment_policy': 'average', 'quiz_policy': 'best', 'drop_count': 1}
+        for weights in ((-0.5, 1.5), (0, 0)):
+            form = GradingSchemeForm(dict(fields, assignment_weight=weights[0], quiz_weight=weights[1]))
+            self.assertFalse(form.is_valid(), weights)
+        self.assertTrue(GradingSchemeForm(dict(fields, assignment_weight=0, quiz_weight=1)).is_valid())
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create_user(username='teacher', password='pw12345!x')
+        Profile.objects.create(user=teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.assignment = Assignment.objects.create(
+            classroom=self.classroom, title='A1', deadline=timezone.now() + timedelta(days=1)
+        )
+        # Submission times differ only in microseconds, with a few exact ties
+        base = timezone.now().replace(microsecond=0)
+        for i in range(30):
+            submission = Submission.objects.create(assignment=self.assignment, student=make_student(f's{i:02}'))
+            Submission.objects.filter(pk=submission.pk).update(submitted_at=base + timedelta(microseconds=i // 2 * 7))
+
+    def queryset(self):
+        return Submission.objects.filter(assignment=self.assignment).annotate(sort_key=F('submitted_at'))
+
+    def walk(self, descending):
+        queryset = self.queryset()
+        pages, cursor = [], None
+        while True:
+            page = paginate(queryset, 'sort_key', descending=descending, cursor=cursor, per_page=7)
+            pages.append([s.pk for s in page])
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+            self.assertLess(len(pages), 10, 'next cursor keeps returning rows already seen')
+        # ...and back again from the last page
+        backwards, cursor = [pages[-1]], page.prev_cursor
+        while cursor is not None:
+            page = paginate(queryset, 'sort_key', descending=descending, cursor=cursor, per_page=7)
+            backwards.insert(0, [s.pk for s in page])
+            cursor = page.prev_cursor
+            self.assertLess(len(backwards), 10, 'previous cursor keeps returning rows already seen')
+        return queryset, pages, backwards
+
+    def test_pages_cover_every_row_once_in_order(self):
+        for descending in (False, True):
+            queryset, pages, _ = self.walk(descending)
+            order = ['-submitted_at', '-pk'] if descending else ['submitted_at', 'pk']
+            expected = list(queryset.order_by(*order).values_list('pk', flat=True))
+            self.assertEqual([pk for page in pages for pk in page], expected)
+            self.assertEqual(len(pages), 5)
+
+    def test_previous_cursors_return_the_same_pages(self):
+        for descending in (False, True):
+            _, pages, backwards = self.walk(descending)
+            self.assertEqual(backwards, pages)
+
+    def test_invalid_cursor_starts_at_first_page(self):
+        page = paginate(self.queryset(), 'sort_key', cursor='not-a-cursor', per_page=7)
+        self.assertEqual(len(page), 7)
+        self.assertFalse(page.has_previous)
+
+    def test_cursor_value_of_the_wrong_type_starts_at_first_page(self):
+        marks = Submission.objects.filter(assignment=self.assignment).annotate(sort_key=SUBMISSION_SORTS['marks'])
+        for queryset in (self.queryset(), marks):
+            for value in ('not-a-value', None, [1, 2], {'datetime': 'not-a-date'}, {'datetime': 7}):
+                page = paginate(queryset, 'sort_key', cursor=_encode(value, 1, 'next'), per_page=7)
+                self.assertEqual(len(page), 7)
+                self.assertFalse(page.has_previous)
+
+
+class ArchivedClassroomReportTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        self.student = make_student('s1')
+        now = timezone.now()
+        for code in ('LIVE', 'OLD'):
+            classroom = Classroom.objects.create(name=code, code=code, teacher=self.teacher)
+            Enrollment.objects.create(student=self.student, classroom=classroom)
+            Assignment.objects.create(classroom=classroom, title=f'{code} open', deadline=now + timedelta(days=1))
+            Assignment.objects.create(classroom=classroom, title=f'{code} missed', deadline=now - timedelta(days=1))
+            Quiz.objects.create(classroom=classroom, title=f'{code} quiz', visible=True,
+                                start_time=now, end_time=now + timedelta(hours=1))
+        Classroom.objects.filter(code='OLD').update(archived_at=now)
+
+    def test_pending_work_skips_archived_classrooms(self):
+        titles = {item['title'] for item in reports.pending_work(self.student)}
+        self.assertEqual(titles, {'LIVE open', 'LIVE quiz'})
+
+    def test_at_risk_report_skips_archived_classrooms(self):
+        report = reports._build_at_risk_report(self.teacher, 75)
+        self.assertEqual([group['classroom']['code'] for group in report], ['LIVE'])
+
+    def test_at_risk_threshold_must_be_a_finite_percentage(self):
+        self.client.force_login(self.teacher)
+        for value, threshold in (('60', 60), ('nan', 75), ('inf', 75), ('-inf', 75), ('abc', 75),
+                                 ('250', 100), ('-5', 0)):
+            response = self.client.get(reverse('at_risk_report'), {'threshold': value})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['threshold'], threshold, value)
+
+
+class ArchiveRoundTripTests(TestCase):
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir, ignore_errors=True)
+        settings = override_settings(LMS_ARCHIVE_DIR=self.archive_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        assignment = Assignment.objects.create(classroom=self.classroom, title='A1', deadline=timezone.now())
+        quiz = Quiz.objects.create(classroom=self.classroom, title='Q1')
+        discussion = Discussion.objects.create(classroom=self.classroom, author=teacher, title='D', content='?')
+        ClassSession.objects.create(classroom=self.classroom, date=date(2026, 1, 5))
+        for i in range(3):
+            student = make_student(f's{i}')
+            enrollment = Enrollment.objects.create(student=student, classroom=self.classroom)
+            Attendance.objects.create(enrollment=enrollment, date=date(2026, 1, 5), present=bool(i % 2))
+            submission = Submission.objects.create(assignment=assignment, student=student, marks=i, graded=True)
+            SubmissionHistory.objects.create(submission=submission)
+            QuizAttempt.objects.create(quiz=quiz, student=student, score=i)
+            parent = Reply.objects.create(discussion=discussion, author=student, content=f'r{i}')
+            Reply.objects.create(discussion=discussion, author=teacher, content=f're r{i}', parent=parent)
+
+    def snapshot(self):
+        return {
+            model._meta.label: serializers.serialize('json', model.objects.filter(**{lookup: self.classroom.pk}).order_by('pk'))
+            for model, lookup in archive.ARCHIVED_MODELS
+        }
+
+    def test_archive_then_restore_gives_back_identical_rows(self):
+        before = self.snapshot()
+        counts = archive.archive_classroom(self.classroom)
+        self.assertEqual(counts['lms.Reply'], 6)
+        self.assertEqual(counts['lms.SubmissionHistory'], 3)
+        for model, lookup in archive.ARCHIVED_MODELS:
+            self.assertFalse(model.objects.filter(**{lookup: self.classroom.pk}).exists(), model)
+
+        self.classroom.refresh_from_db()
+        self.assertIsNotNone(self.classroom.archived_at)
+        self.assertEqual([s['average'] for s in archive.section(self.classroom, 'assignments')], [1.0])
+
+        archive.restore_classroom(self.classroom)
+        self.assertEqual(self.snapshot(), before)
+        self.classroom.refresh_from_db()
+        self.assertIsNone(self.classroom.archived_at)
+
+    def test_rows_saved_during_archiving_stay_live(self):
+        submission = Submission.objects.filter(assignment__classroom=self.classroom).first()
+        delete_written = archive._delete_written
+
+        def late_write(model, pks, chunk_size):
+            # A request that passed the read-only guard before the classroom was marked
+            if not SubmissionHistory.objects.filter(action='Resubmitted').exists():
+                SubmissionHistory.objects.create(submission=submission, action='Resubmitted')
+            return delete_written(model, pks, chunk_size)
+
+        with mock.patch.object(archive, '_delete_written', side_effect=late_write):
+            counts = archive.archive_classroom(self.classroom)
+
+        self.assertEqual(counts['lms.SubmissionHistory'], 3)
+        late = SubmissionHistory.objects.get(action='Resubmitted')
+        self.assertTrue(Submission.objects.filter(pk=submission.pk).exists())
+        self.assertEqual(late.submission_id, submission.pk)
+        self.assertEqual(Submission.objects.filter(assignment__classroom=self.classroom).count(), 1)
+
+        self.classroom.refresh_from_db()
+        archive.restore_classroom(self.classroom)
+        self.assertEqual(SubmissionHistory.objects.filter(submission__assignment__classroom=self.classroom).count(), 4)
+        self.assertEqual(Submission.objects.filter(assignment__classroom=self.classroom).count(), 3)
+
+
+class ClassroomCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(username='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.other = Classroom.objects.create(name='Other', code='C2', teacher=self.teacher)
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return ['row']
+
+    def test_bump_takes_effect_only_when_the_transaction_commits(self):
+        before = caching.generation(self.classroom.id)
+        self.assertEqual(caching.generation(self.classroom.id), before)
+        with self.captureOnCommitCallbacks() as callbacks:
+            caching.bump(self.classroom.id)
+            self.assertEqual(caching.generation(self.classroom.id), before)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(caching.generation(self.classroom.id), before)
+
+        before = caching.generation(self.classroom.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    caching.bump(self.classroom.id)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(caching.generation(self.classroom.id), before)
+
+    def test_generations_matches_generation(self):
+        ids = [self.classroom.id, self.other.id]
+        self.assertEqual(caching.generations(ids), {pk: caching.generation(pk) for pk in ids})
+
+    def test_cached_value_is_rebuilt_after_a_write_to_the_classroom(self):
+        self.assertEqual(caching.cached(self.classroom.id, 'rows', self.build), ['row'])
+        self.assertEqual(caching.cached(self.classroom.id, 'rows', self.build), ['row'])
+        self.assertEqual(self.builds, 1)
+
+        other = caching.generation(self.other.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            discussion = Discussion.objects.create(classroom=self.classroom, author=self.teacher, title='D', content='?')
+        caching.cached(self.classroom.id, 'rows', self.build)
+        self.assertEqual(self.builds, 2)
+        self.assertEqual(caching.generation(self.other.id), other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reply.objects.create(discussion=discussion, author=self.teacher, content='!')
+        caching.cached(self.classroom.id, 'rows', self.build)
+        self.assertEqual(self.builds, 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            discussion.delete()
+        caching.cached(self.classroom.id, 'rows', self.build)
+        self.assertEqual(self.builds, 4)
+        self.assertEqual(caching.stats()['rows'], {'hits': 1, 'misses': 4, 'hit_rate': 20.0})
+
+    def test_file_based_backend(self):
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        backend = {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}
+        with override_settings(CACHES={'default': backend}):
+            for _ in range(2):
+                caching.cached(self.classroom.id, 'rows', self.build)
+            with self.captureOnCommitCallbacks(execute=True):
+                caching.bump(self.classroom.id)
+            caching.cached(self.classroom.id, 'rows', self.build)
+            self.assertEqual(caching.stats()['rows'], {'hits': 1, 'misses': 2, 'hit_rate': 33.33})
+        self.assertEqual(self.builds, 2)
+        self.assertTrue(os.listdir(location))
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create(username='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.student = make_student('ann')
+        Enrollment.objects.create(student=self.student, classroom=self.classroom)
+        self.assignment = Assignment.objects.create(
+            classroom=self.classroom, title='Essay', deadline=timezone.now() + timedelta(days=1),
+        )
+        self.url = reverse('class_assignments_student', args=[self.classroom.id])
+        self.client.force_login(self.student)
+
+    def test_unchanged_page_is_not_modified_until_an_assignment_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assignment.title = 'Essay, revised'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Essay, revised')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_logging_in_again_renders_a_fresh_csrf_token(self):
+        response = self.client.get(self.url)
+        etag, token = response['ETag'], response.context['csrf_token']
+        self.client.logout()
+        self.client.force_login(self.student)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertNotEqual(str(response.context['csrf_token']), str(token))
+
+    def test_students_not_enrolled_are_turned_away_before_the_etag_check(self):
+        self.client.force_login(make_student('outsider'))
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH='*')
+        self.assertRedirects(response, reverse('main'), fetch_redirect_response=False)
+
+
+class QuestionBankTests(SimpleTestCase):
+    def correct(self, questions):
+        return [[option for option, is_correct in options if is_correct] for _, options in questions]
+
+    def test_csv_correct_is_numbers_or_letters(self):
+        data = "question,option1,option2,option3,correct\nQ1,x,y,z,2\nQ2,x,y,z,A;c\n"
+        self.assertEqual(self.correct(parse_bank('bank.csv', data)), [['y'], ['x', 'z']])
+
+    def test_csv_never_matches_option_text(self):
+        with self.assertRaises(QuestionBankError) as raised:
+            parse_bank('bank.csv', "question,option1,option2,correct\nQ1,1,yes,yes\n")
+        self.assertIn("'yes' is not an option number or letter", str(raised.exception))
+        # A one-letter option text is still read as a letter
+        self.assertEqual(self.correct(parse_bank('bank.csv', "question,option1,option2,correct\nQ1,b,a,a\n")), [['b']])
+
+    def test_json_integers_are_positions_and_strings_are_text(self):
+        data = '[{"question": "Q1", "options": ["2", "1"], "correct": [2]},' \
+               ' {"question": "Q2", "options": ["2", "1"], "correct": ["2"]}]'
+        self.assertEqual(self.correct(parse_bank('bank.json', data)), [['1'], ['2']])
+
+    def test_json_rejects_ambiguous_answers(self):
+        data = '[{"question": "Q1", "options": ["Yes", "yes", "no"], "correct": ["YES"]},' \
+               ' {"question": "Q2", "options": ["a", "b"], "correct": [true]},' \
+               ' {"question": "Q3", "options": ["a", "b"], "correct": [1.0]},' \
+               ' {"question": "Q4", "options": ["a", "b"], "correct": ["B "]}]'
+        with self.assertRaises(QuestionBankError) as raised:
+            parse_bank('bank.json', data)
+        self.assertEqual(len(raised.exception.errors), 3)
+        self.assertIn("matches more than one option", raised.exception.errors[0])
+
+    def test_answers_refer_to_options_as_written_around_blank_ones(self):
+        data = "question,option1,option2,option3,correct\nQ1,x,,z,3\n"
+        self.assertEqual(parse_bank('bank.csv', data), [('Q1', [('x', False), ('z', True)])])
+        with self.assertRaises(QuestionBankError) as raised:
+            parse_bank('bank.csv', "question,option1,option2,option3,correct\nQ1,x,,z,2\n")
+        self.assertIn("is an empty option", str(raised.exception))
+        # A JSON option 0 is an option like any other
+        self.assertEqual(self.correct(parse_bank('bank.json', '[{"question": "Q1", "options": [0, 1], "correct": [1]}]')),
+                         [['0']])
+
+
+@override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class ProvisioningTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        make_student('s1', reg_no='R001')
+
+    def csv(self, count):
+        lines = ['reg_no,name,email,department'] + [f'R{n:03},Student {n},s{n}@example.com,CS' for n in range(1, count + 1)]
+        return '\n'.join(lines) + '\n'
+
+    def test_existing_reg_nos_are_skipped_and_everybody_is_enrolled(self):
+        rows = provisioning.read_rows(self.csv(3) + 'R002,Again,dup@example.com,CS\n')
+        result = provisioning.provision_students(rows, classroom=self.classroom, workers=1)
+        self.assertEqual((result.created, result.skipped, result.enrolled), (2, 2, 3))
+        self.assertEqual([reg_no for reg_no, _, _ in result.credentials], ['R002', 'R003'])
+        user = User.objects.get(username='R003')
+        self.assertEqual((user.first_name, user.last_name, user.profile.department), ('Student', '3', 'CS'))
+        self.assertTrue(user.check_password(result.credentials[1][2]))
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.enrolled_count, 3)
+
+    def test_missing_columns_are_reported(self):
+        with self.assertRaisesMessage(provisioning.ProvisioningError, 'department'):
+            provisioning.read_rows('reg_no,name,email\nR1,A,a@example.com\n')
+
+    @override_settings(LMS_PROVISION_MAX_ROWS=2)
+    def test_web_form_refuses_rosters_over_the_limit(self):
+        self.client.force_login(self.teacher)
+        url = reverse('provision_students', args=[self.classroom.id])
+        response = self.client.post(url, {'csv_file': SimpleUploadedFile('roster.csv', self.csv(3).encode())})
+        self.assertRedirects(response, reverse('class_manage', args=[self.classroom.id]), fetch_redirect_response=False)
+        self.assertFalse(User.objects.filter(username='R003').exists())
+
+        response = self.client.post(url, {'csv_file': SimpleUploadedFile('roster.csv', self.csv(2).encode())})
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertTrue(Enrollment.objects.filter(classroom=self.classroom, student__username='R002').exists())
+
+
+class ClassroomCounterTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(
+            classroom=self.classroom, title='A1', deadline=timezone.now() + timedelta(hours=1),
+        )
+        for n in range(3):
+            student = make_student(f's{n}')
+            Enrollment.objects.create(classroom=self.classroom, student=student)
+            Submission.objects.create(assignment=self.assignment, student=student, graded=bool(n))
+
+    def counts(self):
+        self.classroom.refresh_from_db()
+        return {field: getattr(self.classroom, field) for field in counters.COUNTER_FIELDS}
+
+    def test_recount_matches_the_source_tables(self):
+        counters.recount(self.classroom)
+        self.assertEqual(self.counts(), {
+            'enrolled_count': 3, 'ungraded_count': 1, 'open_assignment_count': 1, 'upcoming_quiz_count': 0,
+        })
+
+    def test_adjust_applies_deltas_and_refreshes_the_dashboard(self):
+        counters.recount(self.classroom)
+        version = counters.dashboard_version(self.teacher.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            counters.adjust(self.classroom, enrolled_count=-1, ungraded_count=2, upcoming_quiz_count=0)
+        self.assertEqual((self.counts()['enrolled_count'], self.counts()['ungraded_count']), (2, 3))
+        self.assertNotEqual(counters.dashboard_version(self.teacher.id), version)
+
+    def test_recurring_job_catches_deadlines_that_passed(self):
+        counters.recount(self.classroom)
+        Assignment.objects.filter(pk=self.assignment.pk).update(deadline=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(self.counts()['open_assignment_count'], 1)
+        tasks.refresh_classroom_counters()
+        self.assertEqual(self.counts()['open_assignment_count'], 0)
+        self.assertIsNotNone(jobs._tasks['refresh_classroom_counters'].every)
+
+
+class AttendanceStoreTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=teacher, role='teacher')
+        self.classroom = Classroom.objects.create(
+            name='Course', code='C1', teacher=teacher, start_date=date(2026, 1, 5),
+        )
+        self.enrollments = [
+            Enrollment.objects.create(classroom=self.classroom, student=make_student(name)) for name in ('ann', 'bob')
+        ]
+
+    def take(self, store):
+        """Mark a few days (one re-marked, one cleared) through ``store``."""
+        ann, bob = self.enrollments
+        store.save_day(self.classroom, self.enrollments, date(2026, 1, 5), {ann.id, bob.id})
+        store.save_day(self.classroom, self.enrollments, date(2026, 1, 6), {bob.id})
+        store.save_day(self.classroom, self.enrollments, date(2026, 1, 6), {ann.id})
+        store.save_day(self.classroom, self.enrollments, date(2026, 1, 7), set())
+        store.save_day(self.classroom, [ann], date(2026, 1, 20), {ann.id})
+        store.clear_day(self.classroom, self.enrollments, date(2026, 1, 7))
+
+    def read(self, store):
+        ann, bob = self.enrollments
+        enrollments = Enrollment.objects.filter(classroom=self.classroom)
+        return {
+            'day': store.day_map(enrollments, date(2026, 1, 6)),
+            'records': [store.records(ann), store.records(bob)],
+            'totals': store.totals(enrollments),
+            'matrix': sorted(store.matrix_rows(enrollments)),
+            'percent': [store.percent(ann), store.percent(bob)],
+        }
+
+    def expected(self):
+        ann, bob = self.enrollments
+        return {
+            'day': {ann.id: True, bob.id: False},
+            'records': [
+                [(date(2026, 1, 20), True), (date(2026, 1, 6), True), (date(2026, 1, 5), True)],
+                [(date(2026, 1, 6), False), (date(2026, 1, 5), True)],
+            ],
+            'totals': {ann.id: (3, 3), bob.id: (2, 1)},
+            'matrix': sorted([
+                (ann.id, date(2026, 1, 5), True), (ann.id, date(2026, 1, 6), True), (ann.id, date(2026, 1, 20), True),
+                (bob.id, date(2026, 1, 5), True), (bob.id, date(2026, 1, 6), False),
+            ]),
+            'percent': [100.0, 50.0],
+        }
+
+    def test_both_stores_read_back_what_was_written(self):
+        for name in ('rows', 'bitmap'):
+            store = attendance.get_store(name)
+            self.take(store)
+            self.assertEqual(self.read(store), self.expected(), name)
+            self.assertEqual([store.clear_enrollment(e) for e in self.enrollments], [3, 2])
+            self.assertEqual(store.totals(Enrollment.objects.all()), {})
+
+    def test_bitmap_packs_days_from_the_term_start(self):
+        self.take(attendance.BitmapStore())
+        self.assertFalse(Attendance.objects.exists())
+        bitmap = AttendanceBitmap.objects.get(enrollment=self.enrollments[0])
+        self.assertEqual(bitmap.term_start, date(2026, 1, 5))
+        self.assertEqual(attendance._to_int(bitmap.held), 1 << 15 | 0b11)
+        self.assertEqual(attendance._to_int(bitmap.present), 1 << 15 | 0b11)
+        self.assertEqual(
+            list(ClassSession.objects.filter(classroom=self.classroom).values_list('date', flat=True)),
+            [date(2026, 1, 5), date(2026, 1, 6), date(2026, 1, 20)],
+        )
+
+    def test_bitmap_remarking_a_day_after_the_start_date_moves_counts_it_once(self):
+        store = attendance.BitmapStore()
+        self.take(store)
+        Classroom.objects.filter(pk=self.classroom.pk).update(start_date=date(2026, 1, 6))
+        self.classroom.refresh_from_db()
+        ann, bob = self.enrollments
+        store.save_day(self.classroom, self.enrollments, date(2026, 1, 6), {bob.id})
+        totals = store.totals(Enrollment.objects.filter(classroom=self.classroom))
+        self.assertEqual(totals, {ann.id: (3, 2), bob.id: (2, 2)})
+
+    def test_convert_attendance_round_trip(self):
+        self.take(attendance.RowStore())
+        call_command('convert_attendance', '--to', 'bitmap', stdout=io.StringIO())
+        self.assertFalse(Attendance.objects.exists())
+        self.assertEqual(AttendanceBitmap.objects.count(), 2)
+        self.assertEqual(ClassSession.objects.count(), 3)
+        self.assertEqual(self.read(attendance.BitmapStore()), self.expected())
+
+        call_command('convert_attendance', '--to', 'rows', '--keep-source', stdout=io.StringIO())
+        self.assertEqual(AttendanceBitmap.objects.count(), 2)
+        self.assertEqual(self.read(attendance.RowStore()), self.expected())
+        call_command('convert_attendance', '--to', 'rows', stdout=io.StringIO())
+        self.assertFalse(AttendanceBitmap.objects.exists() or ClassSession.objects.exists())
+        self.assertEqual(self.read(attendance.RowStore()), self.expected())
+
+
+class AttendanceAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        self.classroom = Classroom.objects.create(
+            name='Course', code='C1', teacher=self.teacher, start_date=date(2026, 1, 5),
+        )
+        self.enrollments = [
+            Enrollment.objects.create(classroom=self.classroom, student=make_student(name)) for name in ('ann', 'bob')
+        ]
+        store = attendance.get_store()
+        ann, bob = self.enrollments
+        store.save_day(self.classroom, [ann, bob], date(2026, 1, 5), {ann.id, bob.id})
+        store.save_day(self.classroom, [ann, bob], date(2026, 1, 6), {ann.id})
+        store.save_day(self.classroom, [ann], date(2026, 1, 7), set())
+
+    def test_streaks_count_consecutive_absences_across_days_without_a_record(self):
+        P, A, N = analytics.PRESENT, analytics.ABSENT, analytics.NO_RECORD
+        self.assertEqual(analytics._streaks([A, A, P, A, N, A, A]), (3, 3))
+        self.assertEqual(analytics._streaks([A, A, A, P, N]), (0, 3))
+        self.assertEqual(analytics._streaks([]), (0, 0))
+
+    def test_trend_is_the_least_squares_line(self):
+        self.assertEqual(analytics._trend([50.0, 70.0, 90.0]), (20.0, [50.0, 70.0, 90.0]))
+        slope, fitted = analytics._trend([100.0, 0.0, 100.0, 0.0])
+        self.assertAlmostEqual(slope, -20.0)
+        self.assertEqual(fitted, [80.0, 60.0, 40.0, 20.0])
+        self.assertEqual(analytics._trend([40.0]), (0.0, [40.0]))
+
+    def test_heatmap_holds_every_student_and_day(self):
+        data = analytics.attendance_analytics(self.classroom)
+        self.assertEqual(data['dates'], ['2026-01-05', '2026-01-06', '2026-01-07'])
+        self.assertEqual([s['username'] for s in data['students']], ['ann', 'bob'])
+        self.assertEqual(data['matrix'], [[1, 1, 0], [1, 0, -1]])
+        self.assertEqual(data['daily_rate'], [100.0, 50.0, 0.0])
+        self.assertEqual((data['trend_slope'], data['average_rate']), (-50.0, 50.0))
+        self.assertEqual(
+            [(s['percent'], s['current_streak'], s['longest_streak']) for s in data['students']],
+            [(66.67, 1, 1), (50.0, 1, 1)],
+        )
+
+    def test_new_enrollments_show_up_at_once(self):
+        analytics.attendance_analytics(self.classroom)
+        make_student('cat', reg_no='R-CAT')
+        self.client.force_login(self.teacher)
+        self.client.post(reverse('add_student', args=[self.classroom.id]), {'reg_no': 'R-CAT'})
+        students = analytics.attendance_analytics(self.classroom)['students']
+        self.assertEqual([s['username'] for s in students], ['ann', 'bob', 'cat'])
+
+
+class CloneClassroomTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher')
+        self.source = Classroom.objects.create(name='OS', code='OS-25', teacher=self.teacher, start_date=date(2025, 1, 6))
+        Assignment.objects.create(classroom=self.source, title='Lab 1', deadline=timezone.now(), visible=True)
+        for n in (1, 2):
+            quiz = Quiz.objects.create(classroom=self.source, title=f'Quiz {n}', visible=True)
+            for m in (1, 2):
+                question = Question.objects.create(quiz=quiz, text=f'Q{n}.{m}')
+                Option.objects.create(question=question, text='right', is_correct=True)
+                Option.objects.create(question=question, text='wrong')
+        Resource.objects.create(classroom=self.source, title='Notes', file='resources/notes.pdf', uploaded_by=self.teacher)
+        GradingScheme.objects.create(classroom=self.source, assignment_weight=0.7, quiz_weight=0.3)
+        make_student('s1')
+
+    def test_children_point_at_the_copies_and_dates_move_with_the_term(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            clone, copied, _ = cloning.clone_classroom(self.source, 'OS-26', start_date=date(2026, 1, 5))
+        self.assertEqual(copied, {'assignments': 1, 'quizzes': 2, 'questions': 4, 'options': 8, 'resources': 1})
+
+        for quiz in clone.quizzes.all():
+            for question in quiz.questions.all():
+                self.assertTrue(question.text.startswith(quiz.title.replace('Quiz ', 'Q')))
+                self.assertEqual(sorted(question.options.values_list('text', 'is_correct')),
+                                 [('right', True), ('wrong', False)])
+        self.assertEqual(Question.objects.filter(quiz__classroom=self.source).count(), 4)
+
+        shift = date(2026, 1, 5) - date(2025, 1, 6)
+        original, copy = self.source.assignments.get(), clone.assignments.get()
+        self.assertEqual(copy.deadline - original.deadline, shift)
+        self.assertEqual(clone.quizzes.get(title='Quiz 1').end_time - self.source.quizzes.get(title='Quiz 1').end_time,
+                         shift)
+        self.assertEqual(clone.grading_scheme.assignment_weight, 0.7)
+        self.assertFalse(clone.enrollments.exists())
+
+    def test_clone_is_indexed_for_search_and_counted(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            clone, _, _ = cloning.clone_classroom(self.source, 'OS-26')
+        self.assertTrue(Job.objects.filter(name='index_classroom', kwargs={'classroom_id': clone.id}).exists())
+        clone.refresh_from_db()
+        self.assertEqual((clone.open_assignment_count, clone.upcoming_quiz_count), (0, 2))
+
+
+class SessionPrincipalTests(TestCase):
+    def setUp(self):
+        self.user = make_student('s1')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('main')).status_code, 200)
+        self.assertIn(principal.SESSION_KEY, self.client.session)
+
+    def test_principal_is_reused_while_the_password_is_unchanged(self):
+        response = self.client.get(reverse('main'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.wsgi_request.principal.username, 's1')
+
+    def test_password_change_logs_out_without_the_cache(self):
+        # .update() skips the signal, like a change made by a process whose cache this one never sees
+        User.objects.filter(pk=self.user.pk).update(password=make_password('changed-pw-1'))
+        response = self.client.get(reverse('main'))
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+    def test_deactivated_user_is_logged_out(self):
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get(reverse('main')).status_code, 302)
+
+
+class SubmissionSpoolTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(
+            MEDIA_ROOT=f'{root}/media', LMS_SPOOL_DIR=f'{root}/spool', LMS_SPOOL_MAX_PENDING=3, LMS_SPOOL_BATCH_SIZE=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.assignment = Assignment.objects.create(
+            classroom=self.classroom, title='A1', deadline=timezone.now() + timedelta(hours=1)
+        )
+        self.student = make_student('s1')
+        Enrollment.objects.create(student=self.student, classroom=self.classroom)
+
+    def upload(self, content=b'%PDF-1.4 test'):
+        return SimpleUploadedFile('answer.pdf', content, content_type='application/pdf')
+
+    def test_commit_uses_accept_time_and_writes_history(self):
+        first = timezone.now() - timedelta(microseconds=900)
+        spool.accept(self.assignment, self.student, self.upload(b'one'), first)
+        spool.accept(self.assignment, self.student, self.upload(b'two'), first + timedelta(microseconds=7))
+        self.assertEqual(spool.pending_for(self.student.id), {self.assignment.id})
+
+        self.assertEqual(spool.commit_pending(), 2)
+        submission = Submission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual(submission.submitted_at, first + timedelta(microseconds=7))
+        self.assertEqual(submission.file.read(), b'two')
+        self.assertEqual(
+            list(submission.history.order_by('timestamp').values_list('action', 'timestamp')),
+            [('First Submission', first), ('Resubmission', first + timedelta(microseconds=7))],
+        )
+        self.assertEqual(spool.pending_for(self.student.id), set())
+        self.classroom.refresh_from_db()
+        self.assertEqual(self.classroom.ungraded_count, 1)
+
+    def test_on_time_upload_replaces_auto_zero_placeholder(self):
+        accepted_at = timezone.now()
+        spool.accept(self.assignment, self.student, self.upload(), accepted_at)
+        Submission.objects.create(assignment=self.assignment, student=self.student, marks=0, graded=True, released=True)
+
+        spool.commit_pending()
+        submission = Submission.objects.get(assignment=self.assignment, student=self.student)
+        self.assertEqual((submission.marks, submission.graded, submission.released), (None, False, False))
+        self.assertEqual(submission.submitted_at, accepted_at)
+        self.assertEqual(list(submission.history.values_list('action', flat=True)), ['First Submission'])
+
+    def test_full_spool_rejects_new_uploads(self):
+        for _ in range(3):
+            spool.accept(self.assignment, self.student, self.upload(), timezone.now())
+        with self.assertRaises(spool.SpoolFull):
+            spool.accept(self.assignment, self.student, self.upload(), timezone.now())
+
+        self.client.force_login(self.student)
+        response = self.client.post(reverse('submit_assignment', args=[self.assignment.id]), {'file': self.upload()})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], str(spool.RETRY_AFTER))
+
+    def test_view_spools_and_wakes_the_committer(self):
+        self.client.force_login(self.student)
+        with mock.patch.object(spool, 'wake') as wake:
+            response = self.client.post(reverse('submit_assignment', args=[self.assignment.id]), {'file': self.upload()})
+        self.assertEqual(response.status_code, 302)
+        wake.assert_called_once()
+        self.assertFalse(Submission.objects.exists())
+        self.assertEqual(spool.pending_for(self.student.id), {self.assignment.id})
+        self.assertEqual(spool.pending_for(make_student('s2').id), set())
+
+    def test_wake_queues_the_committer_only_for_a_running_worker(self):
+        spool.accept(self.assignment, self.student, self.upload(), timezone.now())
+        with self.settings(LMS_JOB_WORKER=True):
+            spool.wake()
+        self.assertTrue(Job.objects.filter(name='commit_submissions', status=Job.QUEUED).exists())
+        self.assertFalse(Submission.objects.exists())
+
+        with self.settings(LMS_JOB_WORKER=False):
+            spool.wake()
+        self.assertTrue(Submission.objects.filter(assignment=self.assignment, student=self.student).exists())
+        self.assertEqual(spool.pending_for(self.student.id), set())
+
+    def test_abandoned_claims_are_committed_later(self):
+        spool.accept(self.assignment, self.student, self.upload(), timezone.now())
+        directory = spool.spool_dir()
+        entry, = spool._claim(directory, 10)
+        old = time.time() - spool.CLAIM_TIMEOUT - 1
+        os.utime(os.path.join(directory, entry + spool.CLAIMED), (old, old))
+
+        self.assertEqual(spool.commit_pending(), 1)
+        self.assertEqual([name for _, _, names in os.walk(directory) for name in names], [])
+
+
+@mock.patch.object(uploads, 'CHUNK_SIZE', 10)
+class ChunkedUploadTests(TestCase):
+    content = b'0123456789abcdefghijKLMNO'  # chunks of 10, 10 and 5 bytes
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=f'{root}/media', LMS_UPLOAD_STAGING_DIR=f'{root}/staging')
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.client.force_login(self.teacher)
+
+    def start(self):
+        response = self.client.post(reverse('start_resource_upload', args=[self.classroom.id]), {
+            'title': 'Lecture 1', 'description': 'slides', 'filename': 'lecture.pdf', 'size': len(self.content),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()
+
+    def put(self, upload, number, data=None, digest=True):
+        data = self.content[number * 10:(number + 1) * 10] if data is None else data
+        headers = {'X-Chunk-SHA256': hashlib.sha256(data).hexdigest()} if digest else {}
+        return self.client.put(f"{upload['status_url']}chunks/{number}/", data,
+                               content_type='application/octet-stream', headers=headers)
+
+    def test_upload_resumes_and_creates_resource_only_at_finalize(self):
+        upload = self.start()
+        self.assertEqual((upload['chunks'], upload['next_chunk']), (3, 0))
+        self.assertEqual(self.put(upload, 0).json()['next_chunk'], 1)
+        self.assertEqual(self.put(upload, 0).status_code, 200)  # a retried chunk is acknowledged again
+        self.assertEqual(self.put(upload, 2).status_code, 409)  # out of order
+
+        # "Reconnect": the status query says where to continue
+        status = self.client.get(upload['status_url']).json()
+        self.assertEqual((status['next_chunk'], status['received']), (1, 10))
+        self.put(upload, 1, digest=False)
+        self.assertEqual(self.client.post(upload['finalize_url']).status_code, 409)
+        self.assertFalse(Resource.objects.exists())
+
+        self.put(upload, 2)
+        digests = b''.join(hashlib.sha256(self.content[i:i + 10]).digest() for i in (0, 10, 20))
+        response = self.client.post(upload['finalize_url'], {'checksum': hashlib.sha256(digests).hexdigest()})
+        self.assertEqual(response.status_code, 201)
+
+        resource = Resource.objects.get()
+        self.assertEqual((resource.title, resource.uploaded_by), ('Lecture 1', self.teacher))
+        self.assertEqual(resource.file.read(), self.content)
+        self.assertFalse(UploadSession.objects.exists())
+        self.assertEqual(os.listdir(uploads.staging_dir()), [])
+
+    def test_corrupted_chunk_is_rejected_and_cut_off(self):
+        upload = self.start()
+        self.put(upload, 0)
+        bad = self.client.put(f"{upload['status_url']}chunks/1/", b'x' * 10, content_type='application/octet-stream',
+                              headers={'X-Chunk-SHA256': hashlib.sha256(b'y' * 10).hexdigest()})
+        self.assertEqual(bad.status_code, 422)
+        self.assertEqual(os.path.getsize(uploads.staging_path(UploadSession.objects.get())), 10)
+        self.assertEqual(self.put(upload, 1, data=b'short').status_code, 400)
+
+    def test_resources_page_uses_the_chunked_uploader(self):
+        response = self.client.get(reverse('class_resources', args=[self.classroom.id]))
+        self.assertContains(response, reverse('start_resource_upload', args=[self.classroom.id]))
+        self.assertEqual(self.client.post(reverse('class_resources', args=[self.classroom.id])).status_code, 200)
+        self.assertFalse(Resource.objects.exists())
+
+    def test_only_the_owner_can_write(self):
+        upload = self.start()
+        other = User.objects.create(username='other')
+        self.client.force_login(other)
+        self.assertEqual(self.put(upload, 0).status_code, 404)
+
+    def test_stale_sessions_are_cleaned(self):
+        self.start()
+        UploadSession.objects.update(updated_at=timezone.now() - timedelta(days=2))
+        self.assertEqual(uploads.clean_stale(), (1, 1))
+        self.assertEqual(os.listdir(uploads.staging_dir()), [])
+
+
+SAMPLE_PDF = os.path.join(django_settings.BASE_DIR, 'submissions', '23BCT0227_VL2025260103457_AST05.pdf')
+
+
+class PdfInspectionTests(SimpleTestCase):
+    def test_page_count_of_a_real_pdf(self):
+        info = pdf.inspect(SAMPLE_PDF)
+        self.assertTrue(info['is_pdf'])
+        self.assertEqual(info['page_count'], 6)
+        self.assertEqual(info['size'], os.path.getsize(SAMPLE_PDF))
+
+    def test_page_tree_inside_a_compressed_object_stream(self):
+        objects = zlib.compress(b'1 0 << /Type /Pages /Kids [3 0 R 4 0 R 5 0 R] /Count 3 >>')
+        header = b'2 0 obj\n<< /Type /ObjStm /N 1 /First 4 /Filter /FlateDecode /Length %d >>\nstream\n' % len(objects)
+        data = b'%PDF-1.7\n' + header + objects + b'\nendstream\nendobj\n%%EOF\n'
+        self.assertEqual(pdf.page_count(data), 3)
+
+    def test_renamed_file_is_not_a_pdf(self):
+        with tempfile.NamedTemporaryFile(suffix='.pdf') as f:
+            f.write(b'PK\x03\x04 a zip file')
+            f.flush()
+            info = pdf.inspect(f.name)
+        self.assertEqual((info['is_pdf'], info['page_count'], info['error']), (False, None, ''))
+
+
+class DerivativeTests(FileSandboxTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(f'{self.media}/submissions')
+        shutil.copy(SAMPLE_PDF, f'{self.media}/submissions/answer.pdf')
+
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(classroom=classroom, title='A1', deadline=timezone.now())
+
+    def test_saving_an_upload_queues_a_job_for_its_file(self):
+        Submission.objects.create(assignment=self.assignment, student=make_student('s1'), file='submissions/answer.pdf')
+        queued = dict(Job.objects.filter(status=Job.QUEUED).values_list('name', 'kwargs'))
+        self.assertEqual(queued['derive_files'], {'names': ['submissions/answer.pdf']})
+        self.assertEqual(queued['fingerprint_submissions'], {'names': ['submissions/answer.pdf']})
+
+        jobs.work('test-worker', once=True)
+        self.assertEqual(FileDerivative.objects.get(name='submissions/answer.pdf').page_count, 6)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exclude(key__startswith='index:').exists())
+
+    def test_submissions_page_shows_page_counts_from_the_derivative_rows(self):
+        Submission.objects.create(assignment=self.assignment, student=make_student('s1'), file='submissions/answer.pdf')
+        Submission.objects.create(assignment=self.assignment, student=make_student('s2'), file='submissions/gone.pdf')
+        self.assertEqual(derivatives.missing_names(), {'submissions/answer.pdf', 'submissions/gone.pdf'})
+        derivatives.generate(derivatives.missing_names(), workers=1)
+        self.assertEqual(derivatives.missing_names(), set())
+        self.assertEqual(FileDerivative.objects.get(name='submissions/answer.pdf').page_count, 6)
+        self.assertIn('FileNotFoundError', FileDerivative.objects.get(name='submissions/gone.pdf').error)
+
+        self.client.force_login(self.teacher)
+        with mock.patch('lms.pdf.open', side_effect=AssertionError('page rendering opened a file'), create=True):
+            response = self.client.get(reverse('view_submissions', args=[self.assignment.id]))
+        self.assertContains(response, '6 pages')
+        self.assertContains(response, 'Not a valid PDF')
+
+
+class SimilarityTests(FileSandboxTestCase):
+    ESSAY = ' '.join(f"point {i} of the argument builds on step {i * 7 % 11} before it" for i in range(60))
+
+    def setUp(self):
+        super().setUp()
+        os.makedirs(f'{self.media}/submissions')
+
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.assignment = Assignment.objects.create(classroom=classroom, title='A1', deadline=timezone.now())
+
+    def submit(self, username, text):
+        name = f'submissions/{username}.txt'
+        with open(f'{self.media}/{name}', 'w') as f:
+            f.write(text)
+        return Submission.objects.create(assignment=self.assignment, student=make_student(username), file=name)
+
+    def test_pdf_text_goes_through_the_fonts_unicode_maps(self):
+        with open(SAMPLE_PDF, 'rb') as f:
+            text = pdf.text(f.read())
+        self.assertIn('Dynamic Memory Allocation', text)
+
+    def test_signature_agreement_estimates_jaccard_similarity(self):
+        first = minhash.shingles(self.ESSAY)
+        second = minhash.shingles(self.ESSAY.replace('point 30 ', 'claim 30 ').replace('point 45 ', 'claim 45 '))
+        jaccard = len(first & second) / len(first | second)
+        estimate = minhash.similarity(minhash.signature(first), minhash.signature(second))
+        self.assertAlmostEqual(estimate, jaccard, delta=0.12)
+        self.assertLess(minhash.similarity(minhash.signature(first), minhash.signature(minhash.shingles('x ' * 9 + 'y'))), 0.1)
+
+    def test_report_ranks_copies_and_reindexes_only_a_resubmission(self):
+        original = self.submit('s1', self.ESSAY)
+        self.submit('s2', self.ESSAY.replace('point 12 ', 'idea 12 '))
+        self.submit('s3', ' '.join(f"an unrelated sentence number {i}" for i in range(80)))
+        self.submit('s4', self.ESSAY)
+        similarity.index(similarity.missing_names(), workers=1)
+
+        ranked = similarity.report(self.assignment)
+        self.assertEqual((ranked['indexed'], ranked['pending']), (4, 0))
+        names = [(pair['first'][1], pair['second'][1], pair['identical']) for pair in ranked['pairs']]
+        self.assertEqual(names[0], ('s1', 's4', True))
+        self.assertEqual({frozenset(pair[:2]) for pair in names[1:]}, {frozenset(('s1', 's2')), frozenset(('s2', 's4'))})
+
+        with open(f'{self.media}/submissions/s1-v2.txt', 'w') as f:
+            f.write(' '.join(f"a fresh attempt with line {i}" for i in range(80)))
+        original.file = 'submissions/s1-v2.txt'
+        original.save()
+        self.assertEqual(similarity.missing_names(), {'submissions/s1-v2.txt'})
+        similarity.index(similarity.missing_names(), workers=1)
+        self.assertNotIn('s1', {pair['first'][1] for pair in similarity.report(self.assignment)['pairs']})
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('view_submissions', args=[self.assignment.id]))
+        self.assertContains(response, 'Similar submissions')
+        self.assertContains(response, '4 compared')
+
+
+class ContentIndexTests(FileSandboxTestCase):
+    def setUp(self):
+        super().setUp()
+        os.makedirs(f'{self.media}/resources')
+        shutil.copy(SAMPLE_PDF, f'{self.media}/resources/lab5.pdf')
+        with open(f'{self.media}/resources/notes.txt', 'w') as f:
+            f.write("Paging divides memory into frames; the TLB caches translations.")
+
+        self.teacher = User.objects.create(username='teacher')
+        Profile.objects.create(user=self.teacher, role='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.lab = Resource.objects.create(classroom=self.classroom, title='Lab 5', file='resources/lab5.pdf',
+                                           uploaded_by=self.teacher)
+        Resource.objects.create(classroom=self.classroom, title='Notes', file='resources/notes.txt',
+                                uploaded_by=self.teacher)
+
+    def test_saving_resources_queues_one_index_update_per_classroom(self):
+        self.lab.save()
+        self.lab.save()
+        self.assertEqual(Job.objects.filter(name='index_classroom', status=Job.QUEUED).count(), 1)
+        jobs.work('test-worker', once=True)
+        self.assertEqual([hit['title'] for hit in content_index.search(self.classroom, 'TLB')], ['Notes'])
+
+    def test_updates_only_read_new_or_changed_files(self):
+        self.assertEqual(content_index.update(self.classroom.id)['indexed'], 2)
+        with mock.patch('lms.fulltext.extract', side_effect=AssertionError('unchanged file was read')):
+            self.assertEqual(content_index.update(self.classroom.id)['unchanged'], 2)
+            os.utime(f'{self.media}/resources/notes.txt', ns=(1, 1))  # touched, same bytes
+            self.assertEqual(content_index.update(self.classroom.id)['unchanged'], 2)
+
+        with open(f'{self.media}/resources/notes.txt', 'a') as f:
+            f.write(" Segmentation is covered next week.")
+        self.assertEqual(content_index.update(self.classroom.id)['indexed'], 1)
+        self.assertEqual([hit['title'] for hit in content_index.search(self.classroom, 'segmentation')], ['Notes'])
+
+        self.lab.delete()
+        self.assertEqual(content_index.update(self.classroom.id)['removed'], 1)
+        self.assertEqual(content_index.search(self.classroom, 'first fit'), [])
+
+    def test_resources_page_searches_inside_files(self):
+        content_index.update(self.classroom.id)
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse('class_resources', args=[self.classroom.id]), {'q': 'best fit'})
+        self.assertContains(response, 'Lab 5')
+        self.assertContains(response, '<mark>')
+        self.assertNotContains(response, 'Paging divides memory')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        registry = mock.patch.dict(jobs._tasks, clear=True)
+        registry.start()
+        self.addCleanup(registry.stop)
+        self.calls = []
+        jobs.task('record')(lambda **kwargs: self.calls.append(kwargs))
+        jobs.task('flaky', max_attempts=2)(self.fail_always)
+        jobs.task('hourly', every=timedelta(hours=1))(lambda: self.calls.append('hourly'))
+
+    def fail_always(self):
+        raise RuntimeError("disk on fire")
+
+    def test_claims_most_urgent_due_job_once(self):
+        jobs.enqueue('record', n=1)
+        jobs.enqueue('record', priority=5, n=2)
+        jobs.enqueue('record', run_at=timezone.now() + timedelta(minutes=5), n=3)
+        first = jobs.claim('a')
+        self.assertEqual(first.kwargs, {'n': 2})
+        self.assertEqual((first.status, first.locked_by, first.attempts), (Job.RUNNING, 'a', 1))
+        self.assertEqual(jobs.claim('b').kwargs, {'n': 1})
+        self.assertIsNone(jobs.claim('c'))  # the last one is not due yet
+
+    def test_a_key_is_queued_only_once(self):
+        for _ in range(3):
+            jobs.enqueue('record', key='recount:7', n=1)
+        self.assertEqual(Job.objects.filter(key='recount:7').count(), 1)
+        jobs.claim('a')
+        jobs.enqueue('record', key='recount:7', n=1)  # the running one does not block a new one
+        self.assertEqual(Job.objects.filter(key='recount:7', status=Job.QUEUED).count(), 1)
+
+    def test_failures_back_off_then_give_up(self):
+        jobs.enqueue('flaky')
+        with self.assertLogs('lms.jobs', 'ERROR'):
+            jobs.work('a', once=True)
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(seconds=jobs.BACKOFF_BASE - 2))
+        self.assertIn('disk on fire', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('lms.jobs', 'ERROR'):
+            jobs.work('a', once=True)
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_recurring_task_requeues_itself(self):
+        jobs.ensure_recurring()
+        jobs.ensure_recurring()
+        self.assertEqual(jobs.work('a', once=True), 1)
+        job = Job.objects.get(name='hourly')
+        self.assertEqual((job.status, job.attempts, self.calls), (Job.QUEUED, 0, ['hourly']))
+        self.assertGreater(job.run_at, timezone.now() + timedelta(minutes=59))
+
+    def test_jobs_of_a_dead_worker_are_queued_again(self):
+        jobs.enqueue('record', run_at=timezone.now() - timedelta(hours=3), n=1)
+        jobs.claim('dead', now=timezone.now() - timedelta(hours=2))
+        self.assertEqual(jobs.release_expired(), 1)
+        jobs.work('alive', once=True)
+        self.assertEqual(self.calls, [{'n': 1}])
+
+
+class PurgeJobTests(FileSandboxTestCase):
+    def test_deleting_a_course_purges_it_in_a_job(self):
+        teacher = User.objects.create(username='teacher')
+        classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        Assignment.objects.create(classroom=classroom, title='A1', deadline=timezone.now())
+        self.client.force_login(teacher)
+        self.client.post(reverse('delete_course', args=[classroom.id]))
+        self.assertFalse(Classroom.objects.filter(pk=classroom.pk).exists())
+        self.assertTrue(Classroom.all_objects.filter(pk=classroom.pk).exists())
+        self.assertTrue(Job.objects.filter(name='purge_classroom', kwargs={'classroom_id': classroom.pk}).exists())
+
+        jobs.work('a', once=True)
+        self.assertFalse(Classroom.all_objects.filter(pk=classroom.pk).exists())
+        self.assertFalse(Assignment.objects.filter(classroom_id=classroom.pk).exists())
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class NotificationDigestTests(TestCase):
+    def setUp(self):
+        self.teacher = User.objects.create(username='teacher', email='teacher@example.com')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=self.teacher)
+        self.students = []
+        for name in ('ann', 'bob', 'cid'):
+            student = make_student(name)
+            student.email = '' if name == 'cid' else f'{name}@example.com'
+            student.save()
+            Enrollment.objects.create(student=student, classroom=self.classroom)
+            self.students.append(student)
+
+    def test_events_are_grouped_into_one_digest_per_user(self):
+        ann, bob, _ = self.students
+        self.client.force_login(self.teacher)
+        self.client.post(reverse('add_assignment', args=[self.classroom.id]), {
+            'title': 'Essay', 'description': '', 'deadline': '2030-01-01T10:00',
+        })
+        assignment = Assignment.objects.get(title='Essay')
+        submission = Submission.objects.create(assignment=assignment, student=ann, file='submissions/a.pdf', graded=True)
+        self.client.post(reverse('grade_submission', args=[submission.id]), {'marks': '8', 'release': 'on'})
+        self.client.post(reverse('grade_submission', args=[submission.id]), {'marks': '8', 'release': 'on'})
+        discussion = Discussion.objects.create(classroom=self.classroom, title='Week 1', content='', author=self.teacher)
+        self.client.force_login(bob)
+        self.client.post(reverse('discussion_detail', args=[discussion.id]), {'content': 'Hi'})
+        # One classroom-wide row for the assignment, one grade (the unchanged re-save adds none), one reply
+        self.assertEqual(NotificationEvent.objects.count(), 3)
+
+        with mock.patch('django.core.mail.backends.locmem.EmailBackend.open') as opened:
+            self.assertEqual(notifications.send_digests(), 3)
+        opened.assert_called_once()
+        by_address = {message.to[0]: message for message in mail.outbox}
+        self.assertEqual(set(by_address), {'ann@example.com', 'bob@example.com', 'teacher@example.com'})
+        self.assertIn('New assignment: Essay', by_address['ann@example.com'].body)
+        self.assertIn('Your grade for Essay is out: 8', by_address['ann@example.com'].body)
+        self.assertEqual(by_address['ann@example.com'].subject, '2 updates from your courses')
+        self.assertNotIn('grade', by_address['bob@example.com'].body)
+        self.assertIn('bob replied in Week 1', by_address['teacher@example.com'].body)
+
+        self.assertFalse(NotificationEvent.objects.filter(sent_at__isnull=True).exists())
+        self.assertEqual(notifications.send_digests(), 0)
+
+    def test_file_backend_writes_the_digests(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        NotificationEvent.objects.create(kind=NotificationEvent.ASSIGNMENT, classroom=self.classroom, text='New')
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+                               EMAIL_FILE_PATH=directory):
+            self.assertEqual(notifications.send_digests(), 2)
+        (written,) = os.listdir(directory)  # one connection: one file
+        with open(os.path.join(directory, written)) as f:
+            self.assertEqual(f.read().count('Subject: 1 update from your courses'), 2)
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create(username='teacher')
+        self.student = make_student('ann')
+        self.classrooms = [
+            Classroom.objects.create(name=f'Course {n}', code=f'C{n}', teacher=teacher) for n in (1, 2)
+        ]
+        for classroom in self.classrooms:
+            Enrollment.objects.create(student=self.student, classroom=classroom)
+        other = Classroom.objects.create(name='Other', code='OTHER', teacher=teacher)
+        self.assignment = Assignment.objects.create(
+            classroom=self.classrooms[0], title='Essay, part 1', deadline=timezone.now() + timedelta(days=3),
+        )
+        Assignment.objects.create(classroom=other, title='Not mine', deadline=timezone.now())
+        Quiz.objects.create(classroom=self.classrooms[1], title='Midterm', visible=True)
+        Quiz.objects.create(classroom=self.classrooms[1], title='Draft quiz', visible=False)
+        self.url = reverse('calendar_feed', args=[calendar_feed.token_for(self.student)])
+
+    def test_feed_lists_deadlines_and_quiz_windows_of_enrolled_classrooms(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = response.content.decode()
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn(f'UID:assignment-{self.assignment.pk}@lms', body)
+        self.assertIn('SUMMARY:Due: Essay\\, part 1 (C1)', body)
+        self.assertIn('SUMMARY:Quiz: Midterm (C2)', body)
+        self.assertNotIn('Not mine', body)
+        self.assertNotIn('Draft quiz', body)
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+
+    def test_unchanged_feed_is_not_modified_until_an_assignment_changes(self):
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(2):  # token, classrooms
+            self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.assignment.deadline += timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment.save()
+        with self.assertNumQueries(4):  # token, classrooms, assignments, quizzes
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_reset_token_revokes_the_old_link(self):
+        self.client.force_login(self.student)
+        self.client.post(reverse('reset_calendar_token'))
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        new_url = reverse('calendar_feed', args=[calendar_feed.token_for(self.student)])
+        self.assertEqual(self.client.get(new_url).status_code, 200)
+
+
+class QuizEventTests(TestCase):
+    def setUp(self):
+        teacher = User.objects.create(username='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.student = make_student('ann')
+        Enrollment.objects.create(student=self.student, classroom=self.classroom)
+        self.start = timezone.now().replace(microsecond=0) + timedelta(seconds=20)
+        self.quiz = Quiz.objects.create(
+            classroom=self.classroom, title='Pop quiz', visible=True,
+            start_time=self.start, end_time=self.start + timedelta(seconds=40),
+        )
+
+    async def test_stream_announces_opening_and_closing_on_time(self):
+        now = [self.start - timedelta(seconds=20)]
+
+        async def sleep(seconds):
+            now[0] += timedelta(seconds=seconds)
+
+        messages = [m async for m in quiz_events.stream(
+            self.classroom.id, lifetime=90, sleep=sleep, clock=lambda: now[0],
+        )]
+        events = [m.split('\n')[0] for m in messages[1:]]
+        self.assertEqual(events.count('event: open'), 1)
+        self.assertEqual(events.count('event: close'), 1)
+        opened = messages.index(next(m for m in messages if m.startswith('event: open')))
+        after_open = json.loads(messages[opened + 1].split('data: ')[1])
+        self.assertEqual(after_open[0]['state'], 'open')
+        self.assertAlmostEqual(after_open[0]['remaining'], 40, delta=0.2)
+        self.assertLess(len(messages), 20)  # heartbeats and transitions, no per-second ticks
+
+    def test_wsgi_gets_a_single_snapshot(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('quiz_events', args=[self.classroom.id]))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry: '))
+        self.assertIn(f'"quiz": {self.quiz.id}, "state": "upcoming"', body)
+
+        self.client.force_login(make_student('outsider'))
+        self.assertEqual(self.client.get(reverse('quiz_events', args=[self.classroom.id])).status_code, 403)
+
+    def test_answers_sent_as_the_quiz_closes_are_accepted(self):
+        question = Question.objects.create(quiz=self.quiz, text='2 + 2?')
+        right = Option.objects.create(question=question, text='4', is_correct=True)
+        Quiz.objects.filter(pk=self.quiz.pk).update(
+            start_time=timezone.now() - timedelta(minutes=5), end_time=timezone.now() - timedelta(seconds=5),
+        )
+        self.client.force_login(self.student)
+        self.client.post(reverse('attempt_quiz', args=[self.quiz.id]), {str(question.id): right.id})
+        attempt = QuizAttempt.objects.get(quiz=self.quiz, student=self.student)
+        # Real answers are not the zero placeholder of a missed quiz...
+        self.assertEqual((attempt.score, attempt.auto_submitted), (10.0, False))
+        self.assertEqual(reports._build_at_risk_report(self.classroom.teacher, 75), [])
+
+        # ...so extending the quiz does not clear them away like one
+        Quiz.objects.filter(pk=self.quiz.pk).update(end_time=timezone.now() + timedelta(hours=1))
+        self.client.get(reverse('class_detail', args=[self.classroom.id]))
+        self.assertTrue(QuizAttempt.objects.filter(pk=attempt.pk).exists())
+
+
+class AsyncReadViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create(username='teacher')
+        self.classroom = Classroom.objects.create(name='Course', code='C1', teacher=teacher)
+        self.student = make_student('ann')
+        Enrollment.objects.create(student=self.student, classroom=self.classroom)
+        Resource.objects.create(classroom=self.classroom, title='Slides', file='resources/slides.pdf', uploaded_by=teacher)
+        Discussion.objects.create(classroom=self.classroom, title='Week 1', content='Hello', author=teacher)
+        quiz = Quiz.objects.create(classroom=self.classroom, title='Pop quiz', visible=True)
+        QuizAttempt.objects.create(quiz=quiz, student=self.student, score=7.5, graded=True)
+        self.pages = [reverse(name, args=[self.classroom.id]) for name in (
+            'class_resources', 'class_discussions', 'class_quizzes_student',
+        )]
+
+    @staticmethod
+    def without_csrf(content):
+        return re.sub(rb'name="csrfmiddlewaretoken" value="[^"]+"', b'', content)
+
+    async def test_async_pages_match_the_sync_views(self):
+        await sync_to_async(self.client.force_login)(self.student)
+        expected = {url: await sync_to_async(self.client.get)(url) for url in self.pages}
+
+        self.async_client.cookies = self.client.cookies  # the same session and CSRF secret, so the same ETags
+        with self.settings(ROOT_URLCONF='lms.async_urls'):
+            for url in self.pages:
+                self.assertTrue(iscoroutinefunction(resolve(url).func), url)
+                response = await self.async_client.get(url)
+                self.assertEqual((response.status_code, expected[url].status_code), (200, 200), url)
+                self.assertEqual(self.without_csrf(response.content), self.without_csrf(expected[url].content), url)
+                self.assertEqual(response.get('ETag'), expected[url].get('ETag'), url)
+        self.assertContains(response, 'Pop quiz')
+
+    async def test_unchanged_pages_are_not_modified(self):
+        await self.async_client.aforce_login(self.student)
+        with self.settings(ROOT_URLCONF='lms.async_urls'):
+            for url in (self.pages[0], self.pages[2]):
+                etag = (await self.async_client.get(url))['ETag']
+                response = await self.async_client.get(url, headers={'If-None-Match': etag})
+                self.assertEqual(response.status_code, 304, url)
+
+    async def test_cache_metrics_are_recorded_through_the_async_api(self):
+        builder = mock.AsyncMock(return_value=['row'])
+        with mock.patch.object(caching, '_record', side_effect=AssertionError('sync cache call on the event loop')):
+            for _ in range(2):
+                self.assertEqual(await caching.acached(self.classroom.id, 'rows', builder), ['row'])
+        builder.assert_awaited_once()
+        stats = await sync_to_async(caching.stats)()
+        self.assertEqual((stats['rows']['hits'], stats['rows']['misses']), (1, 1))
+
+    async def test_anonymous_requests_are_sent_to_login(self):
+        with self.settings(ROOT_URLCONF='lms.async_urls'):
+            response = await self.async_client.get(self.pages[0])
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response['Location'].startswith(django_settings.LOGIN_URL))
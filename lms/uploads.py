@@ -0,0 +1,247 @@
+# lms/uploads.py
+"""
+Resumable chunked uploads of course resources.
+
+The resources page uploads a file in numbered chunks instead of one multipart
+POST, so every request is short and an interrupted upload resumes from the
+first chunk the server does not have yet:
+
+1. ``start()``       POST title, description, filename and size; returns the
+                     session with the chunk size to use.
+2. ``write_chunk()`` PUT chunk ``n`` as the raw request body. It is streamed
+                     straight onto the end of a staging file under
+                     ``settings.LMS_UPLOAD_STAGING_DIR`` and hashed on the way
+                     (checked against ``X-Chunk-SHA256`` when sent). Chunks go
+                     in order; a chunk that is already stored is acknowledged
+                     again, so a retry after a lost response is harmless.
+3. ``finalize()``    checks that every byte arrived and, if given, the upload
+                     checksum -- the sha256 of the concatenated chunk digests,
+                     so the file is never read a second time -- then moves the
+                     staging file into media storage and only then creates
+                     the Resource.
+4. ``status()``      next chunk and bytes received, for resuming.
+
+Writers of one session are serialized with an exclusive lock on its staging
+file. Abandoned sessions are removed by ``manage.py clean_upload_sessions``.
+"""
+import hashlib
+import os
+import re
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Resource, UploadSession
+
+try:
+    import fcntl
+except ImportError:  # Windows: no locking, one writer per session is assumed
+    fcntl = None
+
+CHUNK_SIZE = 4 * 1024 * 1024
+MAX_SIZE = 4 * 1024 ** 3
+READ_SIZE = 64 * 1024
+DIGEST = re.compile(r'[0-9a-f]{64}')
+
+
+class UploadError(Exception):
+    def __init__(self, message, status=400):
+        self.status = status
+        super().__init__(message)
+
+
+class _StagedFile(File):
+    """Lets FileSystemStorage move the staging file into place instead of copying it."""
+    def temporary_file_path(self):
+        return self.name
+
+
+def staging_dir():
+    directory = str(getattr(settings, 'LMS_UPLOAD_STAGING_DIR', os.path.join(settings.BASE_DIR, 'upload_staging')))
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def staging_path(session):
+    return os.path.join(staging_dir(), f"{session.pk.hex}.part")
+
+
+def chunk_count(session):
+    return -(-session.size // session.chunk_size)
+
+
+class _locked:
+    """Exclusive lock on the session's staging file; refreshes the session once it is held."""
+    def __init__(self, session):
+        self.session = session
+
+    def __enter__(self):
+        try:
+            self.file = open(staging_path(self.session), 'r+b')
+        except FileNotFoundError:
+            raise UploadError("This upload no longer exists; start it again.", 404)
+        if fcntl:
+            fcntl.flock(self.file, fcntl.LOCK_EX)
+        try:
+            self.session.refresh_from_db()
+        except UploadSession.DoesNotExist:  # finalized or aborted while we waited
+            self.file.close()
+            raise UploadError("This upload no longer exists; start it again.", 404)
+        return self.file
+
+    def __exit__(self, *exc):
+        self.file.close()  # also releases the lock
+
+
+# -----------------------------
+# PROTOCOL
+# -----------------------------
+def start(classroom, user, title, description, filename, size):
+    filename = os.path.basename((filename or '').replace('\\', '/')).strip()
+    if not (title or '').strip() or not filename:
+        raise UploadError("Title and file are required.")
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        raise UploadError("File size is missing.")
+    if not 0 < size <= MAX_SIZE:
+        raise UploadError(f"Files must be between 1 byte and {MAX_SIZE // 1024 ** 3} GB.")
+
+    session = UploadSession.objects.create(
+        classroom=classroom,
+        created_by=user,
+        title=title.strip()[:255],
+        description=(description or '').strip(),
+        filename=filename[:255],
+        size=size,
+        chunk_size=CHUNK_SIZE,
+    )
+    open(staging_path(session), 'wb').close()
+    return session
+
+
+def write_chunk(session, number, stream, length, digest=None):
+    """Append chunk ``number`` (``length`` bytes read from ``stream``); returns the session."""
+    count = chunk_count(session)
+    if not 0 <= number < count:
+        raise UploadError(f"Chunk {number} is out of range; this upload has chunks 0-{count - 1}.", 404)
+    expected = min(session.chunk_size, session.size - number * session.chunk_size)
+    if length != expected:
+        raise UploadError(f"Chunk {number} must be exactly {expected} bytes.")
+    digest = (digest or '').strip().lower() or None
+    if digest and not DIGEST.fullmatch(digest):
+        raise UploadError("X-Chunk-SHA256 must be a hex sha256 digest.")
+
+    with _locked(session) as f:
+        if number < session.next_chunk:
+            stored = session.chunk_digests[number * 64:(number + 1) * 64]
+            if digest and digest != stored:
+                raise UploadError(f"Chunk {number} was already stored with a different checksum.", 409)
+            return session  # a retry of a chunk that made it
+        if number > session.next_chunk:
+            raise UploadError(f"Chunk {session.next_chunk} is next.", 409)
+
+        f.truncate(session.received)  # drop whatever an interrupted write left behind
+        f.seek(session.received)
+        hasher = hashlib.sha256()
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_SIZE, remaining))
+            if not data:
+                break
+            hasher.update(data)
+            f.write(data)
+            remaining -= len(data)
+        if remaining or (digest and hasher.hexdigest() != digest):
+            f.truncate(session.received)
+            raise UploadError(f"Chunk {number} arrived incomplete or corrupted; send it again.", 422)
+        f.flush()
+        os.fsync(f.fileno())
+
+        session.next_chunk += 1
+        session.received += length
+        session.chunk_digests += hasher.hexdigest()
+        session.save(update_fields=['next_chunk', 'received', 'chunk_digests', 'updated_at'])
+    return session
+
+
+def upload_checksum(session):
+    """sha256 over the concatenated raw digests of every chunk received so far."""
+    return hashlib.sha256(bytes.fromhex(session.chunk_digests)).hexdigest()
+
+
+def finalize(session, checksum=None):
+    """Move the completed staging file into media storage and create the Resource."""
+    with _locked(session):
+        if session.received != session.size:
+            raise UploadError(
+                f"Upload incomplete: {session.next_chunk} of {chunk_count(session)} chunks received.", 409
+            )
+        if checksum and checksum.strip().lower() != upload_checksum(session):
+            raise UploadError("The upload checksum does not match; start the upload again.", 422)
+
+        path = staging_path(session)
+        with open(path, 'rb') as staged:
+            name = default_storage.save(f"resources/{session.filename}", _StagedFile(staged, name=path))
+        try:
+            with transaction.atomic():
+                resource = Resource.objects.create(
+                    classroom_id=session.classroom_id,
+                    title=session.title,
+                    description=session.description,
+                    file=name,
+                    uploaded_by_id=session.created_by_id,
+                )
+                session.delete()
+        except Exception:
+            default_storage.delete(name)
+            raise
+    if os.path.exists(path):  # storages that copy rather than move
+        os.remove(path)
+    return resource
+
+
+def abort(session):
+    path = staging_path(session)
+    with _locked(session):
+        session.delete()
+        os.remove(path)
+
+
+def status(session):
+    return {
+        'id': str(session.pk),
+        'filename': session.filename,
+        'size': session.size,
+        'chunk_size': session.chunk_size,
+        'chunks': chunk_count(session),
+        'next_chunk': session.next_chunk,
+        'received': session.received,
+        'complete': session.received == session.size,
+    }
+
+
+# -----------------------------
+# CLEANUP
+# -----------------------------
+def clean_stale(max_age=timedelta(days=1)):
+    """Delete sessions idle for ``max_age`` and staging files without a session. Returns the counts."""
+    stale = UploadSession.objects.filter(updated_at__lt=timezone.now() - max_age)
+    stale_ids = {session_id.hex for session_id in stale.values_list('pk', flat=True)}
+    stale.delete()
+    live = {session_id.hex for session_id in UploadSession.objects.values_list('pk', flat=True)}
+
+    cutoff = time.time() - max_age.total_seconds()
+    files = 0
+    for entry in os.scandir(staging_dir()):
+        session_id = entry.name.removesuffix('.part')
+        # A brand-new file without a row may belong to a session that is still being created
+        if session_id not in live and (session_id in stale_ids or entry.stat().st_mtime < cutoff):
+            os.remove(entry.path)
+            files += 1
+    return len(stale_ids), files
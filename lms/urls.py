@@ -4,15 +4,26 @@ from . import views
 urlpatterns = [
     path('', views.home, name='home'),            # Public landing page
     path('dashboard/', views.main, name='main'),
+    path('dashboard/pending/', views.pending_work, name='pending_work'),
+    path('calendar/<str:token>.ics', views.calendar_feed_view, name='calendar_feed'),
+    path('calendar/reset/', views.reset_calendar_token, name='reset_calendar_token'),
     path('signup/', views.signup, name='signup'),
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
+    path('cache/stats/', views.cache_stats, name='cache_stats'),
+    path('reports/at-risk/', views.at_risk_report, name='at_risk_report'),
     path('add_course/', views.add_course, name='add_course'),
     path('class/<int:class_id>/manage/', views.class_manage, name='class_manage'),
     path('class/<int:class_id>/add_student/', views.add_student, name='add_student'),
     path('class/<int:class_id>/upload_csv/', views.upload_students_csv, name='upload_students_csv'),
+    path('class/<int:class_id>/provision/', views.provision_students, name='provision_students'),
     path('class/<int:class_id>/', views.class_detail, name='class_detail'),
+    path('class/<int:class_id>/archive/', views.archived_class, name='archived_class'),
+    path('class/<int:class_id>/clone/', views.clone_course, name='clone_course'),
+    path('class/<int:class_id>/grades/', views.class_grades, name='class_grades'),
+    path('class/<int:class_id>/grades/export/', views.class_grades_export, name='class_grades_export'),
     path('class/<int:class_id>/attendance/', views.manage_attendance, name='manage_attendance'),
+    path('class/<int:class_id>/attendance/analytics/', views.attendance_analytics, name='attendance_analytics'),
     path('class/<int:class_id>/attendance/history/<int:student_id>/', views.attendance_history_teacher, name='attendance_history_teacher'),
     path('class/<int:class_id>/attendance/history/', views.attendance_history_student, name='attendance_history_student'),
     path('class/<int:class_id>/delete/', views.delete_course, name='delete_course'),
@@ -33,6 +44,7 @@ urlpatterns = [
     path('class/<int:class_id>/quizzes/teacher/', views.quizzes_teacher, name='class_quizzes_teacher'),
     path('class/<int:class_id>/quizzes/student/', views.quizzes_student, name='class_quizzes_student'),
     path('class/<int:class_id>/quizzes/add/', views.add_quiz, name='add_quiz'),
+    path('class/<int:class_id>/quizzes/events/', views.quiz_event_stream, name='quiz_events'),
     path('quiz/<int:quiz_id>/add_question/', views.add_question, name='add_question'),
     path('quiz/<int:quiz_id>/attempt/', views.attempt_quiz, name='attempt_quiz'),
     path('quiz/<int:quiz_id>/attempts/', views.view_attempts_teacher, name='view_attempts_teacher'),
@@ -41,6 +53,10 @@ urlpatterns = [
     #RESOURCES
     path('class/<int:class_id>/resources/', views.class_resources, name='class_resources'),
     path('resource/<int:resource_id>/delete/', views.delete_resource, name='delete_resource'),
+    path('class/<int:class_id>/resources/uploads/', views.start_resource_upload, name='start_resource_upload'),
+    path('uploads/<uuid:upload_id>/', views.resource_upload_status, name='resource_upload_status'),
+    path('uploads/<uuid:upload_id>/chunks/<int:number>/', views.resource_upload_chunk, name='resource_upload_chunk'),
+    path('uploads/<uuid:upload_id>/finalize/', views.finish_resource_upload, name='finish_resource_upload'),
 
     #DISCUSSIONS
     path('class/<int:class_id>/discussions/', views.class_discussions, name='class_discussions'),
@@ -3,12 +3,12 @@ from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from django.contrib.auth import logout
 from django.shortcuts import render, redirect, get_object_or_404
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.contrib import messages
 import csv, io
-from django.db.models import Max, Avg
-from .models import Classroom, Enrollment, Profile, Resource, Discussion, Assignment, Submission, Quiz, Question, Attendance, SubmissionHistory, QuizAttempt, Option, Reply
-from datetime import date, datetime
+from django.db.models import Max, Avg, prefetch_related_objects
+from .models import Classroom, Enrollment, Profile, Resource, Discussion, Assignment, Submission, Quiz, Question, Attendance, SubmissionHistory, QuizAttempt, Option, Reply, UploadSession
+from datetime import date, datetime, timedelta
 from django.utils.dateformat import DateFormat
 from django.utils import timezone
 from django.contrib import messages
@@ -18,14 +18,42 @@ from .forms import DiscussionForm, ReplyForm
 from django.contrib.auth import login, authenticate
 from django.contrib.auth.forms import AuthenticationForm
 from .forms import SignUpForm
+from .grading import compute_classroom_grades, get_scheme
+from .forms import GradingSchemeForm
+from django.http import Http404, HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.views.decorators.http import condition, require_POST
+from django.urls import reverse
+from . import reports
+from . import attendance as attendance_store
+from . import analytics
+from . import counters
+from . import caching
+from . import conditional
+from . import provisioning
+from . import purge
+from . import archive
+from . import question_bank
+from . import cloning
+from . import pagination
+from . import spool
+from . import uploads
+from . import derivatives
+from . import similarity
+from . import content_index
+from . import notifications
+from . import calendar_feed
+from . import quiz_events
 
 # Main dashboard (replaces old dashboard)
 @login_required
 def main(request):
     user = request.user
 
-    # Determine user role from profile
-    role = user.profile.role if hasattr(user, 'profile') else None
+    # Determine user role from the session principal
+    role = request.principal.role
 
     # Teacher: show classrooms they created
     if role == 'teacher':
@@ -42,11 +70,59 @@ def main(request):
     context = {
         'classrooms': classrooms,
         'role': role,
+        'pending': reports.pending_work(user) if role == 'student' else [],
+        # Teacher cards are a cached fragment; the version changes whenever a counter does
+        'dashboard_version': counters.dashboard_version(user.id) if role == 'teacher' else None,
+        'calendar_url': request.build_absolute_uri(
+            reverse('calendar_feed', args=[calendar_feed.token_for(user)])
+        ) if role == 'student' else None,
     }
 
     return render(request, 'lms/dashboard.html', context)
 
 
+@login_required
+def pending_work(request):
+    """JSON feed of the student's open, unsubmitted work across all classrooms."""
+    items = reports.pending_work(request.user)
+    return JsonResponse({'items': [{
+        'kind': item['kind'],
+        'title': item['title'],
+        'classroom': item['classroom'].code,
+        'due': item['due'].isoformat(),
+        'is_open': item['is_open'],
+        'url': item['url'],
+    } for item in items]})
+
+
+@condition(etag_func=calendar_feed.etag)
+def calendar_feed_view(request, token):
+    """The student's deadlines and quiz windows as an .ics feed; the token in the URL is the login."""
+    document = calendar_feed.body(request, token)
+    if document is None:
+        raise Http404
+    response = HttpResponse(document, content_type='text/calendar; charset=utf-8')
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@login_required
+@require_POST
+def reset_calendar_token(request):
+    """Replace the feed token; calendars subscribed with the old link stop updating."""
+    calendar_feed.reset_token(request.user)
+    messages.success(request, "Your calendar link was reset. Subscribe again with the new link.")
+    return redirect('main')
+
+
+@login_required
+def cache_stats(request):
+    """Hit / miss counts of the classroom cache layer (staff only)."""
+    if not request.user.is_staff:
+        return HttpResponseForbidden()
+    return JsonResponse({'backend': settings.CACHES['default']['BACKEND'], 'stats': caching.stats()})
+
+
 # Optional: simple logout handler
 def logout_view(request):
     logout(request)
@@ -58,7 +134,7 @@ def logout_view(request):
 
 @login_required
 def add_course(request):
-    if request.user.profile.role != 'teacher':
+    if not request.principal.is_teacher:
         return redirect('dashboard')
 
     # clear old messages
@@ -87,6 +163,7 @@ def add_course(request):
                 teacher=request.user,
                 start_date=start_date
             )
+            counters.bump_dashboard(request.user.id)
             messages.success(request, "Course created successfully.")
             return redirect('class_manage', classroom.id)
         except IntegrityError:
@@ -97,17 +174,25 @@ def add_course(request):
 
 
 @login_required
+@archive.redirect_if_archived
 def class_manage(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
-    enrollments = Enrollment.objects.filter(classroom=classroom).select_related('student__profile')
+    enrollments = list(Enrollment.objects.filter(classroom=classroom).select_related('student__profile'))
+
+    # One aggregate for the whole roster instead of two COUNTs per student
+    percents = attendance_store.percent_map(Enrollment.objects.filter(classroom=classroom))
+    for e in enrollments:
+        e.attendance = percents.get(e.id, 0.0)
 
     return render(request, 'lms/class_manage.html', {
         'classroom': classroom,
-        'enrollments': enrollments
+        'enrollments': enrollments,
+        'provision_max_rows': provisioning.web_row_limit(),
     })
 
 
 @login_required
+@archive.redirect_if_archived
 def add_student(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     reg_no = request.POST.get('reg_no')
@@ -115,7 +200,11 @@ def add_student(request, class_id):
     try:
         profile = Profile.objects.get(reg_no=reg_no, role='student')
         student = profile.user
-        Enrollment.objects.get_or_create(classroom=classroom, student=student)
+        with transaction.atomic():
+            _, created = Enrollment.objects.get_or_create(classroom=classroom, student=student)
+            if created:
+                counters.adjust(classroom, enrolled_count=1)
+        analytics.invalidate(classroom.id)
         messages.success(request, f"{student.username} added successfully.")
     except Profile.DoesNotExist:
         messages.error(request, "No student found with that register number.")
@@ -126,6 +215,7 @@ def add_student(request, class_id):
 
 
 @login_required
+@archive.redirect_if_archived
 def upload_students_csv(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
 
@@ -138,26 +228,72 @@ def upload_students_csv(request, class_id):
         data = csv_file.read().decode('utf-8')
         io_string = io.StringIO(data)
         added = 0
-        for row in csv.reader(io_string):
-            if len(row) < 1:
-                continue
-            reg_no = row[0].strip()
-            try:
-                profile = Profile.objects.get(reg_no=reg_no, role='student')
-                Enrollment.objects.get_or_create(classroom=classroom, student=profile.user)
-                added += 1
-            except Profile.DoesNotExist:
-                continue
+        with transaction.atomic():
+            created_count = 0
+            for row in csv.reader(io_string):
+                if len(row) < 1:
+                    continue
+                reg_no = row[0].strip()
+                try:
+                    profile = Profile.objects.get(reg_no=reg_no, role='student')
+                    _, created = Enrollment.objects.get_or_create(classroom=classroom, student=profile.user)
+                    added += 1
+                    created_count += created
+                except Profile.DoesNotExist:
+                    continue
+            counters.adjust(classroom, enrolled_count=created_count)
+        analytics.invalidate(classroom.id)
         messages.success(request, f"{added} students added successfully.")
 
     return redirect('class_manage', class_id=class_id)
 
 
+@login_required
+@archive.redirect_if_archived
+def provision_students(request, class_id):
+    """Create accounts from a reg_no,name,email,department CSV, enroll them and return their credentials."""
+    classroom = get_object_or_404(Classroom, id=class_id)
+    if classroom.teacher_id != request.user.id and not request.user.is_staff:
+        return HttpResponseForbidden("Not allowed")
+
+    csv_file = request.FILES.get('csv_file')
+    if request.method != 'POST' or not csv_file or not csv_file.name.endswith('.csv'):
+        messages.error(request, "Please upload a valid CSV file.")
+        return redirect('class_manage', class_id=class_id)
+
+    try:
+        rows = provisioning.read_rows(csv_file.read().decode('utf-8-sig'))
+    except (provisioning.ProvisioningError, UnicodeDecodeError) as exc:
+        messages.error(request, str(exc))
+        return redirect('class_manage', class_id=class_id)
+
+    # Every new account costs a slow password hash, done in this process: a request must not fork a
+    # process pool. Larger rosters go through manage.py provision_students.
+    if len(rows) > provisioning.web_row_limit():
+        messages.error(
+            request,
+            f"The CSV has {len(rows)} students; at most {provisioning.web_row_limit()} can be created here. "
+            "Split the file, or ask an administrator to run manage.py provision_students.",
+        )
+        return redirect('class_manage', class_id=class_id)
+
+    result = provisioning.provision_students(rows, classroom=classroom, workers=1)
+    messages.success(request, result.summary())
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{classroom.code}_credentials.csv"'
+    writer = csv.writer(response)
+    writer.writerow(['reg_no', 'username', 'password'])
+    writer.writerows(result.credentials)
+    return response
+
+
 
 @login_required
+@archive.redirect_if_archived
 def class_detail(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
-    is_teacher = classroom.teacher == request.user
+    is_teacher = classroom.teacher_id == request.user.id
     now = timezone.localtime(timezone.now())  # localized to IST
 
     # === Enrollment for Attendance ===
@@ -171,7 +307,10 @@ def class_detail(request, class_id):
     # === AUTO-MARK / CLEANUP LOGIC (Assignments) ===
     if not is_teacher and enrollment:
         student = request.user
+        spooled = spool.pending_for(student.id)
         for a in assignments:
+            if a.id in spooled:
+                continue  # an on-time upload is still waiting to be committed
             sub = Submission.objects.filter(student=student, assignment=a).first()
 
             # If deadline extended -> remove old auto-zero
@@ -225,7 +364,6 @@ def class_detail(request, class_id):
             attendance_color = "success"
 
     # === QUIZ LOGIC: Auto-zero, best-of-two, best-score contribution ===
-    best_quiz_score = 0
     pending_quiz_exists = False
     quizzes_context = []
 
@@ -269,30 +407,16 @@ def class_detail(request, class_id):
                 "status": status
             })
 
-        # --- Best-of logic: find best score per quiz and then the highest across quizzes ---
-        all_best_scores = []
-        for quiz in Quiz.objects.filter(classroom=classroom, visible=True):
-            score = QuizAttempt.best_score(quiz, student)
-            if score is not None:
-                all_best_scores.append(score)
-
-        if all_best_scores:
-            best_quiz_score = max(all_best_scores)
-        else:
-            best_quiz_score = 0
-
-    # === Assignment Average ===
+    # === Grades (assignment + quiz components, weighted by the class GradingScheme) ===
     assignment_avg = 0
-    total_assignments = assignments.count()
-
-    if not is_teacher and total_assignments > 0:
-        subs = Submission.objects.filter(student=request.user, assignment__classroom=classroom)
-        total_marks = sum(s.marks or 0 for s in subs)
-        assignment_avg = round(total_marks / total_assignments, 2)
-
-    # === Final Weighted Grade ===
-    # Assignments = 50%, Best Quiz = 50%
-    final_grade = round(0.5 * assignment_avg + 0.5 * best_quiz_score, 2)
+    best_quiz_score = 0
+    final_grade = 0
+    if not is_teacher and enrollment:
+        grade_row = compute_classroom_grades(classroom, student_ids=[request.user.id]).row_for(request.user.id)
+        if grade_row:
+            assignment_avg = grade_row['assignment_score']
+            best_quiz_score = grade_row['quiz_score']
+            final_grade = grade_row['final_grade']
 
     # === Overdue Auto-Zero Assignments ===
     overdue_zeros = 0
@@ -330,10 +454,82 @@ def class_detail(request, class_id):
     return render(request, "lms/class_detail.html", context)
 
 
+# --------------------------------
+# GRADES (teacher overview + export)
+# --------------------------------
 @login_required
+@archive.redirect_if_archived
+def class_grades(request, class_id):
+    classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
+    scheme = get_scheme(classroom)
+
+    if request.method == 'POST':
+        form = GradingSchemeForm(request.POST, instance=scheme)
+        if form.is_valid():
+            form.save()
+            messages.success(request, "Grading scheme updated.")
+            return redirect('class_grades', class_id=classroom.id)
+        messages.error(request, "Please correct the errors below.")
+    else:
+        form = GradingSchemeForm(instance=scheme)
+
+    gradebook = compute_classroom_grades(classroom)
+    return render(request, 'lms/class_grades.html', {
+        'classroom': classroom,
+        'form': form,
+        'gradebook': gradebook,
+        'rows': list(gradebook.rows()),
+    })
+
+
+@login_required
+@archive.redirect_if_archived
+def class_grades_export(request, class_id):
+    classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
+    gradebook = compute_classroom_grades(classroom)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{classroom.code}_grades.csv"'
+    writer = csv.writer(response)
+    writer.writerow(
+        ['Student', 'Register No']
+        + [a.title for a in gradebook.assignments]
+        + [q.title for q in gradebook.quizzes]
+        + ['Assignment Score', 'Quiz Score', 'Final Grade']
+    )
+    for row in gradebook.rows():
+        student = row['student']
+        reg_no = student.profile.reg_no if hasattr(student, 'profile') else ''
+        writer.writerow(
+            [student.username, reg_no]
+            + row['assignment_marks']
+            + row['quiz_scores']
+            + [row['assignment_score'], row['quiz_score'], row['final_grade']]
+        )
+    return response
+
+
+# --------------------------------
+# REPORTS
+# --------------------------------
+@login_required
+def at_risk_report(request):
+    if not request.principal.is_teacher:
+        return redirect('main')
+
+    threshold = reports.parse_threshold(request.GET.get('threshold', reports.DEFAULT_ATTENDANCE_THRESHOLD))
+    return render(request, 'lms/at_risk_report.html', {
+        'groups': reports.at_risk_report(request.user, attendance_threshold=threshold),
+        'threshold': threshold,
+    })
+
+
+@login_required
+@archive.redirect_if_archived
 def manage_attendance(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     students = Enrollment.objects.filter(classroom=classroom).select_related('student')
+    store = attendance_store.get_store()
 
     # Selected date from GET (default = today)
     selected_date_str = request.GET.get('date')
@@ -351,24 +547,22 @@ def manage_attendance(request, class_id):
     # Handle POST (Mark / Clear Attendance)
     if request.method == "POST":
         if "clear_logs" in request.POST:
-            Attendance.objects.filter(enrollment__in=students, date=selected_date).delete()
+            store.clear_day(classroom, students, selected_date)
+            analytics.invalidate(classroom.id)
             messages.success(request, f"Attendance logs cleared for {selected_date}.")
             return redirect('manage_attendance', class_id=classroom.id)
 
-        for enrollment in students:
-            present_key = f"present_{enrollment.id}"
-            present_value = request.POST.get(present_key) == "on"
-            Attendance.objects.update_or_create(
-                enrollment=enrollment,
-                date=selected_date,
-                defaults={'present': present_value}
-            )
+        present_ids = {
+            enrollment.id for enrollment in students
+            if request.POST.get(f"present_{enrollment.id}") == "on"
+        }
+        store.save_day(classroom, students, selected_date, present_ids)
+        analytics.invalidate(classroom.id)
         messages.success(request, f"Attendance saved for {selected_date}.")
         return redirect('manage_attendance', class_id=classroom.id)
 
     # Attendance map for selected date
-    attendance_records = Attendance.objects.filter(enrollment__in=students, date=selected_date)
-    attendance_map = {a.enrollment.id: a.present for a in attendance_records}
+    attendance_map = store.day_map(students, selected_date)
 
     return render(request, 'lms/manage_attendance.html', {
         'classroom': classroom,
@@ -379,10 +573,11 @@ def manage_attendance(request, class_id):
     })
 
 @login_required
+@archive.redirect_if_archived
 def attendance_history_teacher(request, class_id, student_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     enrollment = get_object_or_404(Enrollment, classroom=classroom, student__id=student_id)
-    records = Attendance.objects.filter(enrollment=enrollment).order_by('-date')
+    records = attendance_store.get_store().records(enrollment)
     return render(request, 'lms/attendance_history_teacher.html', {
         'classroom': classroom,
         'enrollment': enrollment,
@@ -391,21 +586,100 @@ def attendance_history_teacher(request, class_id, student_id):
 
 
 @login_required
+@archive.redirect_if_archived
+def attendance_analytics(request, class_id):
+    classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
+    data = analytics.attendance_analytics(classroom)
+    at_risk_streaks = sorted(
+        (s for s in data['students'] if s['current_streak'] > 0),
+        key=lambda s: -s['current_streak'],
+    )
+    return render(request, 'lms/attendance_analytics.html', {
+        'classroom': classroom,
+        'analytics': data,
+        'streaks': at_risk_streaks[:20],
+    })
+
+
+@login_required
+@archive.redirect_if_archived
 def attendance_history_student(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
     enrollment = get_object_or_404(Enrollment, classroom=classroom, student=request.user)
-    records = Attendance.objects.filter(enrollment=enrollment).order_by('-date')
+    records = attendance_store.get_store().records(enrollment)
     return render(request, 'lms/attendance_history_student.html', {
         'classroom': classroom,
         'records': records,
     })
 
+@login_required
+def archived_class(request, class_id):
+    """Read-only view of an archived course; each tab lazily reads only its archive files."""
+    classroom = get_object_or_404(Classroom, id=class_id, archived_at__isnull=False)
+    is_teacher = classroom.teacher_id == request.user.id
+    if not is_teacher and not Enrollment.objects.filter(classroom=classroom, student=request.user).exists():
+        return HttpResponseForbidden("Not allowed")
+
+    section = request.GET.get('section', 'assignments')
+    if section not in archive.SECTIONS:
+        section = 'assignments'
+    try:
+        items = archive.section(classroom, section, student_id=None if is_teacher else request.user.id)
+    except archive.ArchiveError as exc:
+        messages.error(request, str(exc))
+        items = []
+
+    return render(request, 'lms/archived_class.html', {
+        'classroom': classroom,
+        'is_teacher': is_teacher,
+        'section': section,
+        'sections': archive.SECTIONS,
+        'items': items,
+    })
+
+
+@login_required
+def clone_course(request, class_id):
+    """Copy a course's assignments, quizzes and resources into a new course for the next term."""
+    source = get_object_or_404(Classroom, id=class_id, teacher=request.user)
+    if request.method != 'POST':
+        return redirect('class_manage', class_id=class_id)
+
+    code = request.POST.get('code', '').strip()
+    start_date = source.start_date
+    if request.POST.get('start_date'):
+        try:
+            start_date = datetime.strptime(request.POST['start_date'], '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, "Invalid start date format.")
+            return redirect('class_manage', class_id=class_id)
+    if not code:
+        messages.error(request, "Please enter a code for the new course.")
+        return redirect('class_manage', class_id=class_id)
+
+    try:
+        classroom, copied, seconds = cloning.clone_classroom(
+            source, code, name=request.POST.get('name', '').strip(), start_date=start_date, teacher=request.user
+        )
+    except IntegrityError:
+        messages.error(request, "A course with that code already exists.")
+        return redirect('class_manage', class_id=class_id)
+
+    messages.success(
+        request,
+        f"Cloned into {classroom.code}: {copied['assignments']} assignments, {copied['quizzes']} quizzes "
+        f"({copied['questions']} questions), {copied['resources']} resources in {seconds:.2f}s."
+    )
+    return redirect('class_manage', class_id=classroom.id)
+
+
 @login_required
 def delete_course(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
 
     if request.method == 'POST':
-        classroom.delete()
+        # Hide the course now; its rows and files are purged in the background
+        purge.schedule(classroom)
         messages.success(request, "Course deleted successfully.")
         return redirect('main')  # ✅ always redirect to dashboard after deletion
 
@@ -414,24 +688,30 @@ def delete_course(request, class_id):
     return redirect('class_manage', class_id=class_id)
 
 @login_required
+@archive.redirect_if_archived
 def remove_student(request, class_id, enrollment_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     enrollment = get_object_or_404(Enrollment, id=enrollment_id, classroom=classroom)
     if request.method == 'POST':
         # Also delete attendance records
-        Attendance.objects.filter(enrollment=enrollment).delete()
-        enrollment.delete()
+        with transaction.atomic():
+            attendance_store.get_store().clear_enrollment(enrollment)
+            enrollment.delete()
+            counters.adjust(classroom, enrolled_count=-1)
+        analytics.invalidate(classroom.id)
         messages.success(request, f"{enrollment.student.username} removed successfully.")
     return redirect('class_manage', class_id=classroom.id)
 
 @login_required
+@archive.redirect_if_archived
 def clear_student_attendance(request, class_id, student_id):
     """Allows teacher to clear all attendance records for a specific student in their class."""
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     enrollment = get_object_or_404(Enrollment, classroom=classroom, student__id=student_id)
 
     if request.method == 'POST':
-        deleted_count, _ = Attendance.objects.filter(enrollment=enrollment).delete()
+        deleted_count = attendance_store.get_store().clear_enrollment(enrollment)
+        analytics.invalidate(classroom.id)
         messages.success(request, f"Cleared {deleted_count} attendance logs for {enrollment.student.username}.")
         return redirect('class_manage', class_id=classroom.id)
 
@@ -446,15 +726,20 @@ from django.core.files.storage import FileSystemStorage
 
 # Teacher: Add Assignment
 @login_required
+@archive.redirect_if_archived
 def add_assignment(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
 
     if request.method == 'POST':
         form = AssignmentForm(request.POST, request.FILES)
         if form.is_valid():
-            assignment = form.save(commit=False)
-            assignment.classroom = classroom
-            assignment.save()
+            with transaction.atomic():
+                assignment = form.save(commit=False)
+                assignment.classroom = classroom
+                assignment.save()
+                counters.recount(classroom, ['open_assignment_count'])
+                if assignment.visible:
+                    notifications.assignment_posted(assignment)
             messages.success(request, '✅ Assignment added successfully.')
             return redirect('class_assignments_teacher', class_id=classroom.id)
         else:
@@ -468,17 +753,20 @@ def add_assignment(request, class_id):
     })
 
 @login_required
+@archive.redirect_if_archived
 def delete_assignment(request, assignment_id):
     assignment = get_object_or_404(Assignment, id=assignment_id)
 
     # Only teacher can delete
-    if request.user != assignment.classroom.teacher:
+    if request.user.id != assignment.classroom.teacher_id:
         messages.error(request, "You are not authorized to delete this assignment.")
         return redirect('class_detail', class_id=assignment.classroom.id)
 
     # Confirm and delete
     if request.method == "POST":
-        assignment.delete()
+        with transaction.atomic():
+            assignment.delete()
+            counters.recount(assignment.classroom, ['open_assignment_count', 'ungraded_count'])
         messages.success(request, f"✅ Assignment '{assignment.title}' deleted successfully.")
         return redirect('class_assignments_teacher', class_id=assignment.classroom.id)
 
@@ -486,6 +774,7 @@ def delete_assignment(request, assignment_id):
     return redirect('class_assignments_teacher', class_id=assignment.classroom.id)
 
 @login_required
+@archive.redirect_if_archived
 def class_assignments_teacher(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
     assignments = classroom.assignments.order_by('-created_at')
@@ -497,21 +786,32 @@ def class_assignments_teacher(request, class_id):
 
 
 @login_required
+@archive.redirect_if_archived
 def class_assignments_student(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
     enroll = Enrollment.objects.filter(student=request.user, classroom=classroom).first()
     if not enroll:
         messages.error(request, "You are not enrolled in this class.")
         return redirect('main')
+    # Only enrolled students get as far as the ETag check
+    return _class_assignments_student_page(request, classroom.id, classroom)
 
-    assignments = Assignment.objects.filter(classroom=classroom).order_by('-deadline')
-    submissions = Submission.objects.filter(student=request.user, assignment__in=assignments)
-    submission_map = {s.assignment.id: s for s in submissions}
+
+@condition(etag_func=conditional.etag('assignments'), last_modified_func=conditional.last_modified('assignments'))
+def _class_assignments_student_page(request, class_id, classroom):
+    assignments = caching.cached(classroom.id, 'assignments', lambda: list(
+        Assignment.objects.filter(classroom=classroom).order_by('-deadline')
+    ))
+    submissions = Submission.objects.filter(
+        student=request.user, assignment__in=[a.id for a in assignments]
+    ).prefetch_related('history')
+    submission_map = {s.assignment_id: s for s in submissions}
 
     context = {
         'classroom': classroom,
         'assignments': assignments,
         'submissions': submission_map,
+        'spooled': spool.pending_for(request.user.id),
         'now': timezone.now(),
     }
     return render(request, 'lms/class_assignments_student.html', context)
@@ -519,7 +819,10 @@ def class_assignments_student(request, class_id):
 
 
 @login_required
+@archive.redirect_if_archived
 def submit_assignment(request, assignment_id):
+    # Time of acceptance is the authoritative submitted_at, however long the upload waits in the spool
+    accepted_at = timezone.now()
     assignment = get_object_or_404(Assignment, id=assignment_id)
     classroom = assignment.classroom
 
@@ -530,7 +833,7 @@ def submit_assignment(request, assignment_id):
         return redirect('main')
 
     # Block submissions after deadline
-    if timezone.now() > assignment.deadline:
+    if accepted_at > assignment.deadline:
         messages.error(request, "⛔ Deadline has passed. Submissions are closed.")
         return redirect('class_assignments_student', class_id=classroom.id)
 
@@ -550,44 +853,48 @@ def submit_assignment(request, assignment_id):
         messages.error(request, "❌ File size cannot exceed 5 MB.")
         return redirect('class_assignments_student', class_id=classroom.id)
 
-    # Save or update submission
-    submission, created = Submission.objects.update_or_create(
-        student=request.user,
-        assignment=assignment,
-        defaults={
-            'file': file,
-            'submitted_at': timezone.now(),
-        }
+    # Spool the upload; the Submission and its history are written by the batched committer
+    try:
+        spool.accept(assignment, request.user, file, accepted_at)
+    except spool.SpoolFull:
+        response = HttpResponse(
+            "Too many submissions are being saved right now. Your file was NOT saved - "
+            f"go back and submit it again in {spool.RETRY_AFTER} seconds.",
+            status=503, content_type='text/plain',
+        )
+        response['Retry-After'] = str(spool.RETRY_AFTER)
+        return response
+    spool.wake()
+
+    messages.success(
+        request,
+        f"Submission received at {timezone.localtime(accepted_at):%Y-%m-%d %H:%M:%S}. "
+        "It will appear here in a moment.",
     )
-
-    # Track submission history
-    # SubmissionHistory.objects.create(submission=submission, action='Resubmitted')
-
-
-    # Display feedback message
-    if created:
-        SubmissionHistory.objects.create(submission=submission, action='First Submission')
-        messages.success(request, "Assignment submitted successfully.")
-    else:
-        SubmissionHistory.objects.create(submission=submission, action='Resubmission')
-        messages.success(request, "Resubmitted successfully (previous file replaced).")
-
-
     return redirect('class_assignments_student', class_id=classroom.id)
 
 
 
 
 @login_required
+@archive.redirect_if_archived
 def grade_submission(request, submission_id):
     submission = get_object_or_404(Submission, id=submission_id, assignment__classroom__teacher=request.user)
     
     if request.method == 'POST':
         marks = request.POST.get('marks')
-        submission.marks = float(marks)
-        submission.graded = True
-        submission.released = 'release' in request.POST
-        submission.save()
+        was_graded = submission.graded
+        was_released, old_marks = submission.released, submission.marks
+        with transaction.atomic():
+            submission.marks = float(marks)
+            submission.graded = True
+            submission.released = 'release' in request.POST
+            submission.save()
+            if not was_graded:
+                counters.adjust(submission.assignment.classroom, ungraded_count=-1)
+            # Newly released, or a released grade changed
+            if submission.released and (not was_released or submission.marks != old_marks):
+                notifications.grade_released(submission)
         messages.success(request, f"Marks updated for {submission.student.username}.")
         return redirect('view_submissions', assignment_id=submission.assignment.id)
     
@@ -595,23 +902,31 @@ def grade_submission(request, submission_id):
 
 
 @login_required
+@archive.redirect_if_archived
 def view_submissions(request, assignment_id):
     assignment = get_object_or_404(Assignment, id=assignment_id)
     classroom = assignment.classroom
-    if classroom.teacher != request.user:
+    if classroom.teacher_id != request.user.id:
         messages.error(request, "You are not authorized to view this page.")
         return redirect('main')
 
-    submissions = Submission.objects.filter(assignment=assignment).select_related('student').prefetch_related('history')
-
-    context = {
-        "assignment": assignment,
-        "submissions": submissions,
-    }
+    submissions = Submission.objects.filter(assignment=assignment).select_related('student__profile')
+    context = pagination.table_page(
+        request, submissions, pagination.SUBMISSION_SORTS, pagination.SUBMISSION_FILTERS
+    )
+    # History is only loaded for the rows on this page
+    prefetch_related_objects(context['page'].items, 'history')
+    # Page counts / thumbnails of this page's files, made in the background (lms/derivatives.py)
+    context['derivatives'] = derivatives.for_names(s.file.name for s in context['page'].items)
+    # Near-duplicates across the whole assignment, from the stored signatures (lms/similarity.py)
+    context['similarity'] = similarity.report(assignment)
+
+    context['assignment'] = assignment
     return render(request, "lms/view_submissions.html", context)
 
 # Teacher: Edit Assignment
 @login_required
+@archive.redirect_if_archived
 def edit_assignment(request, assignment_id):
     assignment = get_object_or_404(Assignment, id=assignment_id)
     classroom = assignment.classroom
@@ -619,7 +934,9 @@ def edit_assignment(request, assignment_id):
     if request.method == 'POST':
         form = AssignmentForm(request.POST, request.FILES, instance=assignment)
         if form.is_valid():
-            form.save()
+            with transaction.atomic():
+                form.save()
+                counters.recount(classroom, ['open_assignment_count'])
             messages.success(request, '✅ Assignment updated successfully.')
             return redirect('class_assignments_teacher', class_id=classroom.id)
         else:
@@ -639,6 +956,7 @@ def edit_assignment(request, assignment_id):
 # TEACHER: VIEW QUIZZES
 # =========================
 @login_required
+@archive.redirect_if_archived
 def quizzes_teacher(request, class_id):
     """
     Display all quizzes created by the teacher for a given classroom.
@@ -690,6 +1008,7 @@ def quizzes_teacher(request, class_id):
 # TEACHER: ADD QUIZ
 # =========================
 @login_required
+@archive.redirect_if_archived
 def add_quiz(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
 
@@ -728,10 +1047,13 @@ def add_quiz(request, class_id):
     return render(request, 'lms/add_quiz.html', {'classroom': classroom})
 
 @login_required
+@archive.redirect_if_archived
 def delete_quiz(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id, classroom__teacher=request.user)
     title = quiz.title
-    quiz.delete()
+    with transaction.atomic():
+        quiz.delete()
+        counters.recount(quiz.classroom, ['upcoming_quiz_count'])
     messages.success(request, f"Quiz '{title}' deleted successfully.")
     return redirect('class_quizzes_teacher', class_id=quiz.classroom.id)
 
@@ -740,6 +1062,7 @@ def delete_quiz(request, quiz_id):
 # TEACHER: ADD QUESTIONS
 # =========================
 @login_required
+@archive.redirect_if_archived
 def add_question(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id, classroom__teacher=request.user)
     questions = quiz.questions.prefetch_related('options')
@@ -761,9 +1084,11 @@ def add_question(request, quiz_id):
                 elif end_dt <= start_dt:
                     messages.error(request, "End time must be later than start time.")
                 else:
-                    quiz.start_time = start_dt
-                    quiz.end_time = end_dt
-                    quiz.save()
+                    with transaction.atomic():
+                        quiz.start_time = start_dt
+                        quiz.end_time = end_dt
+                        quiz.save()
+                        counters.recount(quiz.classroom, ['upcoming_quiz_count'])
                     messages.success(request, "Quiz timings updated successfully.")
 
             return render(request, 'lms/add_question.html', {'quiz': quiz, 'questions': questions})
@@ -783,20 +1108,46 @@ def add_question(request, quiz_id):
                 messages.error(request, "Please select at least one correct answer.")
             else:
                 # Create question + options
-                q = Question.objects.create(quiz=quiz, text=text)
-                for i, opt in enumerate(options):
-                    Option.objects.create(
-                        question=q,
-                        text=opt.strip(),
-                        is_correct=(str(i) in correct)
-                    )
-                quiz.visible = True
-                quiz.save()
+                with transaction.atomic():
+                    q = Question.objects.create(quiz=quiz, text=text)
+                    for i, opt in enumerate(options):
+                        Option.objects.create(
+                            question=q,
+                            text=opt.strip(),
+                            is_correct=(str(i) in correct)
+                        )
+                    quiz.visible = True
+                    quiz.save()
+                    counters.recount(quiz.classroom, ['upcoming_quiz_count'])
                 messages.success(request, "Question added successfully.")
 
             questions = quiz.questions.prefetch_related('options')
             return render(request, 'lms/add_question.html', {'quiz': quiz, 'questions': questions})
 
+        # Import a question bank (CSV / JSON)
+        elif 'import_questions' in request.POST:
+            bank = request.FILES.get('bank_file')
+            if not bank or not bank.name.lower().endswith(('.csv', '.json')):
+                messages.error(request, "Please upload a CSV or JSON question bank.")
+            else:
+                try:
+                    parsed = question_bank.parse_bank(
+                        bank.name, bank.read().decode('utf-8-sig'), allow_multiple=quiz.allow_multiple_correct
+                    )
+                except UnicodeDecodeError:
+                    messages.error(request, "The file must be UTF-8 encoded.")
+                except question_bank.QuestionBankError as exc:
+                    for error in exc.errors[:10]:
+                        messages.error(request, error)
+                    if len(exc.errors) > 10:
+                        messages.error(request, f"...and {len(exc.errors) - 10} more problems. Nothing was imported.")
+                else:
+                    added = question_bank.import_questions(quiz, parsed)
+                    messages.success(request, f"{added} questions imported successfully.")
+
+            questions = quiz.questions.prefetch_related('options')
+            return render(request, 'lms/add_question.html', {'quiz': quiz, 'questions': questions})
+
         # 3️⃣ Save Quiz
         elif 'save_quiz' in request.POST:
             if quiz.questions.count() == 0:
@@ -819,15 +1170,19 @@ def add_question(request, quiz_id):
 # STUDENT: VIEW QUIZZES
 # =========================
 @login_required
+@archive.redirect_if_archived
+@condition(etag_func=conditional.etag('quizzes'), last_modified_func=conditional.last_modified('quizzes'))
 def quizzes_student(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
 
     # Remove 'visible=True' unless you’re explicitly managing it from teacher panel
-    quizzes = Quiz.objects.filter(classroom=classroom, visible=True).order_by('start_time')
+    quizzes = caching.cached(classroom.id, 'quizzes', lambda: list(
+        Quiz.objects.filter(classroom=classroom, visible=True).order_by('start_time')
+    ))
 
     now = timezone.localtime(timezone.now())
-    attempts = QuizAttempt.objects.filter(student=request.user, quiz__in=quizzes)
-    attempt_map = {a.quiz.id: a for a in attempts}
+    attempts = QuizAttempt.objects.filter(student=request.user, quiz__in=[q.id for q in quizzes])
+    attempt_map = {a.quiz_id: a for a in attempts}
 
     return render(request, 'lms/quizzes_student.html', {
         'classroom': classroom,
@@ -838,10 +1193,35 @@ def quizzes_student(request, class_id):
 
 
 
+async def quiz_event_stream(request, class_id):
+    """Quiz open / close events and remaining times of a classroom, as server-sent events."""
+    user = await request.auser()
+    if not user.is_authenticated:
+        return HttpResponseForbidden()
+    classroom = await Classroom.objects.filter(pk=class_id, archived_at__isnull=True).values('teacher_id').afirst()
+    if classroom is None:
+        raise Http404
+    if classroom['teacher_id'] != user.id and not await Enrollment.objects.filter(
+        classroom_id=class_id, student_id=user.id
+    ).aexists():
+        return HttpResponseForbidden()
+
+    if isinstance(request, ASGIRequest):
+        content = quiz_events.stream(class_id)
+    else:
+        # A WSGI worker cannot hold the stream open: one snapshot, then EventSource reconnects
+        content = await sync_to_async(quiz_events.single)(class_id)
+    response = StreamingHttpResponse(content, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # proxies must pass events through as they come
+    return response
+
+
 # =========================
 # STUDENT: ATTEMPT QUIZ
 # =========================
 @login_required
+@archive.redirect_if_archived
 def attempt_quiz(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id)
     now = timezone.localtime(timezone.now())
@@ -849,41 +1229,45 @@ def attempt_quiz(request, quiz_id):
     # Restrict to quiz window
     if now < quiz.start_time:
         messages.error(request, "Quiz hasn’t started yet.")
-        return redirect('quizzes_student', class_id=quiz.classroom.id)
+        return redirect('class_quizzes_student', class_id=quiz.classroom.id)
 
-    if now > quiz.end_time:
+    # Answers the page submits when the quiz closes may arrive a moment late
+    closes_at = quiz.end_time + (quiz_events.SUBMIT_GRACE if request.method == 'POST' else timedelta(0))
+    if now > closes_at:
         messages.error(request, "Quiz deadline has passed.")
         QuizAttempt.objects.get_or_create(
             quiz=quiz,
             student=request.user,
             defaults={'score': 0.0, 'graded': True, 'auto_submitted': True}
         )
-        return redirect('quizzes_student', class_id=quiz.classroom.id)
+        return redirect('class_quizzes_student', class_id=quiz.classroom.id)
+
+    # Questions, options and the answer key come from the classroom cache
+    questions = question_bank.quiz_paper(quiz)
 
     # Handle submission
     if request.method == 'POST':
-        questions = quiz.questions.prefetch_related('options')
+        key = question_bank.answer_key(questions)
         total_q = len(questions)
         score = 0
 
         for q in questions:
             submitted = request.POST.getlist(str(q.id))
-            correct = list(q.options.filter(is_correct=True).values_list('id', flat=True))
-            if set(map(int, submitted)) == set(correct):
+            if set(map(int, submitted)) == key[q.id]:
                 score += 1
 
         final_score = round((score / total_q) * 10, 2)
         QuizAttempt.objects.update_or_create(
             quiz=quiz,
             student=request.user,
-            defaults={'score': final_score, 'graded': True}
+            # Real answers, even when the page sent them as the quiz closed: auto_submitted marks only
+            # the zero placeholder of a missed quiz, which these replace
+            defaults={'score': final_score, 'graded': True, 'auto_submitted': False}
         )
 
         messages.success(request, f"Quiz submitted successfully! You scored {final_score}/10.")
         return redirect('class_quizzes_student', class_id=quiz.classroom.id)
 
-
-    questions = quiz.questions.prefetch_related('options')
     return render(request, 'lms/attempt_quiz.html', {
         'quiz': quiz,
         'questions': questions
@@ -893,32 +1277,44 @@ def attempt_quiz(request, quiz_id):
 # =========================
 # TEACHER: VIEW ATTEMPTS
 # =========================
+def _same_page(request, view_name, *args):
+    """URL of ``view_name`` keeping the current sort / filter / cursor query string."""
+    url = reverse(view_name, args=args)
+    return f"{url}?{request.GET.urlencode()}" if request.GET else url
+
+
 @login_required
+@archive.redirect_if_archived
 def view_attempts_teacher(request, quiz_id):
     quiz = get_object_or_404(Quiz, id=quiz_id, classroom__teacher=request.user)
     attempts = QuizAttempt.objects.filter(quiz=quiz).select_related('student__profile')
 
     if request.method == 'POST':
-        # Update marks
+        # Update marks (only the rows that were on the submitted page)
         if 'update_scores' in request.POST:
-            for attempt in attempts:
-                marks = request.POST.get(f'score_{attempt.id}')
-                if marks:
-                    attempt.score = float(marks)
-                    attempt.save()
+            scores = {}
+            for name, value in request.POST.items():
+                if name.startswith('score_') and name[6:].isdigit() and value:
+                    scores[int(name[6:])] = float(value)
+            changed = [a for a in attempts.filter(id__in=scores) if a.score != scores[a.id]]
+            for attempt in changed:
+                attempt.score = scores[attempt.id]
+            QuizAttempt.objects.bulk_update(changed, ['score'])
             messages.success(request, "Scores updated successfully.")
-            return redirect('view_attempts_teacher', quiz_id=quiz.id)
+            return redirect(_same_page(request, 'view_attempts_teacher', quiz.id))
 
         # Reactivate attempt
         elif 'reactivate_attempt' in request.POST:
-            attempt_id = request.POST.get('attempt_id')
+            attempt_id = request.POST.get('reactivate_attempt')
             attempt = get_object_or_404(QuizAttempt, id=attempt_id, quiz=quiz)
             attempt.delete()
   # 👈 Remove previous attempt entirely
             messages.success(request, f"Reactivated quiz for {attempt.student.username}. They can attempt again.")
-            return redirect('view_attempts_teacher', quiz_id=quiz.id)
+            return redirect(_same_page(request, 'view_attempts_teacher', quiz.id))
 
-    return render(request, 'lms/view_attempts_teacher.html', {'quiz': quiz, 'attempts': attempts})
+    context = pagination.table_page(request, attempts, pagination.ATTEMPT_SORTS, pagination.ATTEMPT_FILTERS)
+    context['quiz'] = quiz
+    return render(request, 'lms/view_attempts_teacher.html', context)
 
 
 
@@ -927,42 +1323,108 @@ def view_attempts_teacher(request, quiz_id):
 #------------------------
 
 @login_required
+@condition(etag_func=conditional.etag('resources'), last_modified_func=conditional.last_modified('resources'))
 def class_resources(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
-    is_teacher = classroom.teacher == request.user
-
-    resources = Resource.objects.filter(classroom=classroom)
-
-    if request.method == 'POST' and is_teacher:
-        title = request.POST.get('title')
-        description = request.POST.get('description')
-        file = request.FILES.get('file')
-
-        if not title or not file:
-            messages.error(request, "Title and file are required.")
-        else:
-            Resource.objects.create(
-                classroom=classroom,
-                title=title,
-                description=description,
-                file=file,
-                uploaded_by=request.user
-            )
-            messages.success(request, "Resource added successfully.")
-            return redirect('class_resources', class_id=classroom.id)
+    is_teacher = classroom.teacher_id == request.user.id
+
+    resources = caching.cached(classroom.id, 'resources', lambda: list(
+        Resource.objects.filter(classroom=classroom).select_related('uploaded_by')
+    ))
+    # Storing a derivative starts a new generation, so this is refreshed when one arrives
+    file_info = caching.cached(classroom.id, 'resource_derivatives', lambda: derivatives.for_names(
+        r.file.name for r in resources
+    ))
+    # Searches the text inside the course's files, indexed in the background (lms/content_index.py)
+    query = request.GET.get('q', '').strip()
+    results = content_index.search(classroom, query) if query else None
 
     return render(request, 'lms/class_resources.html', {
         'classroom': classroom,
         'resources': resources,
-        'is_teacher': is_teacher
+        'derivatives': file_info,
+        'is_teacher': is_teacher,
+        'query': query,
+        'results': results,
     })
 
 
+# Chunked uploads (lms/uploads.py): the resources page sends files through these JSON endpoints
+def _upload_error(exc):
+    return JsonResponse({'error': str(exc)}, status=exc.status)
+
+
+def _upload_state(session):
+    return {
+        **uploads.status(session),
+        'status_url': reverse('resource_upload_status', args=[session.pk]),  # chunks are PUT to <status_url>chunks/<n>/
+        'finalize_url': reverse('finish_resource_upload', args=[session.pk]),
+    }
+
+
+@login_required
+@archive.redirect_if_archived
+def start_resource_upload(request, class_id):
+    classroom = get_object_or_404(Classroom, id=class_id, teacher=request.user)
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required."}, status=405)
+    try:
+        session = uploads.start(
+            classroom, request.user,
+            title=request.POST.get('title'),
+            description=request.POST.get('description'),
+            filename=request.POST.get('filename'),
+            size=request.POST.get('size'),
+        )
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    return JsonResponse(_upload_state(session), status=201)
+
+
+@login_required
+def resource_upload_status(request, upload_id):
+    """GET: progress of an upload, for resuming. DELETE: abandon it."""
+    session = get_object_or_404(UploadSession, id=upload_id, created_by=request.user)
+    if request.method == 'DELETE':
+        try:
+            uploads.abort(session)
+        except uploads.UploadError as exc:
+            return _upload_error(exc)
+        return HttpResponse(status=204)
+    return JsonResponse(_upload_state(session))
+
+
+@login_required
+def resource_upload_chunk(request, upload_id, number):
+    session = get_object_or_404(UploadSession, id=upload_id, created_by=request.user)
+    if request.method != 'PUT':
+        return JsonResponse({'error': "PUT required."}, status=405)
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        session = uploads.write_chunk(session, number, request, length, request.headers.get('X-Chunk-SHA256'))
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    return JsonResponse(_upload_state(session))
+
+
+@login_required
+def finish_resource_upload(request, upload_id):
+    session = get_object_or_404(UploadSession, id=upload_id, created_by=request.user)
+    if request.method != 'POST':
+        return JsonResponse({'error': "POST required."}, status=405)
+    try:
+        resource = uploads.finalize(session, checksum=request.POST.get('checksum'))
+    except uploads.UploadError as exc:
+        return _upload_error(exc)
+    messages.success(request, "Resource added successfully.")
+    return JsonResponse({'resource': resource.id, 'url': resource.file.url}, status=201)
+
+
 @login_required
 def delete_resource(request, resource_id):
     resource = get_object_or_404(Resource, id=resource_id)
     classroom = resource.classroom
-    if request.user == classroom.teacher:
+    if request.user.id == classroom.teacher_id:
         resource.delete()
         messages.success(request, "Resource deleted successfully.")
     else:
@@ -974,10 +1436,13 @@ def delete_resource(request, resource_id):
 #-------------------
 
 @login_required
+@archive.redirect_if_archived
 def class_discussions(request, class_id):
     classroom = get_object_or_404(Classroom, id=class_id)
-    discussions = Discussion.objects.filter(classroom=classroom).select_related('author')
-    is_teacher = classroom.teacher == request.user
+    discussions = caching.cached(classroom.id, 'discussions', lambda: list(
+        Discussion.objects.filter(classroom=classroom).select_related('author')
+    ))
+    is_teacher = classroom.teacher_id == request.user.id
 
     # Only allow teacher to create a discussion
     if is_teacher and request.method == 'POST':
@@ -1001,6 +1466,7 @@ def class_discussions(request, class_id):
 
 
 @login_required
+@archive.redirect_if_archived
 def discussion_detail(request, discussion_id):
     discussion = get_object_or_404(Discussion, id=discussion_id)
     replies = Reply.objects.filter(discussion=discussion, parent=None).select_related('author').prefetch_related('children')
@@ -1018,12 +1484,14 @@ def discussion_detail(request, discussion_id):
                 except Reply.DoesNotExist:
                     parent = None
 
-            Reply.objects.create(
-                discussion=discussion,
-                author=request.user,
-                content=content,
-                parent=parent
-            )
+            with transaction.atomic():
+                reply = Reply.objects.create(
+                    discussion=discussion,
+                    author=request.user,
+                    content=content,
+                    parent=parent
+                )
+                notifications.reply_posted(reply)
             return redirect('discussion_detail', discussion_id=discussion.id)
 
     return render(request, 'lms/discussion_detail.html', {
@@ -1039,7 +1507,7 @@ def delete_reply(request, reply_id):
     classroom = discussion.classroom
 
     # Only teachers of the class can delete any reply
-    if request.user == classroom.teacher:
+    if request.user.id == classroom.teacher_id:
         reply.delete()
         messages.success(request, "Reply deleted successfully.")
     else:
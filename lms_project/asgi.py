@@ -3,6 +3,13 @@ ASGI config for lms_project project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serve the site through this application (e.g. ``uvicorn lms_project.asgi:application``)
+rather than WSGI: the quiz event streams (lms/quiz_events.py) stay open for
+minutes, which costs a coroutine here but a whole worker thread under WSGI,
+where they fall back to reconnecting every few seconds. It also switches the
+busiest read pages to their async views (``LMS_ASYNC_VIEWS``); compare with
+``manage.py benchmark_servers``.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
@@ -12,5 +19,14 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'lms_project.settings')
+os.environ.setdefault('LMS_ASYNC_VIEWS', '1')  # lms/async_views.py
 
 application = get_asgi_application()
+
+from django.conf import settings  # noqa: E402 -- configured by get_asgi_application()
+
+if settings.DEBUG:
+    # What runserver does for WSGI: serve static files while developing
+    from django.contrib.staticfiles.handlers import ASGIStaticFilesHandler  # noqa: E402
+
+    application = ASGIStaticFilesHandler(application)
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -46,6 +48,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'lms.middleware.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -62,6 +65,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'lms.context_processors.principal',
             ],
         },
     },
@@ -69,6 +73,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'lms_project.wsgi.application'
 
+# Serve the resources, discussions and quiz list pages with the async views
+# (lms/async_views.py). lms_project/asgi.py turns this on; under WSGI the sync
+# views are faster, since every async view would need its own event loop there.
+LMS_ASYNC_VIEWS = os.environ.get('LMS_ASYNC_VIEWS') == '1'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -77,10 +86,51 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL lets job workers and web requests read while one of them writes;
+            # writers wait up to `timeout` seconds for the lock instead of failing
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'timeout': 20,
+        },
     }
 }
 
 
+# Cache
+# Local memory by default; set LMS_CACHE_BACKEND=file to share the cache
+# between worker processes through a directory (LMS_CACHE_DIR). Logging out
+# other sessions on a password change never depends on the cache (the session
+# principal re-checks the auth hash on every request), but with per-process
+# caches other workers keep stale roles and cached pages, so use the file
+# backend whenever more than one worker process serves requests -- and when
+# running ``manage.py runworker``, whose jobs refresh cached pages too.
+
+if os.environ.get('LMS_CACHE_BACKEND') == 'file':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('LMS_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'lms_cache')),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'lms',
+        }
+    }
+
+
+# Sessions
+# Cached sessions (cache first, database as fallback) by default; set
+# LMS_SESSION_ENGINE=signed_cookies to keep sessions entirely in the cookie.
+
+if os.environ.get('LMS_SESSION_ENGINE') == 'signed_cookies':
+    SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -126,5 +176,56 @@ LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/login/'
 LOGIN_URL = '/login/'
 
+# Attendance storage: 'rows' (one Attendance row per enrollment per day) or
+# 'bitmap' (one AttendanceBitmap row per enrollment per term).
+# Switch with `manage.py convert_attendance --to bitmap|rows`.
+LMS_ATTENDANCE_STORAGE = 'rows'
+
+# Student accounts the class page's CSV form creates in one request (each password
+# hash takes a fraction of a second); larger rosters: manage.py provision_students
+LMS_PROVISION_MAX_ROWS = 50
+
+# Where archived classrooms' rows are written (lms/archive.py)
+LMS_ARCHIVE_DIR = BASE_DIR / 'archive'
+
+# Assignment uploads are spooled here and committed in batches (lms/spool.py).
+# Beyond LMS_SPOOL_MAX_PENDING uncommitted uploads, new ones get a 503 "try again".
+LMS_SPOOL_DIR = BASE_DIR / 'spool'
+LMS_SPOOL_MAX_PENDING = 1000
+LMS_SPOOL_BATCH_SIZE = 100
+
+# Staging files of resumable resource uploads (lms/uploads.py)
+LMS_UPLOAD_STAGING_DIR = BASE_DIR / 'upload_staging'
+
+# Background jobs (lms/jobs.py, manage.py runworker): idle workers poll every
+# LMS_JOB_POLL_INTERVAL seconds; a job still running after LMS_JOB_LEASE seconds
+# is assumed to be orphaned by a dead worker and is queued again.
+LMS_JOB_POLL_INTERVAL = 1.0
+LMS_JOB_LEASE = 30 * 60
+# Set LMS_JOB_WORKER=1 where `manage.py runworker` runs next to the site (runserver
+# starts none). Without it, spooled uploads are committed inside the request and
+# the other jobs wait in the queue; `manage.py check --deploy` warns.
+LMS_JOB_WORKER = os.environ.get('LMS_JOB_WORKER') == '1'
+
+# E-mail digests (lms/notifications.py, sent by the send_digests job every
+# LMS_DIGEST_INTERVAL_MINUTES). SMTP by default, at EMAIL_HOST:EMAIL_PORT -- for
+# a local stand-in run `python -m aiosmtpd -n -l localhost:1025` with
+# EMAIL_PORT=1025. LMS_EMAIL_BACKEND=file writes each message to a file in
+# LMS_EMAIL_DIR instead; =console prints them.
+if os.environ.get('LMS_EMAIL_BACKEND') == 'file':
+    EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+    EMAIL_FILE_PATH = os.environ.get('LMS_EMAIL_DIR', os.path.join(tempfile.gettempdir(), 'lms_email'))
+elif os.environ.get('LMS_EMAIL_BACKEND') == 'console':
+    EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+DEFAULT_FROM_EMAIL = os.environ.get('LMS_FROM_EMAIL', 'lms@localhost')
+LMS_DIGEST_INTERVAL_MINUTES = 60
+# Base of the links in e-mails
+LMS_SITE_URL = os.environ.get('LMS_SITE_URL', 'http://localhost:8000')
+
+# One full-text index (SQLite FTS5) per classroom (lms/content_index.py)
+LMS_SEARCH_INDEX_DIR = BASE_DIR / 'search_index'
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file
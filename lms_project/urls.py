@@ -27,6 +27,6 @@ urlpatterns = [
     path('login/', auth_views.LoginView.as_view(template_name='login.html'), name='login'),
     path('logout/', auth_views.LogoutView.as_view(next_page='login'), name='logout'),
 
-    # App routes
-    path('', include('lms.urls')),
+    # App routes; under ASGI the busiest read pages are served by async views
+    path('', include('lms.async_urls' if settings.LMS_ASYNC_VIEWS else 'lms.urls')),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)